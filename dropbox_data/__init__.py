@@ -1,18 +1,24 @@
 import logging
 from dropbox_data.config import LOG_PATH, LOG_LEVEL
-from dropbox_data.main import process_data
 
 logging.basicConfig(level=LOG_LEVEL, filename=LOG_PATH)
 
 logger = logging.getLogger(__name__)
 
-def run_pipeline():
+def run_pipeline(chunk_size: int = 100000, resume: bool = False, memory_budget: int = None):
     """
     Função principal que inicia o pipeline de processamento.
+
+    Com resume, retoma a última execução interrompida (ver process_data); com
+    memory_budget (bytes), ajusta o tamanho dos chunks ao orçamento de memória.
     """
+    # Importado aqui para que importar o pacote não carregue pandas e o SDK do Dropbox
+    from dropbox_data.main import process_data
+
     try:
         logger.info("Iniciando pipeline de processamento")
-        result = process_data()
+        result = process_data(chunk_size=chunk_size, resume=resume,
+                              memory_budget=memory_budget)
         logger.info("Pipeline concluído com sucesso")
         return result
     except Exception as e:
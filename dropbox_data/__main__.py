@@ -0,0 +1,4 @@
+import sys
+from dropbox_data.cli import main
+
+sys.exit(main())
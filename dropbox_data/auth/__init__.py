@@ -1,3 +1,4 @@
 from dropbox_data.auth.dropbox_auth import DropboxAuthManager
+from dropbox_data.auth.client import DropboxClientFactory, get_client_factory, get_dropbox_client
 
-__all__ = ['DropboxAuthManager']
+__all__ = ['DropboxAuthManager', 'DropboxClientFactory', 'get_client_factory', 'get_dropbox_client']
@@ -0,0 +1,113 @@
+import logging
+import threading
+from datetime import datetime, timezone
+from dropbox import Dropbox, create_session
+from dropbox_data.auth.dropbox_auth import DropboxAuthManager, as_utc
+from dropbox_data.config import DROPBOX_MAX_CONNECTIONS, DROPBOX_TOKEN_REFRESH_MARGIN
+
+logger = logging.getLogger(__name__)
+
+# Espera antes de tentar de novo uma renovação em segundo plano que falhou
+_RETRY_REFRESH_SECONDS = 60
+
+class DropboxClientFactory:
+    """
+    Cliente Dropbox compartilhado, com sessão HTTP e renovação de token próprias.
+
+    Todos os usuários recebem o mesmo cliente, que usa uma única sessão HTTP
+    com pool de max_connections conexões: conexões TLS abertas por um download
+    são reaproveitadas pelos seguintes (inclusive pelos clientes derivados com
+    clone()). O token é renovado numa thread em segundo plano refresh_margin
+    segundos antes de expirar, conforme o expires_in informado pelo Dropbox,
+    então as chamadas à API nunca esperam por uma renovação.
+
+    get_client() e refresh() podem ser chamados de várias threads.
+    """
+
+    def __init__(self, auth_manager=None, max_connections=DROPBOX_MAX_CONNECTIONS,
+                 refresh_margin=DROPBOX_TOKEN_REFRESH_MARGIN):
+        self.session = create_session(max_connections=max_connections)
+        self.auth_manager = auth_manager or DropboxAuthManager(session=self.session)
+        self.refresh_margin = refresh_margin
+        self._lock = threading.RLock()
+        self._client = None
+        self._timer = None
+
+    def get_client(self):
+        """Retorna o cliente compartilhado, criando-o no primeiro uso"""
+        with self._lock:
+            if self._client is None:
+                try:
+                    access_token, expires_at = self.auth_manager.get_valid_token_data()
+                except Exception as e:
+                    logger.error(f"Erro ao obter token: {e}")
+                    raise Exception("Não foi possível obter um token válido") from e
+
+                # Com o refresh_token, o SDK ainda renova sozinho se a thread atrasar.
+                # O SDK compara a validade com horários em UTC sem fuso
+                self._client = Dropbox(
+                    oauth2_access_token=access_token,
+                    oauth2_access_token_expiration=(
+                        expires_at.astimezone(timezone.utc).replace(tzinfo=None)
+                    ),
+                    oauth2_refresh_token=self.auth_manager.refresh_token,
+                    app_key=self.auth_manager.app_key,
+                    app_secret=self.auth_manager.app_secret,
+                    session=self.session
+                )
+                self._schedule_refresh()
+            return self._client
+
+    def refresh(self):
+        """Renova o token do cliente compartilhado e agenda a próxima renovação"""
+        with self._lock:
+            if self._client is None:
+                return
+            self._client.refresh_access_token()
+            self.auth_manager.save_token(self._client._oauth2_access_token,
+                                         as_utc(self._client._oauth2_access_token_expiration))
+            logger.info("Token do cliente compartilhado renovado")
+            self._schedule_refresh()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Erro ao renovar token em segundo plano: {e}")
+            self._schedule_refresh(_RETRY_REFRESH_SECONDS)
+
+    def _schedule_refresh(self, delay=None):
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+            if delay is None:
+                expires_at = as_utc(self._client._oauth2_access_token_expiration)
+                delay = ((expires_at - datetime.now(timezone.utc)).total_seconds()
+                         - self.refresh_margin)
+            self._timer = threading.Timer(max(delay, 0), self._background_refresh)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def close(self):
+        """Cancela a renovação agendada e fecha as conexões"""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            self._client = None
+            self.session.close()
+
+_default_factory = None
+_default_factory_lock = threading.Lock()
+
+def get_client_factory():
+    """Fábrica de clientes compartilhada pelo processo, criada no primeiro uso"""
+    global _default_factory
+    with _default_factory_lock:
+        if _default_factory is None:
+            _default_factory = DropboxClientFactory()
+        return _default_factory
+
+def get_dropbox_client():
+    """Cliente Dropbox compartilhado, autenticado e com token renovado em segundo plano"""
+    return get_client_factory().get_client()
@@ -1,78 +1,130 @@
 import json
-from datetime import datetime, timedelta
-from dropbox_data.config import DROPBOX_APP_KEY, DROPBOX_APP_SECRET, DROPBOX_REFRESH_TOKEN
+from datetime import datetime, timedelta, timezone
+from dropbox_data.config import DROPBOX_TOKEN_REFRESH_MARGIN
 from dropbox import Dropbox
 from pathlib import Path
 import logging
 
 logger = logging.getLogger(__name__)
 
+def as_utc(value):
+    """Datetime com fuso UTC; os sem fuso (como os do SDK do Dropbox) já estão em UTC"""
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
 class DropboxAuthManager:
-    def __init__(self):
+    def __init__(self, session=None):
+        # Credenciais lidas só aqui, para que importar o módulo não as exija
+        from dropbox_data.config import (
+            DROPBOX_APP_KEY,
+            DROPBOX_APP_SECRET,
+            DROPBOX_REFRESH_TOKEN
+        )
+
         self.app_key = DROPBOX_APP_KEY
         self.app_secret = DROPBOX_APP_SECRET
         self.refresh_token = DROPBOX_REFRESH_TOKEN
-        
+        # Sessão HTTP compartilhada (ver DropboxClientFactory); None cria uma nova
+        self.session = session
+
         logger.info("Credenciais carregadas:")
         logger.info(f"App Key presente: {'Sim' if self.app_key else 'Não'}")
         logger.info(f"App Secret presente: {'Sim' if self.app_secret else 'Não'}")
         logger.info(f"Refresh Token presente: {'Sim' if self.refresh_token else 'Não'}")
-        
+
         self.token_file = Path('dropbox_data/auth/token.json')
         self.token_file.parent.mkdir(parents=True, exist_ok=True)
 
+    def save_token(self, access_token, expires_at):
+        """Salva o token e sua validade (UTC, como no SDK do Dropbox)"""
+        token_data = {
+            'access_token': access_token,
+            'expires_at_utc': expires_at.isoformat()
+        }
+        with open(self.token_file, 'w') as f:
+            json.dump(token_data, f)
+
+    def load_token(self):
+        """
+        Returns:
+            tuple: (access_token, expires_at em UTC), ou (None, None) sem token salvo
+        """
+        if not self.token_file.exists():
+            return None, None
+        with open(self.token_file, 'r') as f:
+            token_data = json.load(f)
+        # Tokens salvos antes da validade em UTC são tratados como expirados
+        if 'expires_at_utc' not in token_data:
+            return None, None
+        return (token_data['access_token'],
+                as_utc(datetime.fromisoformat(token_data['expires_at_utc'])))
+
+    def refresh_token_data(self):
+        """
+        Atualiza o token usando o refresh_token.
+
+        A validade vem do expires_in retornado pelo Dropbox. Nenhuma chamada
+        extra é feita para validar o token: um refresh_token inválido já faz a
+        renovação falhar.
+
+        Returns:
+            tuple: (access_token, expires_at em UTC)
+        """
+        logger.info(f"Tentando atualizar token com app_key: {self.app_key[:5]}...")
+
+        # Cria um cliente Dropbox com as credenciais e renova o token
+        dbx = Dropbox(
+            oauth2_refresh_token=self.refresh_token,
+            app_key=self.app_key,
+            app_secret=self.app_secret,
+            session=self.session
+        )
+        dbx.refresh_access_token()
+
+        # Salva o token
+        expires_at = as_utc(dbx._oauth2_access_token_expiration)
+        self.save_token(dbx._oauth2_access_token, expires_at)
+
+        logger.info("Access token refreshed successfully")
+        return dbx._oauth2_access_token, expires_at
+
     def refresh_access_token(self):
         """Atualiza o token usando o refresh_token"""
         try:
-            logger.info(f"Tentando atualizar token com app_key: {self.app_key[:5]}...")
-            logger.info(f"Refresh token presente: {bool(self.refresh_token)}")
-            
-            # Cria um cliente Dropbox com as credenciais
-            dbx = Dropbox(
-                oauth2_refresh_token=self.refresh_token,
-                app_key=self.app_key,
-                app_secret=self.app_secret
-            )
-            
-            # Testa a conexão para garantir que o token é válido
-            dbx.check_user()
-            
-            # Se chegou aqui, o token é válido
-            token_data = {
-                'access_token': dbx._oauth2_access_token,
-                'expires_at': (datetime.now() + timedelta(hours=4)).isoformat()
-            }
-            
-            # Salva o token
-            with open(self.token_file, 'w') as f:
-                json.dump(token_data, f)
-            
-            logger.info("Access token refreshed successfully")
-            return dbx._oauth2_access_token
-            
+            access_token, _ = self.refresh_token_data()
+            return access_token
+
         except Exception as e:
             logger.error(f"Error refreshing access token: {str(e)}")
             logger.error("Verifique se as credenciais no .env estão corretas")
             return None
 
+    def get_valid_token_data(self):
+        """
+        Obtém um token válido e sua validade, renovando-o se estiver perto de expirar.
+
+        Returns:
+            tuple: (access_token, expires_at em UTC)
+        """
+        access_token, expires_at = self.load_token()
+
+        # Verifica se o token ainda é válido
+        margin = timedelta(seconds=DROPBOX_TOKEN_REFRESH_MARGIN)
+        if access_token and datetime.now(timezone.utc) + margin < expires_at:
+            logger.info("Using existing valid token")
+            return access_token, expires_at
+
+        # Se não tem token ou está expirado, gera novo
+        logger.info("Token expired or not found, refreshing...")
+        return self.refresh_token_data()
+
     def get_valid_access_token(self):
         """Obtém um token de acesso válido"""
         try:
-            # Tenta carregar token existente
-            if self.token_file.exists():
-                with open(self.token_file, 'r') as f:
-                    token_data = json.load(f)
-                    
-                # Verifica se o token ainda é válido
-                expires_at = datetime.fromisoformat(token_data['expires_at'])
-                if datetime.now() + timedelta(hours=1) < expires_at:
-                    logger.info("Using existing valid token")
-                    return token_data['access_token']
-            
-            # Se não tem token ou está expirado, gera novo
-            logger.info("Token expired or not found, refreshing...")
-            return self.refresh_access_token()
-            
+            access_token, _ = self.get_valid_token_data()
+            return access_token
+
         except Exception as e:
             logger.error(f"Error getting valid access token: {e}")
-            return None 
\ No newline at end of file
+            return None
@@ -0,0 +1,6 @@
+from dropbox_data.bench.generator import generate_posts, write_dataset
+from dropbox_data.bench.fake_dropbox import LocalDropbox
+from dropbox_data.bench.runner import BenchmarkRunner, compare_with_baseline
+
+__all__ = ['generate_posts', 'write_dataset', 'LocalDropbox', 'BenchmarkRunner',
+           'compare_with_baseline']
@@ -0,0 +1,4 @@
+import sys
+from dropbox_data.bench.runner import main
+
+sys.exit(main())
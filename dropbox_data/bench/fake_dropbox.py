@@ -0,0 +1,105 @@
+import os
+import time
+from datetime import datetime
+from dropbox import files
+from dropbox.exceptions import ApiError
+from dropbox_data.extract.file_state import dropbox_content_hash
+
+class _FakeResponse:
+    """Resposta de download com a interface usada do requests.Response"""
+
+    def __init__(self, path, offset, bandwidth):
+        self._path = path
+        self._offset = offset
+        self._bandwidth = bandwidth
+        self.status_code = 206 if offset else 200
+
+    def iter_content(self, chunk_size):
+        with open(self._path, 'rb') as f:
+            f.seek(self._offset)
+            for block in iter(lambda: f.read(chunk_size), b''):
+                if self._bandwidth:
+                    time.sleep(len(block) / self._bandwidth)
+                yield block
+
+    def close(self):
+        pass
+
+class LocalDropbox:
+    """
+    Substituto local do cliente Dropbox para benchmarks.
+
+    Serve os arquivos de um diretório local com a mesma interface e os mesmos
+    tipos (FileMetadata, ListFolderResult, ApiError) do SDK, para as chamadas
+    usadas pelo pipeline: listagem paginada com cursor, metadados, download
+    com Range e clone(). Cada chamada espera latency segundos e os downloads
+    são limitados a bandwidth bytes/s, simulando a rede.
+    """
+
+    def __init__(self, root, latency=0.0, bandwidth=None, page_size=500, headers=None):
+        self.root = root
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.page_size = page_size
+        self._headers = headers or {}
+        self.calls = 0
+
+    def clone(self, headers=None, **kwargs):
+        return LocalDropbox(self.root, self.latency, self.bandwidth, self.page_size, headers)
+
+    def _wait(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _local(self, path):
+        return os.path.join(self.root, path.strip('/'))
+
+    def _metadata(self, path):
+        local = self._local(path)
+        if not os.path.isfile(local):
+            raise ApiError('fake', files.GetMetadataError.path(files.LookupError.not_found),
+                           None, None)
+        stat = os.stat(local)
+        content_hash = dropbox_content_hash(local)
+        modified = datetime.utcfromtimestamp(int(stat.st_mtime))
+        return files.FileMetadata(
+            name=os.path.basename(local),
+            id=f"id:{content_hash[:16]}",
+            client_modified=modified,
+            server_modified=modified,
+            rev=content_hash[:16],
+            size=stat.st_size,
+            path_lower=path.lower(),
+            path_display=path,
+            content_hash=content_hash
+        )
+
+    def _page(self, path, start):
+        names = sorted(os.listdir(self._local(path)))
+        page = names[start:start + self.page_size]
+        entries = [self._metadata(f"{path.rstrip('/')}/{name}") for name in page]
+        end = start + len(page)
+        return files.ListFolderResult(entries=entries, cursor=f"{path}|{end}",
+                                      has_more=end < len(names))
+
+    def files_list_folder(self, path, recursive=False, **kwargs):
+        self._wait()
+        return self._page(path, 0)
+
+    def files_list_folder_continue(self, cursor):
+        self._wait()
+        path, _, start = cursor.rpartition('|')
+        return self._page(path, int(start))
+
+    def files_get_metadata(self, path, **kwargs):
+        self._wait()
+        return self._metadata(path)
+
+    def files_download(self, path, rev=None):
+        self._wait()
+        metadata = self._metadata(path)
+        offset = 0
+        if 'Range' in self._headers:
+            offset = int(self._headers['Range'].split('=')[1].rstrip('-'))
+        return metadata, _FakeResponse(self._local(path), offset, self.bandwidth)
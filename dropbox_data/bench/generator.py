@@ -0,0 +1,117 @@
+import os
+import numpy as np
+import pandas as pd
+from dropbox_data.config import CSV_DELIMITER
+from dropbox_data.utils.date_extractor import DATETIME_FORMAT
+
+# Colunas dos CSVs exportados pelo scraper
+COLUMNS = [
+    'post_id',
+    'profile',
+    'post_url',
+    'post_text',
+    'post_likes',
+    'post_comments',
+    'post_visualizations',
+    'followers',
+    'post_video_visualizations',
+    'post_extracted_datetime'
+]
+
+def _format_count(values: np.ndarray, rng: np.random.Generator, messy_ratio: float) -> np.ndarray:
+    """
+    Formata contagens como o scraper as exporta.
+
+    Uma fração messy_ratio recebe formatos abreviados ou com texto ('1,2 mil',
+    '3.4M', '1.234 curtidas'); as demais ficam só com dígitos.
+    """
+    result = values.astype(str).astype(object)
+    messy = rng.random(len(values)) < messy_ratio
+    styles = rng.integers(0, 5, len(values))
+    for index in np.flatnonzero(messy):
+        value = int(values[index])
+        style = styles[index]
+        if style == 0 and value >= 1000:
+            result[index] = f"{value / 1000:.1f} mil".replace('.', ',')
+        elif style == 1 and value >= 1000:
+            result[index] = f"{value / 1000:.1f}k"
+        elif style == 2 and value >= 1_000_000:
+            result[index] = f"{value / 1_000_000:.1f}M"
+        elif style == 3:
+            result[index] = f"{value:,}".replace(',', '.') + " curtidas"
+        else:
+            result[index] = f"{value:,}".replace(',', '.')
+    return result
+
+def generate_posts(rows: int, snapshots_per_post: int = 5, messy_ratio: float = 0.3,
+                   null_ratio: float = 0.02, seed: int = 0, first_post_id: int = 0) -> pd.DataFrame:
+    """
+    Gera snapshots sintéticos de posts no formato dos CSVs do Dropbox.
+
+    Cada post aparece em snapshots_per_post extrações (em média), com contagens
+    crescentes entre extrações e datas no formato dd/mm/aaaa HH:MM:SS.
+
+    Args:
+        rows (int): Número de linhas
+        snapshots_per_post (int): Média de extrações por post
+        messy_ratio (float): Fração de contagens em formato abreviado/texto
+        null_ratio (float): Fração de contagens vazias
+        seed (int): Semente do gerador aleatório
+        first_post_id (int): Deslocamento dos post_ids (controla a sobreposição entre arquivos)
+
+    Returns:
+        pd.DataFrame: Linhas com as colunas de COLUMNS, como texto
+    """
+    rng = np.random.default_rng(seed)
+    num_posts = max(rows // max(snapshots_per_post, 1), 1)
+    post_ids = first_post_id + rng.integers(0, num_posts, rows)
+    profiles = np.array([f"perfil_{i}" for i in range(max(num_posts // 20, 1))])
+
+    # Extrações a partir de uma data base por post, em horas
+    base = pd.Timestamp('2024-01-01') + pd.to_timedelta(post_ids % 90, unit='D')
+    extracted = base + pd.to_timedelta(rng.integers(0, 24 * 30, rows), unit='h')
+    growth = 1 + np.asarray((extracted - base) / pd.Timedelta(days=30))
+
+    df = pd.DataFrame({
+        'post_id': post_ids,
+        'profile': profiles[post_ids % len(profiles)],
+        'post_url': [f"https://www.instagram.com/p/{post_id:x}/" for post_id in post_ids],
+        'post_text': rng.choice(['Confira a novidade!', 'Promoção; só hoje', 'Texto com "aspas"',
+                                 'Lançamento\ncom quebra de linha', ''], rows),
+    })
+    scales = {
+        'post_likes': 50_000,
+        'post_comments': 2_000,
+        'post_visualizations': 500_000,
+        'followers': 5_000_000,
+        'post_video_visualizations': 2_000_000,
+    }
+    for column, scale in scales.items():
+        counts = (rng.pareto(1.5, rows) * scale / 10 * growth).astype(np.int64)
+        values = _format_count(counts, rng, messy_ratio)
+        values[rng.random(rows) < null_ratio] = ''
+        df[column] = values
+    df['post_extracted_datetime'] = extracted.strftime(DATETIME_FORMAT).to_numpy()
+    return df[COLUMNS]
+
+def write_dataset(directory: str, files: int, rows_per_file: int, snapshots_per_post: int = 5,
+                  messy_ratio: float = 0.3, seed: int = 0) -> list:
+    """
+    Grava files CSVs sintéticos em directory, como numa pasta do Dropbox.
+
+    Arquivos consecutivos compartilham metade dos posts, para que o merge e o
+    wrangling encontrem posts com extrações em arquivos diferentes.
+
+    Returns:
+        list: Caminhos dos arquivos gravados
+    """
+    os.makedirs(directory, exist_ok=True)
+    num_posts = max(rows_per_file // max(snapshots_per_post, 1), 1)
+    paths = []
+    for index in range(files):
+        df = generate_posts(rows_per_file, snapshots_per_post, messy_ratio, seed=seed + index,
+                            first_post_id=index * num_posts // 2)
+        path = os.path.join(directory, f"posts_{index:04d}.csv")
+        df.to_csv(path, sep=CSV_DELIMITER, index=False, encoding='utf-8-sig')
+        paths.append(path)
+    return paths
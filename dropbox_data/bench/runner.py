@@ -0,0 +1,268 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+from dataclasses import dataclass, asdict
+from dropbox_data.config import STORAGE_FORMAT, SQLITE_PATH
+from dropbox_data.bench.generator import generate_posts, write_dataset
+from dropbox_data.bench.fake_dropbox import LocalDropbox
+from dropbox_data.utils.metrics import peak_rss_mb
+
+logger = logging.getLogger(__name__)
+
+# Pasta "remota" servida pelo LocalDropbox (não depende de PATH_DROPBOX)
+BENCH_DROPBOX_PATH = '/bench'
+
+@dataclass
+class StageResult:
+    """Medições de um estágio do benchmark"""
+    seconds: float
+    rows: int = 0
+    bytes: int = 0
+    peak_rss_mb: float = None
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    @property
+    def mb_per_second(self):
+        return self.bytes / 1024 / 1024 / self.seconds if self.seconds else 0.0
+
+class BenchmarkRunner:
+    """
+    Executa o pipeline sobre dados sintéticos e um Dropbox local.
+
+    Os dados são gerados em workdir/dropbox e servidos por LocalDropbox com a
+    latência e a banda configuradas; o pipeline roda dentro de workdir, e os
+    datasets e arquivos de estado (bench_path) são criados ali, qualquer que
+    seja a configuração. O cache do pipeline é desativado para que cada
+    execução meça o trabalho completo.
+    """
+
+    def __init__(self, workdir, files=20, rows_per_file=50000, snapshots_per_post=5,
+                 messy_ratio=0.3, latency=0.05, bandwidth_mb_s=None, chunk_size=100000,
+                 streaming=False, micro_rows=200000, repeat=3):
+        self.workdir = os.path.abspath(workdir)
+        self.files = files
+        self.rows_per_file = rows_per_file
+        self.snapshots_per_post = snapshots_per_post
+        self.messy_ratio = messy_ratio
+        self.latency = latency
+        self.bandwidth = bandwidth_mb_s * 1024 * 1024 if bandwidth_mb_s else None
+        self.chunk_size = chunk_size
+        self.streaming = streaming
+        self.micro_rows = micro_rows
+        self.repeat = repeat
+        self.results = {}
+
+    def bench_path(self, *parts):
+        """Caminho dentro de workdir/src, onde ficam os datasets e o estado do benchmark"""
+        return os.path.join(self.workdir, 'src', *parts)
+
+    def _stage(self, name, func, rows=0, size=0):
+        """Executa func como um estágio e registra tempo, volume e pico de memória"""
+        logger.info(f"Benchmark: estágio {name}")
+        start = time.perf_counter()
+        value = func()
+        seconds = time.perf_counter() - start
+        self.results[name] = StageResult(seconds, rows, size, peak_rss_mb())
+        return value
+
+    def _micro(self, name, func, df):
+        """Mede func sobre cópias de df, guardando a melhor de self.repeat execuções"""
+        best = None
+        for _ in range(self.repeat):
+            data = df.copy()
+            start = time.perf_counter()
+            func(data)
+            seconds = time.perf_counter() - start
+            best = seconds if best is None else min(best, seconds)
+        self.results[name] = StageResult(best, len(df), 0, peak_rss_mb())
+
+    def run_pipeline(self):
+        """Mede listagem, download, merge e wrangling (ou o pipeline em streaming)"""
+        from dropbox_data.extract.dropbox_download import DropboxDownloader
+        from dropbox_data.wrangling.dataframes import process_csv_file
+        from dropbox_data.pipeline import StreamingPipeline
+        from dropbox_data.utils.cache import get_pipeline_cache
+
+        if STORAGE_FORMAT.lower() == 'sqlite' and os.path.isabs(SQLITE_PATH):
+            # O banco SQLite é o mesmo de SQLITE_PATH, fora de workdir
+            raise ValueError("Com STORAGE_FORMAT=sqlite, o benchmark requer um SQLITE_PATH "
+                             "relativo (criado dentro do diretório de trabalho)")
+
+        get_pipeline_cache().backend = None
+        data_path = self.bench_path('csv_files', 'data.csv')
+        output_path = self.bench_path('csv_files', 'final_data.csv')
+        source_dir = os.path.join(self.workdir, 'dropbox')
+        remote_dir = os.path.join(source_dir, BENCH_DROPBOX_PATH.strip('/'))
+        total_rows = self.files * self.rows_per_file
+
+        paths = self._stage('generate', lambda: write_dataset(
+            remote_dir, self.files, self.rows_per_file, self.snapshots_per_post,
+            self.messy_ratio
+        ), rows=total_rows)
+        total_bytes = sum(os.path.getsize(path) for path in paths)
+
+        client = LocalDropbox(source_dir, latency=self.latency, bandwidth=self.bandwidth)
+        downloader = DropboxDownloader(
+            client=client, dropbox_path=BENCH_DROPBOX_PATH, data_path=data_path,
+            temp_dir=self.bench_path('temp_downloads'),
+            listing_state_path=self.bench_path('csv_files', 'listing_state.json'),
+            dedup_index_path=self.bench_path('csv_files', 'merge_fingerprints.sqlite')
+        )
+        entries, _ = self._stage('list', downloader.listing.sync)
+        dropbox_paths = sorted(entries)
+
+        if self.streaming:
+            pipeline = StreamingPipeline(downloader, output_path, self.chunk_size)
+            self._stage('streaming', lambda: pipeline.run(dropbox_paths),
+                        rows=total_rows, size=total_bytes)
+        else:
+            self._stage('download', lambda: downloader.download_files(dropbox_paths),
+                        size=total_bytes)
+            self._stage('merge', downloader.merge_files, rows=total_rows, size=total_bytes)
+            self._stage('wrangle', lambda: process_csv_file(
+                data_path, output_path, self.chunk_size
+            ), rows=total_rows)
+        downloader.cleanup()
+
+    def run_micro(self):
+        """Mede as funções de transformação sobre um DataFrame em memória"""
+        from dropbox_data.utils.date_extractor import extract_base_time
+        from dropbox_data.utils.numbers_formatters import format_numeric_columns
+        from dropbox_data.wrangling.dataframes import wrangle_dataframe
+
+        df = generate_posts(self.micro_rows, self.snapshots_per_post, self.messy_ratio, seed=42)
+        self._micro('extract_base_time', extract_base_time, df)
+        self._micro('format_numeric_columns', format_numeric_columns, df)
+        self._micro('wrangle_dataframe', wrangle_dataframe, df)
+
+    def run(self):
+        """Executa todos os estágios dentro de workdir e retorna os resultados"""
+        cwd = os.getcwd()
+        os.makedirs(self.workdir, exist_ok=True)
+        os.chdir(self.workdir)
+        try:
+            self.run_pipeline()
+            self.run_micro()
+        finally:
+            os.chdir(cwd)
+        return self.results
+
+    def to_dict(self):
+        return {
+            'params': {
+                'files': self.files,
+                'rows_per_file': self.rows_per_file,
+                'snapshots_per_post': self.snapshots_per_post,
+                'messy_ratio': self.messy_ratio,
+                'latency': self.latency,
+                'chunk_size': self.chunk_size,
+                'streaming': self.streaming,
+                'micro_rows': self.micro_rows,
+            },
+            'stages': {name: asdict(result) for name, result in self.results.items()},
+        }
+
+def compare_with_baseline(current, baseline, tolerance=0.2):
+    """
+    Compara os tempos de cada estágio com a baseline.
+
+    Returns:
+        list: (estágio, segundos atuais, segundos da baseline, razão, regrediu)
+    """
+    rows = []
+    for name, stage in current['stages'].items():
+        base = baseline.get('stages', {}).get(name)
+        if not base or not base['seconds']:
+            continue
+        ratio = stage['seconds'] / base['seconds']
+        rows.append((name, stage['seconds'], base['seconds'], ratio, ratio > 1 + tolerance))
+    return rows
+
+def format_report(runner, comparison=None):
+    lines = [f"{'estágio':<24}{'tempo (s)':>10}{'linhas/s':>12}{'MB/s':>9}{'pico RSS (MB)':>15}"]
+    for name, result in runner.results.items():
+        rss = f"{result.peak_rss_mb:.0f}" if result.peak_rss_mb is not None else '-'
+        lines.append(f"{name:<24}{result.seconds:>10.3f}{result.rows_per_second:>12.0f}"
+                     f"{result.mb_per_second:>9.2f}{rss:>15}")
+    if comparison:
+        lines.append('')
+        lines.append(f"{'estágio':<24}{'atual':>10}{'baseline':>10}{'razão':>8}")
+        for name, seconds, base, ratio, regressed in comparison:
+            flag = '  REGRESSÃO' if regressed else ''
+            lines.append(f"{name:<24}{seconds:>10.3f}{base:>10.3f}{ratio:>8.2f}{flag}")
+    return '\n'.join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline com dados sintéticos")
+    parser.add_argument('--files', type=int, default=20)
+    parser.add_argument('--rows-per-file', type=int, default=50000)
+    parser.add_argument('--snapshots-per-post', type=int, default=5)
+    parser.add_argument('--messy-ratio', type=float, default=0.3)
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help="Latência por chamada ao Dropbox local, em segundos")
+    parser.add_argument('--bandwidth', type=float, default=None,
+                        help="Banda de download simulada, em MB/s")
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    parser.add_argument('--streaming', action='store_true',
+                        help="Mede o pipeline em streaming em vez das etapas em sequência")
+    parser.add_argument('--micro-rows', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workdir', default=None,
+                        help="Diretório de trabalho (padrão: temporário, removido ao final)")
+    parser.add_argument('--baseline', default='bench_baseline.json')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--output', default=None, help="Grava os resultados em JSON")
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args(argv)
+
+    baseline_path = os.path.abspath(args.baseline)
+    workdir = args.workdir or tempfile.mkdtemp(prefix='dropbox_data_bench_')
+    runner = BenchmarkRunner(
+        workdir, files=args.files, rows_per_file=args.rows_per_file,
+        snapshots_per_post=args.snapshots_per_post, messy_ratio=args.messy_ratio,
+        latency=args.latency, bandwidth_mb_s=args.bandwidth, chunk_size=args.chunk_size,
+        streaming=args.streaming, micro_rows=args.micro_rows, repeat=args.repeat
+    )
+    try:
+        runner.run()
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    current = runner.to_dict()
+
+    comparison = None
+    if os.path.exists(baseline_path) and not args.save_baseline:
+        with open(baseline_path, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('params') != current['params']:
+            logger.warning("Parâmetros diferentes dos da baseline; "
+                           "comparação pode não ser válida")
+        comparison = compare_with_baseline(current, baseline, args.tolerance)
+
+    print(format_report(runner, comparison))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+    if args.save_baseline:
+        with open(baseline_path, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"\nBaseline salva em {baseline_path}")
+
+    if args.fail_on_regression and comparison and any(row[-1] for row in comparison):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sys.exit(main())
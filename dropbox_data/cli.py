@@ -0,0 +1,284 @@
+import os
+import sys
+import json
+import logging
+import argparse
+from datetime import datetime
+from dropbox_data.config import (
+    CSV_OUTPUT_PATH,
+    PROCESSED_OUTPUT_PATH,
+    PROCESSED_STATE_PATH,
+    TEMP_DOWNLOAD_PATH,
+    METRICS_JSON_PATH,
+    STORAGE_FORMAT,
+    SQLITE_PATH,
+    RUN_MANIFEST_PATH,
+    OUTPUT_PARTITION_BY
+)
+
+logger = logging.getLogger(__name__)
+
+# Unidade da posição do último checkpoint do processamento (ver process_csv_file)
+WRANGLE_UNITS = {
+    'chunks': 'chunks processados',
+    'rows': 'linhas lidas',
+    'partitions': 'partições processadas',
+}
+
+# Os módulos do pipeline (pandas, SDK do Dropbox, credenciais) são importados
+# dentro de cada comando, para que status e --help iniciem rapidamente
+
+def _path_info(path):
+    """Tamanho e data de modificação de um arquivo (ou diretório de partições)"""
+    if not os.path.exists(path):
+        return None
+    if os.path.isdir(path):
+        size = sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(path) for name in names)
+    else:
+        size = os.path.getsize(path)
+    modified = datetime.fromtimestamp(os.path.getmtime(path))
+    return {'path': path, 'size_mb': round(size / 1024 / 1024, 2),
+            'modified_at': modified.isoformat(timespec='seconds')}
+
+def _processed_output_info():
+    """_path_info da saída processada, com o número de partições se particionada"""
+    if not OUTPUT_PARTITION_BY or STORAGE_FORMAT == 'sqlite':
+        return _path_info(PROCESSED_OUTPUT_PATH)
+    path = os.path.splitext(PROCESSED_OUTPUT_PATH)[0]
+    info = _path_info(path)
+    manifest_path = os.path.join(path, '_manifest.json')
+    if info and os.path.exists(manifest_path):
+        with open(manifest_path, 'r') as f:
+            info['partitions'] = len(json.load(f).get('partitions', {}))
+    return info
+
+def _size(value):
+    """Tamanho em bytes, com sufixo opcional K, M ou G (ex.: 512M)"""
+    units = {'K': 2**10, 'M': 2**20, 'G': 2**30}
+    size = value.strip().upper().rstrip('B')
+    try:
+        if size and size[-1] in units:
+            return int(float(size[:-1]) * units[size[-1]])
+        return int(size)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"tamanho inválido: {value}")
+
+def _last_run():
+    """Resumo do relatório de métricas da última execução"""
+    if not METRICS_JSON_PATH or not os.path.exists(METRICS_JSON_PATH):
+        return None
+    with open(METRICS_JSON_PATH, 'r') as f:
+        report = json.load(f)
+    stages = report.get('stages', {})
+    return {
+        'status': report.get('status'),
+        'started_at': report.get('started_at'),
+        'finished_at': report.get('finished_at'),
+        'peak_rss_mb': report.get('peak_rss_mb'),
+        'rows_written': sum(stage.get('rows_out', 0) for name, stage in stages.items()
+                            if name in ('process_csv_file', 'streaming_pipeline')),
+    }
+
+def collect_status():
+    """Estado do pipeline a partir dos arquivos locais, sem acessar o Dropbox"""
+    from dropbox_data.extract.file_state import read_state_summary
+    from dropbox_data.utils.run_manifest import read_manifest_summary
+
+    pending = []
+    if os.path.isdir(TEMP_DOWNLOAD_PATH):
+        pending = [name for name in os.listdir(TEMP_DOWNLOAD_PATH) if not name.endswith('.part')]
+    return {
+        'processed_files': read_state_summary(PROCESSED_STATE_PATH),
+        'merged_dataset': _path_info(SQLITE_PATH if STORAGE_FORMAT == 'sqlite'
+                                     else CSV_OUTPUT_PATH),
+        'processed_output': _processed_output_info(),
+        'pending_downloads': len(pending),
+        'last_run': _last_run(),
+        'run_manifest': read_manifest_summary(RUN_MANIFEST_PATH),
+    }
+
+def check_health(status, max_age_hours):
+    """
+    Verifica se a última execução terminou sem erro há no máximo max_age_hours horas.
+
+    Returns:
+        str | None: Motivo da falha, ou None se saudável
+    """
+    last_run = status['last_run']
+    if not last_run or not last_run.get('finished_at'):
+        return "nenhuma execução registrada"
+    if last_run.get('status') == 'error':
+        return "a última execução terminou com erro"
+    age = datetime.now() - datetime.fromisoformat(last_run['finished_at'])
+    if max_age_hours is not None and age.total_seconds() > max_age_hours * 3600:
+        return f"última execução há {age.total_seconds() / 3600:.1f} horas"
+    return None
+
+def format_status(status):
+    lines = []
+    state = status['processed_files']
+    if state:
+        lines.append(f"Arquivos processados: {state['files']} "
+                     f"(último registro: {state['last_processed_at'] or '-'})")
+    else:
+        lines.append("Arquivos processados: nenhum registro")
+    for key, label in (('merged_dataset', 'Dataset mesclado'),
+                       ('processed_output', 'Saída processada')):
+        info = status[key]
+        if info:
+            partitions = (f", {info['partitions']} partições" if 'partitions' in info else '')
+            lines.append(f"{label}: {info['path']} ({info['size_mb']:.2f} MB{partitions}, "
+                         f"modificado em {info['modified_at']})")
+        else:
+            lines.append(f"{label}: inexistente")
+    lines.append(f"Downloads pendentes de merge: {status['pending_downloads']}")
+    last_run = status['last_run']
+    if last_run:
+        lines.append(f"Última execução: {last_run['status'] or '-'}, "
+                     f"terminada em {last_run['finished_at']}, "
+                     f"{last_run['rows_written']} registros gravados")
+    else:
+        lines.append("Última execução: nenhuma")
+    manifest = status['run_manifest']
+    if manifest and manifest['status'] != 'completed':
+        wrangle = manifest['wrangle'] or {'position': 0}
+        unit = WRANGLE_UNITS[wrangle.get('unit', 'chunks')]
+        lines.append(f"Execução {manifest['run_id']} não concluída ({manifest['status']}, "
+                     f"etapa {manifest['stage']}): {manifest['files_merged']}/"
+                     f"{manifest['files']} arquivos mesclados, "
+                     f"{wrangle['position']} {unit}; "
+                     "retome com start_app run --resume")
+    return '\n'.join(lines)
+
+def cmd_run(args):
+    from dropbox_data import run_pipeline
+
+    run_pipeline(chunk_size=args.chunk_size, resume=args.resume,
+                 memory_budget=args.memory_budget)
+    return 0
+
+def cmd_sync(args):
+    from dropbox_data.main import sync_data
+
+    if not sync_data():
+        print("Nenhum arquivo novo ou modificado")
+    return 0
+
+def cmd_merge(args):
+    from dropbox_data.main import merge_data
+
+    merge_data()
+    return 0
+
+def cmd_wrangle(args):
+    from dropbox_data.main import wrangle_data
+
+    columns = [column.strip() for column in args.columns.split(',')] if args.columns else None
+    wrangle_data(chunk_size=args.chunk_size, columns=columns, resume=args.resume,
+                 memory_budget=args.memory_budget)
+    return 0
+
+def cmd_export(args):
+    from dropbox_data.main import export_data
+
+    total = export_data(output_path=args.output, storage_format=args.format,
+                        chunk_size=args.chunk_size, start=args.start, end=args.end)
+    print(f"{total} registros exportados")
+    return 0
+
+def cmd_status(args):
+    status = collect_status()
+    problem = check_health(status, args.max_age) if args.max_age is not None else None
+    if args.json:
+        print(json.dumps({**status, 'healthy': problem is None}, indent=2))
+    else:
+        print(format_status(status))
+        if problem:
+            print(f"Saúde: falha ({problem})")
+    return 1 if problem else 0
+
+def cmd_bench(args):
+    from dropbox_data.bench.runner import main as bench_main
+
+    return bench_main(args.bench_args)
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='start_app',
+        description="Download, merge e processamento dos CSVs do Dropbox. "
+                    "Sem comando, executa o pipeline completo (run)."
+    )
+    commands = parser.add_subparsers(dest='command', metavar='comando')
+
+    run = commands.add_parser('run', help="Pipeline completo: sincroniza, mescla e processa")
+    run.add_argument('--chunk-size', type=int, default=100000)
+    run.add_argument('--resume', action='store_true',
+                     help="Retoma a última execução interrompida do último checkpoint")
+    run.add_argument('--memory-budget', type=_size, default=None, metavar='BYTES',
+                     help="Orçamento de memória do processamento, ex.: 512M "
+                          "(padrão WRANGLE_MEMORY_BUDGET)")
+    run.set_defaults(func=cmd_run)
+
+    sync = commands.add_parser('sync', help="Baixa e mescla os arquivos novos ou modificados")
+    sync.set_defaults(func=cmd_sync)
+
+    merge = commands.add_parser('merge', help="Mescla os arquivos já baixados (sem credenciais)")
+    merge.set_defaults(func=cmd_merge)
+
+    wrangle = commands.add_parser('wrangle',
+                                  help="Processa o dataset mesclado (sem credenciais)")
+    wrangle.add_argument('--chunk-size', type=int, default=100000)
+    wrangle.add_argument('--columns', default=None,
+                         help="Colunas a ler, separadas por vírgula (padrão INGEST_COLUMNS)")
+    wrangle.add_argument('--resume', action='store_true',
+                         help="Continua um processamento interrompido do último chunk confirmado")
+    wrangle.add_argument('--memory-budget', type=_size, default=None, metavar='BYTES',
+                         help="Orçamento de memória, ex.: 512M; ajusta o tamanho dos chunks "
+                              "(padrão WRANGLE_MEMORY_BUDGET)")
+    wrangle.set_defaults(func=cmd_wrangle)
+
+    export = commands.add_parser('export',
+                                 help="Exporta o resultado do banco SQLite (STORAGE_FORMAT=sqlite) "
+                                      "ou um intervalo da saída particionada")
+    export.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    export.add_argument('--output', default=None,
+                        help="Arquivo de saída (padrão PROCESSED_OUTPUT_PATH)")
+    export.add_argument('--chunk-size', type=int, default=100000)
+    export.add_argument('--start', default=None, metavar='DATA',
+                        help="Data inicial (saída particionada, OUTPUT_PARTITION_BY)")
+    export.add_argument('--end', default=None, metavar='DATA',
+                        help="Data final (saída particionada, OUTPUT_PARTITION_BY)")
+    export.set_defaults(func=cmd_export)
+
+    status = commands.add_parser('status', help="Estado local do pipeline (sem credenciais)")
+    status.add_argument('--json', action='store_true', help="Saída em JSON")
+    status.add_argument('--max-age', type=float, default=None, metavar='HORAS',
+                        help="Retorna 1 se a última execução falhou ou é mais antiga que HORAS")
+    status.set_defaults(func=cmd_status)
+
+    bench = commands.add_parser('bench', add_help=False,
+                                help="Benchmark com dados sintéticos (opções: bench --help)")
+    bench.add_argument('bench_args', nargs=argparse.REMAINDER)
+    bench.set_defaults(func=cmd_bench)
+    return parser
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser = build_parser()
+    if argv[:1] == ['bench']:
+        # Todas as opções seguintes, inclusive --help, são do benchmark
+        args = argparse.Namespace(command='bench', func=cmd_bench, bench_args=argv[1:])
+    else:
+        args = parser.parse_args(argv)
+    if args.command is None:
+        args = parser.parse_args(['run'])
+    try:
+        return args.func(args)
+    except Exception as e:
+        logger.error(f"Erro no comando {args.command}: {e}")
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,4 @@
-from decouple import config
+from decouple import config, Csv
 
 # Debug variables
 DEBUG: bool = config("DEBUG", default=False, cast=bool)
@@ -7,12 +7,117 @@ DEBUG_ID: str = config("DEBUG_ID", default="", cast=str)
 CSV_DELIMITER: str = config("CSV_DELIMITER", default=";", cast=str)
 CSV_OUTPUT_PATH: str = config("CSV_OUTPUT_PATH", cast=str, default="src/csv_files/data.csv")
 TEMP_DOWNLOAD_PATH: str = config("TEMP_DOWNLOAD_PATH", cast=str, default="src/temp_downloads")
+PROCESSED_OUTPUT_PATH: str = config(
+    "PROCESSED_OUTPUT_PATH", cast=str, default="src/csv_files/final_data.csv"
+)
+
+# Storage variables: "csv", "parquet" ou "sqlite"
+STORAGE_FORMAT: str = config("STORAGE_FORMAT", default="csv", cast=str)
+# Banco usado com STORAGE_FORMAT=sqlite (uma tabela por dataset, mais as views)
+SQLITE_PATH: str = config("SQLITE_PATH", cast=str, default="src/csv_files/dropbox_data.sqlite")
+EXPORT_CSV: bool = config("EXPORT_CSV", default=False, cast=bool)
+# Particiona a saída processada por dia desta coluna ("base_time" ou
+# "post_extracted_datetime"), num diretório com o nome de PROCESSED_OUTPUT_PATH sem extensão
+OUTPUT_PARTITION_BY: str = config("OUTPUT_PARTITION_BY", default="", cast=str)
+PROCESSED_STATE_PATH: str = config(
+    "PROCESSED_STATE_PATH", cast=str, default="src/csv_files/processed_files.sqlite"
+)
+# Registro antigo (caminho,rev por linha), importado uma vez para PROCESSED_STATE_PATH
+LEGACY_PROCESSED_FILES_PATH: str = config(
+    "LEGACY_PROCESSED_FILES_PATH", cast=str, default="src/csv_files/processed_files.txt"
+)
+LISTING_STATE_PATH: str = config(
+    "LISTING_STATE_PATH", cast=str, default="src/csv_files/listing_state.json"
+)
+LIST_RECURSIVE: bool = config("LIST_RECURSIVE", default=False, cast=bool)
+
+# Download variables
+DOWNLOAD_WORKERS: int = config("DOWNLOAD_WORKERS", default=8, cast=int)
+DOWNLOAD_MAX_RETRIES: int = config("DOWNLOAD_MAX_RETRIES", default=3, cast=int)
+DOWNLOAD_BACKOFF_SECONDS: float = config("DOWNLOAD_BACKOFF_SECONDS", default=1.0, cast=float)
+DOWNLOAD_CHUNK_SIZE: int = config("DOWNLOAD_CHUNK_SIZE", default=4 * 1024 * 1024, cast=int)
+DOWNLOAD_RESUME_THRESHOLD: int = config(
+    "DOWNLOAD_RESUME_THRESHOLD", default=64 * 1024 * 1024, cast=int
+)
+
+# Dropbox client variables
+# Tamanho do pool de conexões HTTP compartilhado (>= DOWNLOAD_WORKERS)
+DROPBOX_MAX_CONNECTIONS: int = config("DROPBOX_MAX_CONNECTIONS", default=16, cast=int)
+# Antecedência, em segundos, com que o token é renovado antes de expirar
+DROPBOX_TOKEN_REFRESH_MARGIN: int = config("DROPBOX_TOKEN_REFRESH_MARGIN", default=600, cast=int)
+
+# Merge variables
+MERGE_INCREMENTAL: bool = config("MERGE_INCREMENTAL", default=True, cast=bool)
+MERGE_CHUNK_SIZE: int = config("MERGE_CHUNK_SIZE", default=100000, cast=int)
+# Descarta no merge as linhas já gravadas (mesma impressão digital de 64 bits)
+MERGE_DEDUP: bool = config("MERGE_DEDUP", default=True, cast=bool)
+# Colunas que identificam uma linha repetida; vazio compara a linha inteira
+MERGE_DEDUP_COLUMNS: list = config("MERGE_DEDUP_COLUMNS", default="", cast=Csv())
+MERGE_DEDUP_INDEX_PATH: str = config(
+    "MERGE_DEDUP_INDEX_PATH", cast=str, default="src/csv_files/merge_fingerprints.sqlite"
+)
+
+# Ingestion variables
+# Colunas lidas no processamento (vazio = todas); post_id e post_extracted_datetime sempre entram
+INGEST_COLUMNS: list = config("INGEST_COLUMNS", default="", cast=Csv())
+# Colunas de texto repetitivo lidas como category, além das conhecidas (utils/schema.py)
+SCHEMA_CATEGORY_COLUMNS: list = config("SCHEMA_CATEGORY_COLUMNS", default="", cast=Csv())
+# Engine de leitura de CSV: auto (pyarrow, depois polars), pyarrow, polars ou c (pandas)
+CSV_ENGINE: str = config("CSV_ENGINE", default="auto")
+# Arquivos lidos em paralelo no merge
+CSV_READ_WORKERS: int = config("CSV_READ_WORKERS", default=4, cast=int)
+
+# Wrangling variables
+# Número de partições por post_id no processamento em duas passadas (0 = por chunk)
+WRANGLE_PARTITIONS: int = config("WRANGLE_PARTITIONS", default=0, cast=int)
+# Número de processos usados para processar chunks/partições em paralelo
+WRANGLE_WORKERS: int = config("WRANGLE_WORKERS", default=1, cast=int)
+# Orçamento de memória do processamento em bytes: ajusta o tamanho dos chunks (0 = chunks fixos)
+WRANGLE_MEMORY_BUDGET: int = config("WRANGLE_MEMORY_BUDGET", default=0, cast=int)
+
+# Pipeline variables
+# Sobrepõe download, leitura e processamento (requer merge incremental e WRANGLE_PARTITIONS=0)
+PIPELINE_STREAMING: bool = config("PIPELINE_STREAMING", default=True, cast=bool)
+# Itens em espera entre um estágio e o seguinte (arquivos baixados / lotes lidos)
+PIPELINE_QUEUE_SIZE: int = config("PIPELINE_QUEUE_SIZE", default=4, cast=int)
+
+# Manifesto da execução (etapas, arquivos e checkpoints), usado para retomá-la (--resume)
+RUN_MANIFEST_PATH: str = config(
+    "RUN_MANIFEST_PATH", cast=str, default="src/csv_files/run_manifest.json"
+)
+
+# Cache variables: CACHE_BACKEND pode ser "disk", "memory", "redis" ou "none"
+CACHE_BACKEND: str = config("CACHE_BACKEND", default="none", cast=str)
+CACHE_DIR: str = config("CACHE_DIR", default="src/cache", cast=str)
+CACHE_MAX_BYTES: int = config("CACHE_MAX_BYTES", default=1024 * 1024 * 1024, cast=int)
+CACHE_TTL_SECONDS: int = config("CACHE_TTL_SECONDS", default=7 * 24 * 3600, cast=int)
+REDIS_URL: str = config("REDIS_URL", default="redis://localhost:6379/0", cast=str)
+
+# Metrics variables (caminho vazio desativa a exportação)
+METRICS_JSON_PATH: str = config(
+    "METRICS_JSON_PATH", default="src/metrics/run_report.json", cast=str
+)
+METRICS_PROMETHEUS_PATH: str = config(
+    "METRICS_PROMETHEUS_PATH", default="src/metrics/dropbox_data.prom", cast=str
+)
+# Com DEBUG, perfil de CPU (cProfile) e de memória (tracemalloc) da execução
+PROFILE_DIR: str = config("PROFILE_DIR", default="src/metrics", cast=str)
 
 # External API variables
-DROPBOX_APP_KEY: str = config("DROPBOX_APP_KEY", cast=str)
-DROPBOX_APP_SECRET: str = config("DROPBOX_APP_SECRET", cast=str)
-DROPBOX_REFRESH_TOKEN: str = config("DROPBOX_REFRESH_TOKEN", cast=str)
-PATH_DROPBOX: str = config("PATH_DROPBOX", cast=str)
+# Obrigatórias, mas lidas só quando usadas (ver __getattr__): comandos que não
+# acessam o Dropbox (status, wrangle, bench) funcionam sem elas
+DROPBOX_APP_KEY: str
+DROPBOX_APP_SECRET: str
+DROPBOX_REFRESH_TOKEN: str
+PATH_DROPBOX: str
+_LAZY_VARIABLES = ("DROPBOX_APP_KEY", "DROPBOX_APP_SECRET", "DROPBOX_REFRESH_TOKEN", "PATH_DROPBOX")
+
+def __getattr__(name):
+    if name in _LAZY_VARIABLES:
+        value = config(name, cast=str)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Logging configuration
 LOG_LEVEL: str = config("LOG_LEVEL", default="INFO", cast=str)
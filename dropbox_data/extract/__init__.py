@@ -1,3 +1,9 @@
-from dropbox_data.extract.dropbox_download import DropboxDownloader, extract_data
-
 __all__ = ["DropboxDownloader", "extract_data"]
+
+def __getattr__(name):
+    # Importação sob demanda: extract.file_state pode ser usado (ex.: pelo
+    # comando status) sem carregar pandas e o SDK do Dropbox
+    if name in __all__:
+        from dropbox_data.extract import dropbox_download
+        return getattr(dropbox_download, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
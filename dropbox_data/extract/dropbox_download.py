@@ -1,133 +1,548 @@
 import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
 import pandas as pd
 from dropbox import Dropbox
-from dropbox.exceptions import ApiError
+from dropbox.exceptions import ApiError, AuthError, BadInputError, RateLimitError
 from dropbox_data.config import (
-    PATH_DROPBOX, 
-    CSV_DELIMITER, 
     CSV_OUTPUT_PATH, 
-    TEMP_DOWNLOAD_PATH
+    TEMP_DOWNLOAD_PATH,
+    LISTING_STATE_PATH,
+    LIST_RECURSIVE,
+    DOWNLOAD_WORKERS,
+    DOWNLOAD_MAX_RETRIES,
+    DOWNLOAD_BACKOFF_SECONDS,
+    DOWNLOAD_CHUNK_SIZE,
+    DOWNLOAD_RESUME_THRESHOLD,
+    MERGE_INCREMENTAL,
+    MERGE_CHUNK_SIZE,
+    MERGE_DEDUP,
+    MERGE_DEDUP_COLUMNS,
+    MERGE_DEDUP_INDEX_PATH
 )
+from dropbox_data.extract.folder_listing import FolderListing
+from dropbox_data.extract.file_state import DropboxContentHasher, dropbox_content_hash
+from dropbox_data.storage import FingerprintIndex, get_storage, row_fingerprints
+from dropbox_data.auth import get_dropbox_client
+from dropbox_data.utils.metrics import instrument, record
+from dropbox_data.utils.schema import string_dtype
+from dropbox_data.utils.readers import get_csv_reader
 import logging
 
 logger = logging.getLogger(__name__)
 
+@dataclass
+class DownloadReport:
+    """Resultado agregado de um lote de downloads"""
+    downloaded: dict = field(default_factory=dict)  # caminho no Dropbox -> caminho local
+    failed: dict = field(default_factory=dict)  # caminho no Dropbox -> mensagem de erro
+    bytes_downloaded: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def throughput_mb_s(self):
+        if not self.elapsed_seconds:
+            return 0.0
+        return self.bytes_downloaded / 1024 / 1024 / self.elapsed_seconds
+
+    def summary(self):
+        return (f"{len(self.downloaded)} arquivos baixados, {len(self.failed)} com erro, "
+                f"{self.bytes_downloaded/1024/1024:.2f} MB em {self.elapsed_seconds:.2f}s "
+                f"({self.throughput_mb_s:.2f} MB/s)")
+
 class DropboxDownloader:
-    def __init__(self, access_token=None):
-        if not access_token:
+    def __init__(self, access_token=None, client=None, dropbox_path=None, offline=False,
+                 data_path=None, temp_dir=None, listing_state_path=None,
+                 dedup_index_path=None):
+        """
+        Args:
+            access_token (str): Token de acesso, usado para criar um cliente próprio
+            client (Dropbox): Cliente já autenticado (ex.: get_dropbox_client()),
+                reaproveitando sua sessão HTTP e renovação de token
+            dropbox_path (str): Pasta do Dropbox listada; padrão PATH_DROPBOX
+            offline (bool): Sem cliente nem listagem, apenas para mesclar e limpar
+                os arquivos já baixados (não exige credenciais)
+            data_path (str): Dataset mesclado; padrão CSV_OUTPUT_PATH
+            temp_dir (str): Pasta dos downloads; padrão TEMP_DOWNLOAD_PATH
+            listing_state_path (str): Estado da listagem; padrão LISTING_STATE_PATH
+            dedup_index_path (str): Índice de impressões do merge; padrão MERGE_DEDUP_INDEX_PATH
+        """
+        if client is None and not access_token and not offline:
             logger.error("Token de acesso não fornecido")
             raise ValueError("É necessário fornecer um token de acesso")
-            
-        self.dbx = Dropbox(access_token)
-        self.data_path = CSV_OUTPUT_PATH
-        self.temp_dir = TEMP_DOWNLOAD_PATH
+
+        self.data_path = data_path or CSV_OUTPUT_PATH
+        self.storage = get_storage(self.data_path)
+        self.temp_dir = temp_dir or TEMP_DOWNLOAD_PATH
+        self.dedup_index_path = dedup_index_path or MERGE_DEDUP_INDEX_PATH
+        self.dedup_columns = [column for column in MERGE_DEDUP_COLUMNS if column] or None
+        self._dedup_index = None
+        # RunManifest da execução, se houver: recebe os checkpoints do merge
+        self.manifest = None
+        # Arquivos locais que falharam no último merge (não devem ser registrados)
+        self.merge_failed = []
+        if offline:
+            self.dbx = None
+            self.listing = None
+        else:
+            if dropbox_path is None:
+                from dropbox_data.config import PATH_DROPBOX
+                dropbox_path = PATH_DROPBOX
+            self.dbx = client or Dropbox(access_token)
+            self.listing = FolderListing(
+                self.dbx, dropbox_path, state_path=listing_state_path or LISTING_STATE_PATH,
+                recursive=LIST_RECURSIVE
+            )
         
         # Cria diretório temporário se não existir
         if not os.path.exists(self.temp_dir):
             os.makedirs(self.temp_dir)
 
-    def list_csv_files(self, dropbox_path):
+    def list_csv_files(self, dropbox_path, recursive=None):
         """Lista todos os arquivos CSV no caminho especificado do Dropbox"""
         try:
-            files = self.dbx.files_list_folder(dropbox_path)
-            return [entry.path_lower for entry in files.entries if entry.path_lower.endswith('.csv')]
+            recursive = LIST_RECURSIVE if recursive is None else recursive
+            entries = FolderListing(self.dbx, dropbox_path, recursive=recursive).list_entries()
+            return [path for path in entries if path.endswith('.csv')]
         except ApiError as e:
             logger.error(f"Erro ao listar arquivos: {e}")
             return []
 
+    def _local_path(self, dropbox_path):
+        """Caminho local do arquivo; subpastas viram prefixo para evitar colisões de nome"""
+        return os.path.join(self.temp_dir, dropbox_path.strip('/').replace('/', '__'))
+
+    def _find_partial(self, dropbox_path, local_path):
+        """
+        Procura um download parcial (.part) que possa ser retomado.
+
+        O nome do arquivo parcial carrega a revisão baixada; parciais de
+        revisões que não são mais a atual no Dropbox são descartados.
+        """
+        prefix = os.path.basename(local_path) + '.'
+        partials = [f for f in os.listdir(self.temp_dir)
+                    if f.startswith(prefix) and f.endswith('.part')]
+        if not partials:
+            return None, 0
+
+        current_rev = self.dbx.files_get_metadata(dropbox_path).rev
+        found = None
+        for name in partials:
+            part_path = os.path.join(self.temp_dir, name)
+            if name[len(prefix):-len('.part')] == current_rev and found is None:
+                found = part_path
+            else:
+                os.remove(part_path)
+
+        if found is None:
+            return None, 0
+        return found, os.path.getsize(found)
+
+    @instrument('download', label_arg=1)
+    def _fetch_file(self, dropbox_path):
+        """
+        Baixa um arquivo do Dropbox em blocos, propagando qualquer erro.
+
+        O conteúdo é gravado em blocos de DOWNLOAD_CHUNK_SIZE num arquivo
+        temporário .part, renomeado para o destino apenas ao final, de modo
+        que a memória usada não depende do tamanho do arquivo. Arquivos a
+        partir de DOWNLOAD_RESUME_THRESHOLD mantêm o .part em caso de falha
+        e são retomados com um request Range na próxima tentativa.
+        """
+        local_path = self._local_path(dropbox_path)
+
+        # Arquivo já presente localmente com o mesmo conteúdo (ex.: execução interrompida)
+        expected_hash = (self.listing.entries or {}).get(dropbox_path, {}).get('content_hash')
+        if (expected_hash and os.path.exists(local_path)
+                and dropbox_content_hash(local_path) == expected_hash):
+            logger.info(f"Arquivo {dropbox_path} já presente localmente, download ignorado")
+            return local_path, 0
+
+        part_path, offset = self._find_partial(dropbox_path, local_path)
+
+        metadata = response = None
+        if offset:
+            rev = part_path[len(local_path) + 1:-len('.part')]
+            headers = dict(getattr(self.dbx, '_headers', None) or {})
+            headers['Range'] = f'bytes={offset}-'
+            metadata, response = self.dbx.clone(headers=headers).files_download(
+                path=dropbox_path, rev=rev
+            )
+            if response.status_code == 206:
+                logger.info(f"Retomando download de {dropbox_path} a partir de "
+                            f"{offset/1024/1024:.2f} MB")
+            else:
+                # Servidor ignorou o Range: recomeça do zero com esta resposta
+                offset = 0
+
+        if response is None:
+            metadata, response = self.dbx.files_download(path=dropbox_path)
+
+        part_path = f"{local_path}.{metadata.rev}.part"
+        resumable = metadata.size >= DOWNLOAD_RESUME_THRESHOLD
+        hasher = DropboxContentHasher() if not offset else None
+        try:
+            with open(part_path, 'ab' if offset else 'wb') as f:
+                for block in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(block)
+                    if hasher:
+                        hasher.update(block)
+        except BaseException:
+            if not resumable and os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        finally:
+            response.close()
+
+        size = os.path.getsize(part_path)
+        if size != metadata.size:
+            os.remove(part_path)
+            raise IOError(f"Download incompleto de {dropbox_path}: "
+                          f"{size} de {metadata.size} bytes")
+
+        # Confere o conteúdo com o content_hash informado pelo Dropbox
+        content_hash = hasher.hexdigest() if hasher else dropbox_content_hash(part_path)
+        if metadata.content_hash and content_hash != metadata.content_hash:
+            os.remove(part_path)
+            raise IOError(f"content_hash divergente no download de {dropbox_path}")
+
+        os.replace(part_path, local_path)
+        record(bytes_in=size - offset)
+        return local_path, size - offset
+
     def download_file(self, dropbox_path):
         """Baixa um arquivo do Dropbox"""
-        local_path = os.path.join(self.temp_dir, os.path.basename(dropbox_path))
         try:
-            with open(local_path, 'wb') as f:
-                metadata, result = self.dbx.files_download(path=dropbox_path)
-                f.write(result.content)
+            local_path, _ = self._fetch_file(dropbox_path)
             return local_path
         except ApiError as e:
             logger.error(f"Erro ao baixar arquivo {dropbox_path}: {e}")
             return None
 
-    def merge_files(self):
-        """Concatena os arquivos baixados com o arquivo data.csv existente"""
-        try:
-            dfs = []  # Lista para armazenar DataFrames
-            failed_files = []  # Lista para arquivos com erro
-            
-            # Se existe arquivo data.csv, lê primeiro
-            if os.path.exists(self.data_path):
+    def download_with_retry(self, dropbox_path, max_retries, backoff):
+        """
+        Baixa um arquivo com novas tentativas e backoff exponencial.
+
+        Returns:
+            tuple: (caminho local, bytes transferidos)
+        """
+        attempt = 0
+        while True:
+            try:
+                return self._fetch_file(dropbox_path)
+            except (ApiError, AuthError, BadInputError):
+                # Arquivo inexistente, token inválido etc. não mudam numa nova tentativa
+                raise
+            except Exception as e:
+                if attempt >= max_retries:
+                    raise
+                if isinstance(e, RateLimitError) and e.backoff:
+                    wait = e.backoff
+                else:
+                    wait = backoff * (2 ** attempt) + random.uniform(0, backoff)
+                attempt += 1
+                logger.warning(f"Falha ao baixar {dropbox_path} ({e}). "
+                               f"Tentativa {attempt}/{max_retries} em {wait:.1f}s")
+                time.sleep(wait)
+
+    def download_files(self, dropbox_paths, max_workers=None, max_retries=None):
+        """
+        Baixa vários arquivos do Dropbox em paralelo.
+
+        Args:
+            dropbox_paths (list): Caminhos dos arquivos no Dropbox
+            max_workers (int): Número máximo de downloads simultâneos
+            max_retries (int): Novas tentativas por arquivo em caso de falha
+
+        Returns:
+            DownloadReport: Arquivos baixados, falhas por arquivo e vazão total
+        """
+        max_workers = max_workers or DOWNLOAD_WORKERS
+        max_retries = DOWNLOAD_MAX_RETRIES if max_retries is None else max_retries
+        report = DownloadReport()
+        total = len(dropbox_paths)
+        if not total:
+            return report
+
+        logger.info(f"Baixando {total} arquivos com {max_workers} workers")
+        start = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.download_with_retry, path, max_retries,
+                                DOWNLOAD_BACKOFF_SECONDS): path
+                for path in dropbox_paths
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                path = futures[future]
                 try:
-                    logger.info(f"Lendo arquivo existente: {self.data_path}")
-                    existing_df = pd.read_csv(
-                        self.data_path, 
-                        sep=CSV_DELIMITER, 
-                        encoding='utf-8-sig',
-                        low_memory=False  # Evita o warning de dtype
-                    )
-                    dfs.append(existing_df)
+                    local_path, size = future.result()
+                    report.downloaded[path] = local_path
+                    report.bytes_downloaded += size
                 except Exception as e:
-                    logger.error(f"Erro ao ler arquivo existente: {e}")
+                    logger.error(f"Erro ao baixar arquivo {path}: {e}")
+                    report.failed[path] = str(e)
 
-            # Lista todos os arquivos na pasta temporária
-            temp_files = [os.path.join(self.temp_dir, f) for f in os.listdir(self.temp_dir) 
-                         if f.endswith('.csv')]
+                report.elapsed_seconds = time.monotonic() - start
+                logger.info(f"Progresso: {done}/{total} arquivos, "
+                            f"{report.bytes_downloaded/1024/1024:.2f} MB "
+                            f"({report.throughput_mb_s:.2f} MB/s)")
+
+        logger.info(f"Downloads concluídos: {report.summary()}")
+        return report
+
+    def _merge_full(self, temp_files):
+        """Concatena os arquivos baixados com o data.csv existente e reescreve o arquivo"""
+        dfs = []  # Lista para armazenar DataFrames
+
+        # Se existe o dataset mesclado, lê primeiro
+        if self.storage.exists():
+            try:
+                logger.info(f"Lendo arquivo existente: {self.storage.path}")
+                # Lido como texto para regravar os valores sem conversão de tipos
+                existing_df = self.storage.read(dtype=string_dtype())
+                dfs.append(existing_df)
+            except Exception as e:
+                logger.error(f"Erro ao ler arquivo existente: {e}")
+
+        # Lê os arquivos CSV em paralelo
+        logger.info(f"Lendo {len(temp_files)} arquivos")
+        frames, failed_files = get_csv_reader().read_many(temp_files, dtype=string_dtype())
+        dfs.extend(frames)
+
+        # Concatenar todos os DataFrames se houver algum
+        if dfs:
+            combined_df = pd.concat(dfs, ignore_index=True)
+
+            # Descarta as linhas repetidas, inclusive as já existentes no histórico
+            dedup = self.open_dedup_index(sync=False)
+            if dedup is not None:
+                fingerprints = row_fingerprints(combined_df, self.dedup_columns)
+                keep = ~pd.Series(fingerprints).duplicated().to_numpy()
+                if not keep.all():
+                    logger.info(f"{(~keep).sum()} linhas repetidas descartadas")
+                combined_df = combined_df[keep]
             
-            # Loop pelos arquivos CSV
+            # Salvar o DataFrame combinado
+            self.storage.write(combined_df)
+            if dedup is not None:
+                dedup.replace(fingerprints[keep], self.storage.signature(), self.dedup_columns)
+            self._commit_files([file for file in temp_files if file not in failed_files])
+            record(rows_out=len(combined_df))
+            logger.info(f"Arquivo salvo com sucesso: {len(combined_df)} registros")
+        else:
+            logger.warning("Nenhum arquivo foi processado com sucesso")
+
+        if failed_files:
+            logger.warning(f"Arquivos com erro: {failed_files}")
+            self.merge_failed.extend(failed_files)
+
+    def _commit_files(self, files):
+        """
+        Confirma arquivos já gravados no dataset mesclado: são removidos da pasta
+        temporária (não entram de novo num merge retomado) e registrados no manifesto.
+        """
+        for file in files:
+            os.remove(file)
+        if self.manifest is not None:
+            self.manifest.merge_checkpoint(self.storage.checkpoint(), files)
+
+    def read_header(self, path):
+        """Lê apenas o cabeçalho de um CSV"""
+        return get_csv_reader().columns(path)
+
+    def open_dedup_index(self, sync=True):
+        """
+        Índice de impressões das linhas do dataset mesclado (MERGE_DEDUP).
+
+        Aberto uma vez por downloader e fechado em cleanup(). Com sync, é
+        reconstruído se o dataset mudou desde a última gravação. O SQLite não
+        usa o índice: o upsert pela chave já descarta os snapshots repetidos.
+
+        Returns:
+            FingerprintIndex | None: None se a deduplicação estiver desativada
+        """
+        if not MERGE_DEDUP or self.storage.format == 'sqlite':
+            return None
+        if self._dedup_index is None:
+            self._dedup_index = FingerprintIndex(self.dedup_index_path)
+            if sync:
+                self._dedup_index.sync_with(self.storage, self.dedup_columns, MERGE_CHUNK_SIZE)
+        return self._dedup_index
+
+    def append_file(self, file, columns, chunk_size=None):
+        """
+        Acrescenta um arquivo baixado ao dataset mesclado, chunk a chunk.
+
+        Os valores são lidos e gravados como texto, sem conversão de tipos.
+        Com MERGE_DEDUP, as linhas já gravadas (inteiras, ou pelas colunas de
+        MERGE_DEDUP_COLUMNS) são descartadas, consultando o índice persistente
+        de impressões em vez do histórico. Se a leitura ou a gravação falhar no
+        meio do arquivo, os chunks já gravados dele são desfeitos: o arquivo
+        entra inteiro no dataset ou não entra.
+
+        Args:
+            file (str): Caminho local do CSV baixado
+            columns (list): Colunas do dataset mesclado; ausentes ficam vazias.
+                None mantém as colunas do arquivo
+            chunk_size (int): Linhas por chunk; padrão MERGE_CHUNK_SIZE
+
+        Yields:
+            pd.DataFrame: Cada chunk gravado, como texto
+        """
+        logger.info(f"Acrescentando arquivo: {file}")
+        chunks = get_csv_reader().iter_chunks(
+            file,
+            chunk_size or MERGE_CHUNK_SIZE,
+            dtype=string_dtype(),
+            keep_default_na=False
+        )
+        dedup = self.open_dedup_index()
+        checkpoint = self.storage.checkpoint()
+        duplicates = 0
+        try:
+            for chunk in chunks:
+                # Mesma ordem de colunas do arquivo existente
+                if columns is not None:
+                    chunk = chunk.reindex(columns=columns, fill_value='')
+                if dedup is not None:
+                    rows = len(chunk)
+                    chunk, fingerprints = dedup.new_rows(chunk, self.dedup_columns)
+                    duplicates += rows - len(chunk)
+                    if chunk.empty:
+                        continue
+                self.storage.append(chunk)
+                if dedup is not None:
+                    dedup.add(fingerprints)
+                    dedup.set_meta('signature', self.storage.signature())
+                yield chunk
+        except Exception:
+            logger.error(f"Desfazendo o merge parcial de {file}")
+            if not self.storage.rollback(checkpoint):
+                logger.error(f"{self.storage.path} foi reescrito durante o merge de {file}; "
+                             f"as linhas já gravadas dele permanecem no dataset")
+            if dedup is not None:
+                dedup.sync_with(self.storage, self.dedup_columns, MERGE_CHUNK_SIZE)
+            raise
+        if duplicates:
+            logger.info(f"{duplicates} linhas repetidas descartadas de {file}")
+
+    def _merge_append(self, temp_files, columns):
+        """
+        Acrescenta os arquivos baixados ao final do dataset mesclado existente.
+
+        Os arquivos são lidos em chunks como texto e gravados sem conversão de
+        tipos, de modo que o histórico nunca é relido e os valores são mantidos
+        exatamente como vieram do Dropbox.
+        """
+        failed_files = []
+        total_records = 0
+
+        for file in temp_files:
+            try:
+                for chunk in self.append_file(file, columns):
+                    total_records += len(chunk)
+                    record(rows_out=len(chunk))
+                self._commit_files([file])
+            except Exception as e:
+                logger.error(f"Erro ao acrescentar o arquivo {file}: {e}")
+                failed_files.append(file)
+
+        logger.info(f"Merge incremental concluído: {total_records} registros acrescentados")
+        if failed_files:
+            logger.warning(f"Arquivos com erro: {failed_files}")
+            self.merge_failed.extend(failed_files)
+
+    @instrument('merge_files')
+    def merge_files(self, incremental=None):
+        """
+        Mescla os arquivos baixados com o arquivo data.csv existente.
+
+        No modo incremental (padrão, MERGE_INCREMENTAL) apenas os arquivos novos
+        são lidos e acrescentados ao data.csv, desde que suas colunas sejam
+        compatíveis com as do arquivo existente. Se algum arquivo trouxer colunas
+        desconhecidas, é feito o merge completo, que reescreve o arquivo. Com
+        STORAGE_FORMAT=sqlite os arquivos são sempre acrescentados com upsert por
+        (post_id, post_extracted_datetime), e colunas novas são adicionadas à tabela.
+        """
+        try:
+            incremental = MERGE_INCREMENTAL if incremental is None else incremental
+
+            # Lista todos os arquivos na pasta temporária
+            temp_files = sorted(os.path.join(self.temp_dir, f) for f in os.listdir(self.temp_dir)
+                                if f.endswith('.csv'))
+            record(bytes_in=sum(os.path.getsize(file) for file in temp_files))
+            self.merge_failed = []
+
+            # Ponto de restauração do dataset antes do primeiro arquivo
+            if self.manifest is not None:
+                self.manifest.merge_checkpoint(self.storage.checkpoint())
+
+            if not (incremental and self.storage.exists()):
+                self._merge_full(temp_files)
+                return
+
+            # O SQLite acrescenta colunas novas sem reescrever a tabela
+            if self.storage.format == 'sqlite':
+                self._merge_append(temp_files, None)
+                return
+
+            columns = self.storage.columns()
+            compatible = []
             for file in temp_files:
                 try:
-                    logger.info(f"Processando arquivo: {file}")
-                    df = pd.read_csv(
-                        file, 
-                        sep=CSV_DELIMITER, 
-                        encoding='utf-8-sig',
-                        low_memory=False
-                    )
-                    dfs.append(df)
+                    extra = set(self.read_header(file)) - set(columns)
                 except Exception as e:
-                    logger.error(f"Erro ao ler o arquivo {file}: {e}")
-                    failed_files.append(file)
-
-            # Concatenar todos os DataFrames se houver algum
-            if dfs:
-                combined_df = pd.concat(dfs, ignore_index=True)
-                
-                # Salvar o DataFrame combinado mantendo todos os registros
-                combined_df.to_csv(
-                    self.data_path, 
-                    sep=CSV_DELIMITER, 
-                    index=False, 
-                    encoding='utf-8-sig'
-                )
-                logger.info(f"Arquivo salvo com sucesso: {len(combined_df)} registros")
-            else:
-                logger.warning("Nenhum arquivo foi processado com sucesso")
+                    logger.error(f"Erro ao ler o cabeçalho do arquivo {file}: {e}")
+                    continue
+                if extra:
+                    logger.warning(f"Arquivo {file} tem colunas novas {sorted(extra)}, "
+                                   "usando merge completo")
+                    self._merge_full(temp_files)
+                    return
+                compatible.append(file)
 
-            if failed_files:
-                logger.warning(f"Arquivos com erro: {failed_files}")
+            self._merge_append(compatible, columns)
 
         except Exception as e:
             logger.error(f"Erro durante o merge de arquivos: {e}")
             raise
 
     def cleanup(self):
-        """Remove os arquivos temporários"""
+        """Remove os arquivos temporários, preservando downloads parciais retomáveis"""
+        if self._dedup_index is not None:
+            self._dedup_index.close()
+            self._dedup_index = None
         try:
             for file in os.listdir(self.temp_dir):
+                if file.endswith('.part'):
+                    continue
                 os.remove(os.path.join(self.temp_dir, file))
             logger.info("Arquivos temporários removidos")
         except Exception as e:
             logger.error(f"Erro ao limpar arquivos temporários: {e}")
 
+@instrument('extract_data')
 def extract_data(access_token=None, download_files=True):
     try:
-        downloader = DropboxDownloader(access_token)
+        if not download_files:
+            # Apenas mescla os arquivos já baixados, sem acessar o Dropbox
+            downloader = DropboxDownloader(offline=True)
+        elif access_token:
+            downloader = DropboxDownloader(access_token)
+        else:
+            downloader = DropboxDownloader(client=get_dropbox_client())
         
         if download_files:
             # Lista arquivos CSV no Dropbox
-            dropbox_files = downloader.list_csv_files(PATH_DROPBOX)
+            dropbox_files = downloader.list_csv_files(downloader.listing.dropbox_path)
             
-            # Baixa cada arquivo
-            for file_path in dropbox_files:
-                downloader.download_file(file_path)
+            # Baixa os arquivos em paralelo
+            report = downloader.download_files(dropbox_files)
+            if report.failed:
+                logger.warning(f"Arquivos com erro no download: {list(report.failed)}")
         
         # Mescla os arquivos
         downloader.merge_files()
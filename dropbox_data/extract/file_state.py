@@ -0,0 +1,144 @@
+import os
+import sqlite3
+import hashlib
+import logging
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Tamanho do bloco usado pelo content_hash do Dropbox
+DROPBOX_HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
+class DropboxContentHasher:
+    """
+    Calcula o content_hash do Dropbox de forma incremental.
+
+    O arquivo é dividido em blocos de 4 MB; o hash final é o SHA-256 da
+    concatenação dos SHA-256 de cada bloco.
+    """
+
+    def __init__(self):
+        self._overall = hashlib.sha256()
+        self._block = hashlib.sha256()
+        self._block_pos = 0
+
+    def update(self, data):
+        position = 0
+        while position < len(data):
+            if self._block_pos == DROPBOX_HASH_BLOCK_SIZE:
+                self._overall.update(self._block.digest())
+                self._block = hashlib.sha256()
+                self._block_pos = 0
+            take = min(len(data) - position, DROPBOX_HASH_BLOCK_SIZE - self._block_pos)
+            self._block.update(data[position:position + take])
+            self._block_pos += take
+            position += take
+
+    def hexdigest(self):
+        overall = self._overall.copy()
+        if self._block_pos > 0:
+            overall.update(self._block.digest())
+        return overall.hexdigest()
+
+def dropbox_content_hash(path):
+    """Calcula localmente o content_hash do Dropbox de um arquivo"""
+    hasher = DropboxContentHasher()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(DROPBOX_HASH_BLOCK_SIZE), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+class FileStateStore:
+    """
+    Registro em SQLite dos arquivos do Dropbox já processados.
+
+    Guarda rev, size, server_modified e content_hash de cada caminho, o que
+    permite reconhecer arquivos renomeados ou com alteração apenas de
+    metadados pelo conteúdo, sem baixá-los novamente.
+    """
+
+    def __init__(self, path, legacy_path=None):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                rev TEXT,
+                size INTEGER,
+                server_modified TEXT,
+                content_hash TEXT,
+                processed_at TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS files_content_hash ON files (content_hash)")
+        if legacy_path:
+            self._migrate_legacy(legacy_path)
+
+    def _migrate_legacy(self, legacy_path):
+        """Importa o antigo processed_files.txt (caminho,rev por linha) se o registro está vazio"""
+        if not os.path.exists(legacy_path) or len(self):
+            return
+        records = []
+        with open(legacy_path, 'r') as f:
+            for line in f:
+                path, separator, rev = line.strip().rpartition(',')
+                if separator:
+                    records.append({'path': path, 'rev': rev})
+        self.upsert_many(records)
+        logger.info(f"{len(records)} arquivos importados de {legacy_path}")
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def load(self):
+        """
+        Returns:
+            dict: Caminho -> registro (rev, size, server_modified, content_hash)
+        """
+        rows = self.conn.execute(
+            "SELECT path, rev, size, server_modified, content_hash FROM files"
+        )
+        return {
+            path: {'rev': rev, 'size': size, 'server_modified': server_modified,
+                   'content_hash': content_hash}
+            for path, rev, size, server_modified, content_hash in rows
+        }
+
+    def known_content_hashes(self):
+        rows = self.conn.execute("SELECT DISTINCT content_hash FROM files "
+                                 "WHERE content_hash IS NOT NULL")
+        return {row[0] for row in rows}
+
+    def upsert_many(self, records):
+        """Grava os registros informados (dicts com path e metadados) numa transação"""
+        processed_at = datetime.now().isoformat()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                ((record['path'], record.get('rev'), record.get('size'),
+                  record.get('server_modified'), record.get('content_hash'), processed_at)
+                 for record in records)
+            )
+
+    def close(self):
+        self.conn.close()
+
+def read_state_summary(path):
+    """
+    Resumo do registro de arquivos processados, aberto apenas para leitura.
+
+    Returns:
+        dict | None: files (quantidade) e last_processed_at, ou None se o registro não existe
+    """
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        files, last_processed_at = conn.execute(
+            "SELECT COUNT(*), MAX(processed_at) FROM files"
+        ).fetchone()
+    finally:
+        conn.close()
+    return {'files': files, 'last_processed_at': last_processed_at}
@@ -0,0 +1,131 @@
+import json
+import os
+import logging
+from dropbox import files
+from dropbox.exceptions import ApiError
+
+logger = logging.getLogger(__name__)
+
+def _entry_to_dict(entry):
+    """Converte um FileMetadata nos campos usados pelo pipeline"""
+    return {
+        'rev': entry.rev,
+        'size': entry.size,
+        'server_modified': entry.server_modified.isoformat() if entry.server_modified else None,
+        'content_hash': entry.content_hash,
+    }
+
+class FolderListing:
+    """
+    Listagem de uma pasta do Dropbox que segue a paginação (has_more/cursor).
+
+    Quando state_path é informado, o cursor e o último snapshot da pasta são
+    persistidos em JSON e as execuções seguintes usam files_list_folder_continue,
+    buscando apenas o que mudou desde a última listagem.
+    """
+
+    def __init__(self, dbx, dropbox_path, state_path=None, recursive=False):
+        self.dbx = dbx
+        self.dropbox_path = dropbox_path
+        self.state_path = state_path
+        self.recursive = recursive
+        self.entries = None  # caminho -> metadados do arquivo
+        self.cursor = None
+
+    def _iter_pages(self, cursor=None):
+        """Percorre todas as páginas da listagem, a partir do início ou de um cursor"""
+        if cursor is None:
+            page = self.dbx.files_list_folder(self.dropbox_path, recursive=self.recursive)
+        else:
+            page = self.dbx.files_list_folder_continue(cursor)
+        yield page
+        while page.has_more:
+            page = self.dbx.files_list_folder_continue(page.cursor)
+            yield page
+
+    def _apply(self, pages, entries):
+        """Aplica as entradas das páginas ao snapshot, retornando os caminhos alterados"""
+        changed = []
+        for page in pages:
+            for entry in page.entries:
+                if isinstance(entry, files.FileMetadata):
+                    entries[entry.path_lower] = _entry_to_dict(entry)
+                    changed.append(entry.path_lower)
+                elif isinstance(entry, files.DeletedMetadata):
+                    # Uma pasta removida gera um único DeletedMetadata para todo o conteúdo
+                    prefix = entry.path_lower + '/'
+                    removed = [p for p in entries
+                               if p == entry.path_lower or p.startswith(prefix)]
+                    for path in removed:
+                        del entries[path]
+            self.cursor = page.cursor
+        return changed
+
+    def list_entries(self):
+        """
+        Lista todos os arquivos da pasta, seguindo todas as páginas.
+
+        Returns:
+            dict: Caminho (path_lower) -> metadados (rev, size, server_modified, content_hash)
+        """
+        self.entries = {}
+        self._apply(self._iter_pages(), self.entries)
+        return self.entries
+
+    def _load_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return None
+        try:
+            with open(self.state_path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Estado de listagem inválido em {self.state_path}, ignorando: {e}")
+            return None
+        if (state.get('path') != self.dropbox_path.lower()
+                or state.get('recursive') != self.recursive):
+            logger.info("Pasta ou modo de listagem mudou, refazendo listagem completa")
+            return None
+        return state
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'path': self.dropbox_path.lower(),
+                'recursive': self.recursive,
+                'cursor': self.cursor,
+                'entries': self.entries,
+            }, f)
+        os.replace(tmp_path, self.state_path)
+
+    def sync(self):
+        """
+        Atualiza o snapshot da pasta usando o cursor salvo, quando existir.
+
+        Returns:
+            tuple: (snapshot completo da pasta, caminhos novos ou alterados nesta sincronização)
+        """
+        state = self._load_state()
+        changed = None
+
+        if state and state.get('cursor'):
+            entries = state.get('entries', {})
+            try:
+                changed = self._apply(self._iter_pages(state['cursor']), entries)
+                self.entries = entries
+                logger.info(f"Listagem incremental: {len(changed)} arquivos alterados")
+            except ApiError as e:
+                if not (isinstance(e.error, files.ListFolderContinueError) and e.error.is_reset()):
+                    raise
+                logger.warning("Cursor de listagem expirado, refazendo listagem completa")
+                changed = None
+
+        if changed is None:
+            changed = list(self.list_entries())
+            logger.info(f"Listagem completa: {len(changed)} arquivos")
+
+        self._save_state()
+        return self.entries, changed
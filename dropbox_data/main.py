@@ -1,37 +1,83 @@
+import os
+import sys
 import logging
 from pathlib import Path
-from dropbox import files
 from dropbox_data.wrangling.dataframes import process_csv_file
-from dropbox_data.extract.dropbox_download import extract_data
-from dropbox_data.config import CSV_OUTPUT_PATH, PATH_DROPBOX
-from dropbox_data.auth import DropboxAuthManager
+from dropbox_data.extract.dropbox_download import DropboxDownloader
+from dropbox_data.extract.file_state import FileStateStore
+from dropbox_data.pipeline import StreamingPipeline
+from dropbox_data.storage import get_output_storage, get_storage
+from dropbox_data.config import (
+    CSV_OUTPUT_PATH,
+    PROCESSED_OUTPUT_PATH,
+    PROCESSED_STATE_PATH,
+    LEGACY_PROCESSED_FILES_PATH,
+    STORAGE_FORMAT,
+    EXPORT_CSV,
+    OUTPUT_PARTITION_BY,
+    RUN_MANIFEST_PATH,
+    MERGE_INCREMENTAL,
+    PIPELINE_STREAMING,
+    WRANGLE_PARTITIONS,
+    WRANGLE_MEMORY_BUDGET
+)
+from dropbox_data.auth import get_dropbox_client
+from dropbox_data.utils.metrics import instrument, reset_run_metrics
+from dropbox_data.utils.run_manifest import RunManifest
 
 logger = logging.getLogger(__name__)
 
+def _file_record(path, metadata):
+    return {'path': path, **metadata}
+
+@instrument('check_for_updates')
 def check_for_updates(downloader):
     """
     Verifica se há novos arquivos ou modificações no Dropbox.
+
+    A listagem é incremental: o cursor da última execução é reaproveitado e
+    apenas as mudanças desde então são buscadas no Dropbox. Arquivos cujo
+    content_hash já foi processado (renomeados, copiados ou com alteração
+    apenas de metadados) são registrados sem novo download.
     """
     try:
         # Carrega registro de arquivos já processados
-        processed_files = Path('src/csv_files/processed_files.txt')
-        if processed_files.exists():
-            with open(processed_files, 'r') as f:
-                processed = {line.strip().split(',')[0]: line.strip().split(',')[1] 
-                           for line in f.readlines()}
-        else:
-            processed = {}
+        store = FileStateStore(PROCESSED_STATE_PATH, legacy_path=LEGACY_PROCESSED_FILES_PATH)
+        processed = store.load()
+        known_hashes = store.known_content_hashes()
             
-        # Lista arquivos do Dropbox
-        dropbox_files = downloader.dbx.files_list_folder(PATH_DROPBOX)
+        # Sincroniza a listagem do Dropbox
+        entries, _ = downloader.listing.sync()
         
         new_or_modified = []
-        for entry in dropbox_files.entries:
-            if isinstance(entry, files.FileMetadata):
-                # Verifica se arquivo é novo ou foi modificado
-                if (entry.path_lower not in processed or 
-                    processed[entry.path_lower] != entry.rev):
-                    new_or_modified.append(entry.path_lower)
+        same_content = []
+        selected_hashes = set()
+        for path, metadata in entries.items():
+            # Mesma revisão já processada
+            previous = processed.get(path)
+            if previous and previous['rev'] == metadata['rev']:
+                continue
+
+            # Conteúdo idêntico a um arquivo já processado
+            content_hash = metadata.get('content_hash')
+            if content_hash and content_hash in known_hashes:
+                same_content.append(path)
+                continue
+
+            # Conteúdo idêntico a outro arquivo desta execução: registrado
+            # junto com ele em update_processed_files
+            if content_hash and content_hash in selected_hashes:
+                continue
+            if content_hash:
+                selected_hashes.add(content_hash)
+
+            new_or_modified.append(path)
+
+        if same_content:
+            logger.info(f"{len(same_content)} arquivos com conteúdo já processado, "
+                        "registrados sem download")
+            store.upsert_many(_file_record(path, entries[path]) for path in same_content)
+        store.close()
         
         return new_or_modified
         
@@ -39,27 +85,42 @@ def check_for_updates(downloader):
         logger.error(f"Erro ao verificar atualizações: {e}")
         raise
 
-def update_processed_files(downloader, processed_files):
+def update_processed_files(downloader, processed_files, failed_files=None):
     """
     Atualiza o registro de arquivos processados.
+
+    Arquivos em failed_files, e os de mesmo conteúdo que deixaram de ser
+    baixados por causa deles, não são registrados, para que sejam baixados
+    novamente na próxima execução.
     """
     try:
-        # Lista arquivos atuais do Dropbox
-        dropbox_files = downloader.dbx.files_list_folder(PATH_DROPBOX)
+        # Usa o snapshot da última sincronização, sem nova chamada à API
+        entries = downloader.listing.entries
+        if entries is None:
+            entries, _ = downloader.listing.sync()
+        
+        failed_files = set(failed_files or [])
+        failed_hashes = {entries[path].get('content_hash') for path in failed_files
+                         if path in entries} - {None}
         
         # Atualiza registro
-        with open('src/csv_files/processed_files.txt', 'w') as f:
-            for entry in dropbox_files.entries:
-                if isinstance(entry, files.FileMetadata):
-                    f.write(f"{entry.path_lower},{entry.rev}\n")
+        store = FileStateStore(PROCESSED_STATE_PATH)
+        store.upsert_many(_file_record(path, metadata) for path, metadata in entries.items()
+                          if path not in failed_files
+                          and metadata.get('content_hash') not in failed_hashes)
+        store.close()
                     
     except Exception as e:
         logger.error(f"Erro ao atualizar registro de arquivos: {e}")
         raise
 
-def download_and_merge(downloader, files_to_process):
+def download_and_merge(downloader, files_to_process, manifest=None):
     """
     Baixa apenas arquivos novos ou modificados do Dropbox e faz o merge.
+
+    Com um manifesto (RunManifest), os arquivos baixados e mesclados são
+    registrados nele, e os que uma execução retomada já baixou ou mesclou
+    não são baixados de novo.
     """
     try:
         if not files_to_process:
@@ -67,19 +128,33 @@ def download_and_merge(downloader, files_to_process):
             return False
             
         logger.info(f"Baixando {len(files_to_process)} arquivos novos/modificados")
+        to_download = files_to_process
+        if manifest is not None:
+            manifest.set_stage('download')
+            to_download = manifest.pending_downloads(files_to_process, downloader._local_path)
         
-        # Baixa apenas os arquivos necessários
-        for file_path in files_to_process:
-            downloader.download_file(file_path)
+        # Baixa apenas os arquivos necessários, em paralelo
+        report = downloader.download_files(to_download)
+        if report.failed:
+            logger.warning(f"Arquivos com erro no download: {list(report.failed)}")
         
         # Faz o merge dos arquivos baixados
+        if manifest is not None:
+            manifest.files_downloaded(report.downloaded)
+            manifest.set_stage('merge')
         downloader.merge_files()
         
         # Limpa arquivos temporários
         downloader.cleanup()
         
-        # Atualiza registro de arquivos processados
-        update_processed_files(downloader, files_to_process)
+        # Atualiza registro de arquivos processados; os que falharam no download
+        # ou no merge são baixados de novo na próxima execução
+        merge_failed = {os.path.abspath(file) for file in downloader.merge_failed}
+        failed_files = set(report.failed) | {
+            path for path in files_to_process
+            if os.path.abspath(downloader._local_path(path)) in merge_failed
+        }
+        update_processed_files(downloader, files_to_process, failed_files=failed_files)
         
         logger.info("Download e merge concluídos com sucesso")
         return True
@@ -88,39 +163,231 @@ def download_and_merge(downloader, files_to_process):
         logger.error(f"Erro durante download e merge: {e}")
         raise
 
-def process_data(chunk_size: int = 100000):
+def stream_and_process(downloader, files_to_process, chunk_size: int = 100000):
+    """
+    Baixa, mescla e processa os arquivos novos ou modificados em streaming.
+
+    Cada arquivo é lido e processado assim que termina de baixar (ver
+    StreamingPipeline). Arquivos com colunas novas passam pelo merge completo
+    e, nesse caso, o dataset mesclado é reprocessado ao final.
+    """
+    try:
+        if not files_to_process:
+            logger.info("Nenhum arquivo novo ou modificado encontrado")
+            return False
+
+        logger.info(f"Processando {len(files_to_process)} arquivos novos/modificados em streaming")
+        pipeline = StreamingPipeline(downloader, PROCESSED_OUTPUT_PATH, chunk_size)
+        report = pipeline.run(files_to_process)
+        if report.failed:
+            logger.warning(f"Arquivos com erro: {list(report.failed)}")
+
+        if report.leftover_files:
+            downloader.merge_files()
+            process_csv_file(
+                input_path=CSV_OUTPUT_PATH,
+                output_path=PROCESSED_OUTPUT_PATH,
+                chunk_size=chunk_size
+            )
+
+        # Limpa arquivos temporários
+        downloader.cleanup()
+
+        # Atualiza registro de arquivos processados
+        update_processed_files(downloader, files_to_process, failed_files=report.failed)
+        return True
+
+    except Exception as e:
+        logger.error(f"Erro durante o processamento em streaming: {e}")
+        raise
+
+def connect_downloader():
+    """Autentica no Dropbox e cria o downloader com o cliente compartilhado"""
+    logger.info("Iniciando processo de autenticação")
+    try:
+        client = get_dropbox_client()
+    except Exception:
+        logger.error("Token não obtido. Verifique as credenciais no arquivo .env")
+        raise
+    return DropboxDownloader(client=client)
+
+def sync_data():
+    """
+    Baixa e mescla os arquivos novos ou modificados, sem processá-los.
+
+    Returns:
+        bool: Se havia arquivos novos ou modificados
+    """
+    try:
+        with reset_run_metrics().run():
+            downloader = connect_downloader()
+            return download_and_merge(downloader, check_for_updates(downloader))
+    except Exception as e:
+        logger.error(f"Erro durante a sincronização: {e}")
+        raise
+
+def merge_data():
+    """Mescla os arquivos já baixados em TEMP_DOWNLOAD_PATH, sem acessar o Dropbox"""
+    try:
+        with reset_run_metrics().run():
+            downloader = DropboxDownloader(offline=True)
+            downloader.merge_files()
+            downloader.cleanup()
+    except Exception as e:
+        logger.error(f"Erro durante o merge: {e}")
+        raise
+
+def wrangle_data(chunk_size: int = 100000, columns: list = None, resume: bool = False,
+                 memory_budget: int = None):
+    """
+    Processa o dataset mesclado (CSV_OUTPUT_PATH) para PROCESSED_OUTPUT_PATH.
+
+    Com resume, continua um processamento interrompido do último chunk confirmado.
+    Com memory_budget (bytes; padrão WRANGLE_MEMORY_BUDGET), o tamanho dos chunks
+    é ajustado ao orçamento de memória.
+    """
+    try:
+        with reset_run_metrics().run():
+            process_csv_file(
+                input_path=CSV_OUTPUT_PATH,
+                output_path=PROCESSED_OUTPUT_PATH,
+                chunk_size=chunk_size,
+                columns=columns,
+                resume=resume,
+                memory_budget=memory_budget
+            )
+    except Exception as e:
+        logger.error(f"Erro durante o processamento: {e}")
+        raise
+
+def export_data(output_path: str = None, storage_format: str = 'csv',
+                chunk_size: int = 100000, start: str = None, end: str = None):
+    """
+    Exporta o resultado do processamento para um arquivo CSV ou Parquet.
+
+    Com STORAGE_FORMAT=sqlite, o banco SQLite é o registro do pipeline e o
+    arquivo processado (view processed_posts) é gerado apenas sob demanda.
+    Com a saída particionada (OUTPUT_PARTITION_BY), exporta os registros entre
+    start e end, lendo apenas as partições que se sobrepõem ao intervalo.
+
+    Args:
+        output_path (str): Arquivo de saída; padrão PROCESSED_OUTPUT_PATH
+        storage_format (str): 'csv' ou 'parquet'
+        start (str): Data inicial do intervalo (saída particionada)
+        end (str): Data final do intervalo (saída particionada)
+
+    Returns:
+        int: Registros exportados
+    """
+    try:
+        if STORAGE_FORMAT == 'sqlite':
+            if start or end:
+                raise ValueError("Intervalo de datas requer a saída particionada "
+                                 "(STORAGE_FORMAT csv ou parquet)")
+            return get_storage(CSV_OUTPUT_PATH).export_processed(
+                output_path or PROCESSED_OUTPUT_PATH, storage_format, chunk_size
+            )
+        if not OUTPUT_PARTITION_BY:
+            raise ValueError("A exportação requer STORAGE_FORMAT=sqlite ou OUTPUT_PARTITION_BY")
+
+        source = get_output_storage(PROCESSED_OUTPUT_PATH)
+        output = get_storage(output_path or PROCESSED_OUTPUT_PATH, storage_format)
+        total = 0
+        for chunk in source.iter_chunks(chunk_size, start=start, end=end):
+            if total == 0:
+                output.write(chunk)
+            else:
+                output.append(chunk)
+            total += len(chunk)
+        logger.info(f"{total} registros de {len(source.partitions(start, end))} partições "
+                    f"exportados para {output.path}")
+        return total
+    except Exception as e:
+        logger.error(f"Erro durante a exportação: {e}")
+        raise
+
+def process_data(chunk_size: int = 100000, resume: bool = False, memory_budget: int = None):
     """
     Função principal que orquestra o processamento dos dados.
+
+    O andamento é registrado no manifesto RUN_MANIFEST_PATH. Se a execução
+    anterior foi interrompida, o que ela gravou depois do último checkpoint
+    no dataset mesclado e na saída é descartado, e esta execução usa o modo
+    sequencial, que processa todo o dataset mesclado. Com resume, ela retoma
+    a anterior: arquivos já baixados ou mesclados não são baixados de novo e
+    o processamento continua do último chunk confirmado.
+
+    Com um orçamento de memória (memory_budget em bytes, padrão
+    WRANGLE_MEMORY_BUDGET), o processamento usa o modo sequencial, com o tamanho
+    dos chunks ajustado ao orçamento (ver process_csv_file).
+
+    Ao final, as métricas da execução são gravadas em METRICS_JSON_PATH e
+    METRICS_PROMETHEUS_PATH.
     """
+    manifest = RunManifest(RUN_MANIFEST_PATH)
     try:
-        # Inicializa autenticação
-        logger.info("Iniciando processo de autenticação")
-        auth_manager = DropboxAuthManager()
-        access_token = auth_manager.get_valid_access_token()
-        
-        if not access_token:
-            logger.error("Token não obtido. Verifique as credenciais no arquivo .env")
-            raise Exception("Não foi possível obter um token válido")
-        
-        # Extrai dados usando o token válido
-        extract_data(access_token=access_token)
-        
-        # Define caminhos
-        base_file = Path('src/csv_files/final_data.csv')
-        new_data_file = Path(CSV_OUTPUT_PATH)
-        
-        # Processa o arquivo
-        process_csv_file(
-            input_path=str(new_data_file),
-            output_path=str(base_file),
-            chunk_size=chunk_size
-        )
-        
+        # Métricas por estágio da execução (e profiling com DEBUG)
+        with reset_run_metrics().run():
+            interrupted = manifest.interrupted
+            merge_checkpoint = manifest.previous.get('merge_checkpoint') if interrupted else None
+            resumed = manifest.start(resume)
+
+            downloader = connect_downloader()
+            downloader.manifest = manifest
+            if merge_checkpoint is not None:
+                # Descarta um append interrompido no dataset mesclado
+                if not downloader.storage.rollback(merge_checkpoint):
+                    logger.warning(f"{downloader.storage.path} não corresponde ao checkpoint "
+                                   "da execução interrompida")
+
+            manifest.set_stage('check_for_updates')
+            files_to_process = check_for_updates(downloader)
+            manifest.add_files({path: downloader.listing.entries.get(path, {})
+                                for path in files_to_process})
+
+            # Define caminhos
+            base_file = Path(PROCESSED_OUTPUT_PATH)
+            new_data_file = Path(CSV_OUTPUT_PATH)
+
+            memory_budget = WRANGLE_MEMORY_BUDGET if memory_budget is None else memory_budget
+            streaming = (PIPELINE_STREAMING and MERGE_INCREMENTAL and not WRANGLE_PARTITIONS
+                         and STORAGE_FORMAT != 'sqlite' and not interrupted
+                         and not memory_budget)
+            if streaming:
+                # Download, merge e processamento sobrepostos
+                manifest.set_stage('streaming')
+                manifest.merge_checkpoint(downloader.storage.checkpoint())
+                stream_and_process(downloader, files_to_process, chunk_size)
+            else:
+                # Baixa e mescla apenas arquivos novos ou modificados
+                download_and_merge(downloader, files_to_process, manifest)
+            
+                # Processa o arquivo
+                manifest.set_stage('wrangle')
+                process_csv_file(
+                    input_path=str(new_data_file),
+                    output_path=str(base_file),
+                    chunk_size=chunk_size,
+                    resume=resumed,
+                    on_checkpoint=manifest.wrangle_checkpoint,
+                    memory_budget=memory_budget
+                )
+
+            # Com armazenamento colunar, o CSV final é gerado apenas como exportação
+            manifest.set_stage('export')
+            if STORAGE_FORMAT == 'sqlite' and EXPORT_CSV:
+                export_data(str(base_file))
+            elif (STORAGE_FORMAT != 'csv' or OUTPUT_PARTITION_BY) and EXPORT_CSV:
+                get_output_storage(str(base_file)).export_csv(str(base_file))
+
+        manifest.finish()
         return True
         
     except Exception as e:
+        if manifest.data is not None:
+            manifest.finish('failed')
         logger.error(f"Erro durante o processamento: {e}")
         raise
 
 if __name__ == "__main__":
-    process_data()
+    process_data(resume='--resume' in sys.argv)
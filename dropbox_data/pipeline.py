@@ -0,0 +1,256 @@
+import os
+import time
+import shutil
+import tempfile
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from dropbox_data.extract.dropbox_download import DownloadReport
+from dropbox_data.extract.file_state import dropbox_content_hash
+from dropbox_data.wrangling.dataframes import ProcessedOutput, wrangle_cached
+from dropbox_data.utils.cache import get_pipeline_cache
+from dropbox_data.utils.metrics import instrument, record
+from dropbox_data.utils.readers import get_csv_reader
+from dropbox_data.utils.schema import apply_schema, select_columns, string_dtype
+from dropbox_data.storage import CsvStorage
+from dropbox_data.config import (
+    DOWNLOAD_WORKERS,
+    DOWNLOAD_MAX_RETRIES,
+    DOWNLOAD_BACKOFF_SECONDS,
+    PIPELINE_QUEUE_SIZE,
+    WRANGLE_WORKERS
+)
+
+logger = logging.getLogger(__name__)
+
+# Marca o fim dos itens de uma fila
+_DONE = object()
+
+@dataclass
+class PipelineReport:
+    """Resultado de uma execução do pipeline em streaming"""
+    downloads: DownloadReport = field(default_factory=DownloadReport)
+    failed: dict = field(default_factory=dict)  # caminho no Dropbox -> mensagem de erro
+    leftover_files: list = field(default_factory=list)  # arquivos com colunas novas
+    records_written: int = 0
+    elapsed_seconds: float = 0.0
+
+    def summary(self):
+        return (f"{len(self.downloads.downloaded)} arquivos baixados, {len(self.failed)} com erro, "
+                f"{len(self.leftover_files)} para merge completo, "
+                f"{self.records_written} registros gravados em {self.elapsed_seconds:.2f}s")
+
+class StreamingPipeline:
+    """
+    Pipeline que sobrepõe download, leitura e processamento dos arquivos.
+
+    Cada arquivo segue para a leitura assim que termina de baixar: seus chunks
+    são acrescentados ao dataset mesclado e guardados num arquivo temporário e,
+    quando o arquivo inteiro entrou no dataset, relidos em chunks e enviados ao
+    wrangling; cada lote processado é gravado na saída enquanto os próximos
+    arquivos ainda estão sendo baixados e mesclados. Se o merge de um arquivo
+    falha (e é desfeito), nenhuma linha dele chega à saída. Os estágios são
+    ligados por filas limitadas: se a gravação atrasa, a leitura espera, e os
+    downloads param de ocupar workers até que haja espaço, o que limita a
+    memória usada.
+
+    Arquivos com colunas desconhecidas pelo dataset mesclado não são lidos e
+    ficam na pasta temporária para o merge completo (PipelineReport.leftover_files).
+    """
+
+    def __init__(self, downloader, output_path: str, chunk_size: int = 100000,
+                 storage_format: str = None, workers: int = None, queue_size: int = None,
+                 download_workers: int = None, max_retries: int = None):
+        self.downloader = downloader
+        self.output_path = output_path
+        self.chunk_size = chunk_size
+        self.storage_format = storage_format
+        self.workers = workers or WRANGLE_WORKERS
+        self.queue_size = queue_size or PIPELINE_QUEUE_SIZE
+        self.download_workers = download_workers or DOWNLOAD_WORKERS
+        self.max_retries = DOWNLOAD_MAX_RETRIES if max_retries is None else max_retries
+        self.report = PipelineReport()
+
+    @instrument('streaming_pipeline')
+    def run(self, dropbox_paths) -> PipelineReport:
+        """
+        Baixa, mescla e processa os arquivos informados.
+
+        Args:
+            dropbox_paths (list): Caminhos dos arquivos no Dropbox
+
+        Returns:
+            PipelineReport: Downloads, falhas por arquivo e registros gravados
+        """
+        try:
+            self.report = PipelineReport()
+            start = time.monotonic()
+            asyncio.run(self._run(list(dropbox_paths)))
+            self.report.elapsed_seconds = time.monotonic() - start
+            self.report.downloads.elapsed_seconds = self.report.elapsed_seconds
+            record(rows_out=self.report.records_written,
+                   bytes_in=self.report.downloads.bytes_downloaded)
+            logger.info(f"Pipeline em streaming concluído: {self.report.summary()}")
+            return self.report
+        except Exception as e:
+            logger.error(f"Erro no pipeline em streaming: {e}")
+            raise
+
+    async def _run(self, dropbox_paths):
+        loop = asyncio.get_running_loop()
+        files = asyncio.Queue(self.queue_size)
+        chunks = asyncio.Queue(self.queue_size)
+
+        # Downloads em várias threads; leitura e gravação em uma thread cada
+        # (a gravação usa a conexão SQLite do índice); wrangling em processos
+        download_pool = ThreadPoolExecutor(self.download_workers)
+        parse_thread = ThreadPoolExecutor(1)
+        write_thread = ThreadPoolExecutor(1)
+        if self.workers > 1:
+            wrangle_pool = ProcessPoolExecutor(self.workers)
+        else:
+            wrangle_pool = ThreadPoolExecutor(1)
+        executors = [download_pool, parse_thread, write_thread, wrangle_pool]
+
+        def run_in(executor, func, *args):
+            return loop.run_in_executor(executor, func, *args)
+
+        output = await run_in(write_thread, ProcessedOutput, self.output_path,
+                              self.chunk_size, self.storage_format)
+        # Lotes já mesclados de cada arquivo, até o merge do arquivo terminar
+        spill_dir = tempfile.mkdtemp(prefix='.streaming_',
+                                     dir=os.path.dirname(self.output_path) or '.')
+        tasks = [
+            asyncio.create_task(self._download_stage(dropbox_paths, files, download_pool, run_in)),
+            asyncio.create_task(self._parse_stage(files, chunks, spill_dir, parse_thread,
+                                                  run_in)),
+            asyncio.create_task(self._wrangle_stage(chunks, output, wrangle_pool,
+                                                    write_thread, run_in)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+            await run_in(write_thread, output.finish)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            await run_in(write_thread, output.close)
+            for executor in executors:
+                executor.shutdown(wait=True, cancel_futures=True)
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+    async def _download_stage(self, dropbox_paths, files, download_pool, run_in):
+        """Baixa os arquivos em paralelo e os entrega à leitura na ordem de conclusão"""
+        report = self.report.downloads
+        total = len(dropbox_paths)
+        semaphore = asyncio.Semaphore(self.download_workers)
+        logger.info(f"Baixando {total} arquivos com {self.download_workers} workers")
+
+        async def fetch(path):
+            # O worker só é liberado quando o arquivo entra na fila (backpressure)
+            async with semaphore:
+                try:
+                    local_path, size = await run_in(download_pool,
+                                                    self.downloader.download_with_retry,
+                                                    path, self.max_retries,
+                                                    DOWNLOAD_BACKOFF_SECONDS)
+                except Exception as e:
+                    logger.error(f"Erro ao baixar arquivo {path}: {e}")
+                    report.failed[path] = self.report.failed[path] = str(e)
+                    return
+                report.downloaded[path] = local_path
+                report.bytes_downloaded += size
+                logger.info(f"Progresso: {len(report.downloaded) + len(report.failed)}/{total} "
+                            f"arquivos, {report.bytes_downloaded/1024/1024:.2f} MB")
+                await files.put((path, local_path))
+
+        await asyncio.gather(*(fetch(path) for path in dropbox_paths))
+        await files.put(_DONE)
+
+    async def _parse_stage(self, files, chunks, spill_dir, parse_thread, run_in):
+        """Acrescenta cada arquivo baixado ao dataset mesclado e envia seus chunks ao wrangling"""
+        storage = self.downloader.storage
+        columns = await run_in(parse_thread,
+                               lambda: storage.columns() if storage.exists() else None)
+        while (item := await files.get()) is not _DONE:
+            path, local_path = item
+            try:
+                header = await run_in(parse_thread, self.downloader.read_header, local_path)
+                columns = columns or header
+                extra = set(header) - set(columns)
+                if extra:
+                    logger.warning(f"Arquivo {local_path} tem colunas novas {sorted(extra)}, "
+                                   "deixado para o merge completo")
+                    self.report.leftover_files.append(local_path)
+                    continue
+
+                # Lotes com os mesmos tipos e colunas da leitura do dataset mesclado
+                selected = select_columns(columns) or columns
+                source_id = await run_in(parse_thread, self._source_id, path, local_path)
+                spill_path = os.path.join(spill_dir, os.path.basename(local_path))
+                await run_in(parse_thread, self._merge_file, local_path, columns, selected,
+                             spill_path)
+                # O arquivo entrou inteiro no dataset mesclado: seus lotes seguem para a saída
+                if os.path.exists(spill_path):
+                    spilled = get_csv_reader().iter_chunks(spill_path, self.chunk_size,
+                                                           dtype=string_dtype(),
+                                                           keep_default_na=False)
+                    position = 0
+                    while (chunk := await run_in(parse_thread, next, spilled, None)) is not None:
+                        position += 1
+                        chunk = await run_in(parse_thread, apply_schema, chunk)
+                        await chunks.put((source_id and f"{source_id}:{position}", chunk))
+                    os.remove(spill_path)
+                os.remove(local_path)
+            except Exception as e:
+                logger.error(f"Erro ao acrescentar o arquivo {local_path}: {e}")
+                self.report.failed[path] = str(e)
+        await chunks.put(_DONE)
+
+    def _merge_file(self, local_path, columns, selected, spill_path):
+        """
+        Acrescenta um arquivo ao dataset mesclado, guardando em spill_path as
+        colunas selected dos chunks gravados. Se o merge falha, spill_path é removido.
+        """
+        spill = CsvStorage(spill_path)
+        try:
+            for chunk in self.downloader.append_file(local_path, columns, self.chunk_size):
+                spill.append(chunk[selected])
+        except Exception:
+            if spill.exists():
+                os.remove(spill_path)
+            raise
+
+    def _source_id(self, path, local_path):
+        """Origem dos lotes de um arquivo no cache do wrangling: seu content_hash do Dropbox"""
+        if get_pipeline_cache().backend is None:
+            return None
+        listing = self.downloader.listing
+        entries = (listing.entries or {}) if listing else {}
+        content_hash = entries.get(path, {}).get('content_hash')
+        return f"{content_hash or dropbox_content_hash(local_path)}:{self.chunk_size}"
+
+    async def _wrangle_stage(self, chunks, output, wrangle_pool, write_thread, run_in):
+        """Processa os lotes e os grava na saída, na ordem em que foram lidos"""
+        pending = deque()
+        max_in_flight = self.workers * 2
+
+        async def write_next():
+            processed_chunk = await pending.popleft()
+            await run_in(write_thread, output.write, processed_chunk)
+            self.report.records_written += len(processed_chunk)
+
+        while (item := await chunks.get()) is not _DONE:
+            source_id, chunk = item
+            chunk = await run_in(write_thread, output.new_posts, chunk)
+            if chunk.empty:
+                continue
+            pending.append(run_in(wrangle_pool, wrangle_cached, chunk, source_id))
+            if len(pending) >= max_in_flight:
+                await write_next()
+        while pending:
+            await write_next()
@@ -0,0 +1,11 @@
+from dropbox_data.storage.backends import (
+    CsvStorage, ParquetStorage, get_storage, get_output_storage
+)
+from dropbox_data.storage.sqlite_store import SqliteStorage
+from dropbox_data.storage.time_partitioned import TimePartitionedStorage
+from dropbox_data.storage.key_index import KeyIndex
+from dropbox_data.storage.fingerprint_index import FingerprintIndex, row_fingerprints
+
+__all__ = ["CsvStorage", "ParquetStorage", "SqliteStorage", "TimePartitionedStorage",
+           "get_storage", "get_output_storage", "KeyIndex", "FingerprintIndex",
+           "row_fingerprints"]
@@ -0,0 +1,370 @@
+import os
+import shutil
+import logging
+import pandas as pd
+from dropbox_data.config import CSV_DELIMITER, STORAGE_FORMAT, SQLITE_PATH, OUTPUT_PARTITION_BY
+from dropbox_data.utils.numbers_formatters import NUMERIC_COLUMNS
+from dropbox_data.utils.readers import CsvReader
+from dropbox_data.storage.sqlite_store import SqliteStorage
+from dropbox_data.storage.time_partitioned import TimePartitionedStorage
+
+logger = logging.getLogger(__name__)
+
+class CsvStorage:
+    """Dataset gravado como um único CSV"""
+
+    format = 'csv'
+
+    def __init__(self, path, delimiter=CSV_DELIMITER, encoding='utf-8-sig'):
+        self.path = path
+        self.delimiter = delimiter
+        self.encoding = encoding
+        self.reader = CsvReader(delimiter, encoding)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def columns(self):
+        return self.reader.columns(self.path)
+
+    def read(self, columns=None, dtype=None):
+        return self.reader.read(self.path, columns=columns, dtype=dtype)
+
+    def iter_chunks(self, chunk_size, columns=None, dtype=None):
+        return self.reader.iter_chunks(self.path, chunk_size, columns=columns, dtype=dtype)
+
+    def write(self, df):
+        # Grava num arquivo temporário e o renomeia: o arquivo anterior só é
+        # substituído quando o novo está completo
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        df.to_csv(tmp_path, sep=self.delimiter, index=False, encoding=self.encoding)
+        os.replace(tmp_path, self.path)
+
+    def append(self, df):
+        if not self.exists():
+            self.write(df)
+            return
+        columns = self.columns()
+        if list(df.columns) != columns:
+            if set(df.columns) - set(columns):
+                # Colunas novas: reescreve o arquivo com o cabeçalho ampliado
+                logger.warning(f"Colunas novas em {self.path}, reescrevendo o arquivo")
+                self.write(pd.concat([self.read(dtype=str), df], ignore_index=True))
+                return
+            df = df.reindex(columns=columns)
+        df.to_csv(self.path, sep=self.delimiter, mode='a', header=False, index=False,
+                  encoding=self.encoding)
+
+    def size_bytes(self):
+        return os.path.getsize(self.path) if self.exists() else 0
+
+    def signature(self):
+        """Identifica o estado atual do arquivo (tamanho e mtime)"""
+        if not self.exists():
+            return ''
+        stat = os.stat(self.path)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def checkpoint(self):
+        """
+        Ponto de restauração: o tamanho do arquivo (os appends só acrescentam ao
+        final) e seu inode, que muda quando append() reescreve o arquivo
+        """
+        if not self.exists():
+            return {'size': 0, 'inode': None}
+        stat = os.stat(self.path)
+        return {'size': stat.st_size, 'inode': stat.st_ino}
+
+    def rollback(self, token):
+        """
+        Descarta o que foi gravado depois do checkpoint token (ex.: um append interrompido).
+
+        Returns:
+            bool: False se o arquivo não corresponde mais ao checkpoint, inclusive
+            se foi reescrito depois dele (ex.: colunas novas)
+        """
+        if isinstance(token, int):
+            # Checkpoint antigo, só com o tamanho
+            token = {'size': token, 'inode': None}
+        elif not isinstance(token, dict) or 'size' not in token:
+            return False
+        if not self.exists():
+            return token['size'] == 0
+        stat = os.stat(self.path)
+        if token['size'] == 0:
+            logger.warning(f"Descartando {stat.st_size} bytes não confirmados de {self.path}")
+            os.remove(self.path)
+            return True
+        if token['inode'] is not None and stat.st_ino != token['inode']:
+            return False
+        if stat.st_size < token['size']:
+            return False
+        if stat.st_size > token['size']:
+            logger.warning(f"Descartando {stat.st_size - token['size']} bytes não confirmados "
+                           f"de {self.path}")
+            with open(self.path, 'r+b') as f:
+                f.truncate(token['size'])
+        return True
+
+    def export_csv(self, path):
+        if os.path.abspath(path) != os.path.abspath(self.path):
+            shutil.copyfile(self.path, path)
+
+class ParquetStorage:
+    """
+    Dataset gravado como um diretório de arquivos Parquet (part-00000.parquet, ...).
+
+    Cada append grava um novo arquivo de partição, sem reescrever os anteriores.
+    O esquema do primeiro arquivo é fixado e aplicado aos seguintes: contadores
+    como Int64, datas como datetime64 e o restante como texto. Um lote com
+    colunas novas grava sua partição com o esquema ampliado; cada partição tem o
+    esquema completo até ela, e as anteriores são lidas com as colunas novas nulas.
+    """
+
+    format = 'parquet'
+
+    def __init__(self, path):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError("O formato parquet requer o pacote pyarrow "
+                              "(pip install dropbox-data-merger[parquet])") from e
+        self.path = path
+
+    def _parts(self):
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(os.path.join(self.path, f) for f in os.listdir(self.path)
+                      if f.startswith('part-') and f.endswith('.parquet'))
+
+    def exists(self):
+        return bool(self._parts())
+
+    def schema(self):
+        import pyarrow.parquet as pq
+
+        # A última partição tem o esquema mais amplo (ver append)
+        parts = self._parts()
+        return pq.read_schema(parts[-1]) if parts else None
+
+    def columns(self):
+        schema = self.schema()
+        return list(schema.names) if schema is not None else []
+
+    @staticmethod
+    def _infer_schema(df):
+        import pyarrow as pa
+
+        fields = []
+        for column in df.columns:
+            dtype = df[column].dtype
+            if pd.api.types.is_datetime64_any_dtype(dtype):
+                field_type = pa.timestamp('ns')
+            elif pd.api.types.is_bool_dtype(dtype):
+                field_type = pa.bool_()
+            elif pd.api.types.is_integer_dtype(dtype) or (
+                    column in NUMERIC_COLUMNS and pd.api.types.is_numeric_dtype(dtype)):
+                field_type = pa.int64()
+            elif pd.api.types.is_float_dtype(dtype):
+                field_type = pa.float64()
+            else:
+                field_type = pa.string()
+            fields.append(pa.field(column, field_type))
+        return pa.schema(fields)
+
+    @staticmethod
+    def _to_table(df, schema):
+        import pyarrow as pa
+
+        extra = set(df.columns) - set(schema.names)
+        if extra:
+            raise ValueError(f"Colunas fora do esquema do dataset: {sorted(extra)}")
+
+        df = df.reindex(columns=schema.names)
+        for field in schema:
+            column = df[field.name]
+            if pa.types.is_string(field.type):
+                column = column.astype('string').replace('', pd.NA)
+            elif pa.types.is_integer(field.type):
+                column = column.astype('Int64')
+            elif pa.types.is_timestamp(field.type):
+                column = pd.to_datetime(column).astype('datetime64[ns]')
+            df[field.name] = column
+        return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+    @staticmethod
+    def _to_pandas(table, dtype=None):
+        import pyarrow as pa
+
+        df = table.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+        return df.astype(dtype) if dtype else df
+
+    @staticmethod
+    def _conform(table, schema, names):
+        """Tabela com as colunas names do esquema; as que a partição não tem ficam nulas"""
+        import pyarrow as pa
+
+        for name in names:
+            if name not in table.column_names:
+                field = schema.field(name)
+                table = table.append_column(field, pa.nulls(len(table), field.type))
+        return table.select(names)
+
+    def read(self, columns=None, dtype=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = self.schema()
+        if schema is None:
+            return pd.DataFrame(columns=columns or [])
+        names = columns or schema.names
+        tables = []
+        for part in self._parts():
+            available = set(pq.read_schema(part).names)
+            table = pq.read_table(part, columns=[name for name in names if name in available])
+            tables.append(self._conform(table, schema, names))
+        return self._to_pandas(pa.concat_tables(tables), dtype)
+
+    def iter_chunks(self, chunk_size, columns=None, dtype=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = self.schema()
+        names = columns or (schema.names if schema is not None else [])
+        for part in self._parts():
+            parquet_file = pq.ParquetFile(part)
+            available = set(parquet_file.schema_arrow.names)
+            for batch in parquet_file.iter_batches(
+                    batch_size=chunk_size, columns=[name for name in names if name in available]):
+                table = self._conform(pa.Table.from_batches([batch]), schema, names)
+                yield self._to_pandas(table, dtype)
+
+    def _next_index(self, parts):
+        if not parts:
+            return 0
+        return int(os.path.basename(parts[-1])[len('part-'):-len('.parquet')]) + 1
+
+    def _write_part(self, df, schema, index):
+        import pyarrow.parquet as pq
+
+        os.makedirs(self.path, exist_ok=True)
+        final_path = os.path.join(self.path, f"part-{index:05d}.parquet")
+        tmp_path = final_path + '.tmp'
+        pq.write_table(self._to_table(df, schema), tmp_path)
+        os.replace(tmp_path, final_path)
+
+    def write(self, df):
+        old_parts = self._parts()
+        index = self._next_index(old_parts)
+        # Grava o novo conteúdo antes de remover as partições antigas
+        self._write_part(df, self._infer_schema(df), index)
+        for part in old_parts:
+            os.remove(part)
+        os.replace(os.path.join(self.path, f"part-{index:05d}.parquet"),
+                   os.path.join(self.path, "part-00000.parquet"))
+
+    def append(self, df):
+        import pyarrow as pa
+
+        parts = self._parts()
+        if not parts:
+            self.write(df)
+            return
+        schema = self.schema()
+        extra = [column for column in df.columns if column not in schema.names]
+        if extra:
+            logger.warning(f"Colunas novas {extra} em {self.path}, ampliando o esquema")
+            schema = pa.schema(list(schema) + list(self._infer_schema(df[extra])))
+        self._write_part(df, schema, self._next_index(parts))
+
+    def size_bytes(self):
+        return sum(os.path.getsize(part) for part in self._parts())
+
+    def signature(self):
+        """Identifica o estado atual do dataset (partições, tamanhos e mtimes)"""
+        signature = []
+        for part in self._parts():
+            stat = os.stat(part)
+            signature.append(f"{os.path.basename(part)}:{stat.st_size}:{stat.st_mtime_ns}")
+        return ','.join(signature)
+
+    def checkpoint(self):
+        """Ponto de restauração: as partições existentes"""
+        return [os.path.basename(part) for part in self._parts()]
+
+    def rollback(self, token):
+        """
+        Remove as partições gravadas depois do checkpoint token.
+
+        Returns:
+            bool: False se alguma partição do checkpoint não existe mais
+        """
+        parts = {os.path.basename(part): part for part in self._parts()}
+        if set(token) - set(parts):
+            return False
+        for name, part in parts.items():
+            if name not in token:
+                logger.warning(f"Descartando partição não confirmada {part}")
+                os.remove(part)
+        return True
+
+    def export_csv(self, path, chunk_size=100000):
+        """Exporta o dataset para um CSV no formato usado pelo restante do pipeline"""
+        csv_storage = CsvStorage(path)
+        first = True
+        for chunk in self.iter_chunks(chunk_size):
+            if first:
+                csv_storage.write(chunk)
+                first = False
+            else:
+                csv_storage.append(chunk)
+        logger.info(f"Dataset {self.path} exportado para {path}")
+
+def get_storage(path, storage_format=None):
+    """
+    Retorna o backend de armazenamento para um dataset.
+
+    Args:
+        path (str): Caminho do dataset no formato CSV (ex.: src/csv_files/data.csv)
+        storage_format (str): 'csv', 'parquet' ou 'sqlite'; padrão STORAGE_FORMAT
+
+    Returns:
+        CsvStorage | ParquetStorage | SqliteStorage: Backend do dataset. No formato
+        parquet o dataset fica num diretório com o mesmo nome e extensão .parquet;
+        no sqlite, numa tabela com o nome do arquivo (ex.: data) em SQLITE_PATH
+    """
+    storage_format = (storage_format or STORAGE_FORMAT).lower()
+    if storage_format == 'csv':
+        return CsvStorage(path)
+    if storage_format == 'parquet':
+        return ParquetStorage(os.path.splitext(path)[0] + '.parquet')
+    if storage_format == 'sqlite':
+        return SqliteStorage(SQLITE_PATH, os.path.splitext(os.path.basename(path))[0])
+    raise ValueError(f"Formato de armazenamento desconhecido: {storage_format}")
+
+# Colunas de data da saída processada aceitas em OUTPUT_PARTITION_BY
+PARTITION_COLUMNS = ('base_time', 'post_extracted_datetime')
+
+def get_output_storage(path, storage_format=None, partition_by=None):
+    """
+    Retorna o backend da saída processada, particionada por data se configurado.
+
+    Args:
+        path (str): Caminho da saída no formato CSV (ex.: src/csv_files/final_data.csv)
+        storage_format (str): 'csv', 'parquet' ou 'sqlite'; padrão STORAGE_FORMAT
+        partition_by (str): Coluna de data do particionamento; padrão OUTPUT_PARTITION_BY
+
+    Returns:
+        TimePartitionedStorage | CsvStorage | ParquetStorage | SqliteStorage: Com
+        particionamento (exceto no sqlite), o dataset fica num diretório com o
+        nome do arquivo sem extensão (ex.: src/csv_files/final_data/date=2024-01-31/)
+    """
+    storage_format = (storage_format or STORAGE_FORMAT).lower()
+    partition_by = partition_by if partition_by is not None else OUTPUT_PARTITION_BY
+    if not partition_by or storage_format == 'sqlite':
+        return get_storage(path, storage_format)
+    if partition_by not in PARTITION_COLUMNS:
+        raise ValueError(f"Coluna de particionamento desconhecida: {partition_by} "
+                         f"(use {' ou '.join(PARTITION_COLUMNS)})")
+    return TimePartitionedStorage(os.path.splitext(path)[0], partition_by, storage_format)
@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import logging
+import numpy as np
+import pandas as pd
+from dropbox_data.utils.readers import NA_VALUES
+from dropbox_data.utils.schema import string_dtype
+
+logger = logging.getLogger(__name__)
+
+def row_fingerprints(df: pd.DataFrame, columns=None) -> np.ndarray:
+    """
+    Impressão digital de 64 bits de cada linha, calculada de forma vetorizada.
+
+    Os valores são comparados como texto, e os ausentes (NaN, '' ou qualquer
+    valor de NA_VALUES) são equivalentes, de modo que a mesma linha tem a
+    mesma impressão lida de um arquivo baixado (keep_default_na=False) ou do
+    dataset mesclado. A ordem das colunas não altera o resultado.
+
+    Args:
+        df (pd.DataFrame): Linhas
+        columns (list): Colunas comparadas; padrão todas
+
+    Returns:
+        np.ndarray: Impressões como int64, alinhadas com df
+    """
+    frame = df[sorted(columns or df.columns)].astype(object)
+    frame = frame.where(frame.notna() & ~frame.isin(NA_VALUES), '').astype(str)
+    hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    return hashes.view(np.int64)
+
+class FingerprintIndex:
+    """
+    Conjunto persistente de impressões digitais de linhas em SQLite.
+
+    Como o KeyIndex, é consultado por chunk inteiro e guarda a assinatura do
+    dataset a que corresponde, sendo reconstruído (em chunks) quando o dataset
+    muda por fora. Com 64 bits, a chance de duas linhas distintas colidirem é
+    desprezível mesmo com bilhões de linhas.
+
+    A conexão pode ser usada de outra thread que não a que abriu o índice,
+    desde que as chamadas não sejam simultâneas (ex.: merge em uma única thread).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints (fingerprint INTEGER PRIMARY KEY)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute("CREATE TEMP TABLE probe (fingerprint INTEGER PRIMARY KEY)")
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+
+    def contains(self, fingerprints):
+        """
+        Verifica quais impressões já estão no índice.
+
+        Returns:
+            np.ndarray: Máscara booleana alinhada com fingerprints
+        """
+        fingerprints = np.asarray(fingerprints, dtype=np.int64)
+        with self.conn:
+            self.conn.execute("DELETE FROM probe")
+            self.conn.executemany("INSERT OR IGNORE INTO probe VALUES (?)",
+                                  ((int(value),) for value in np.unique(fingerprints)))
+            found = np.fromiter((row[0] for row in self.conn.execute(
+                "SELECT p.fingerprint FROM probe p JOIN fingerprints f "
+                "ON f.fingerprint = p.fingerprint"
+            )), dtype=np.int64)
+            self.conn.execute("DELETE FROM probe")
+        return np.isin(fingerprints, found)
+
+    def add(self, fingerprints):
+        """Adiciona impressões ao índice (as já existentes são ignoradas)"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO fingerprints VALUES (?)",
+                ((int(value),) for value in np.unique(np.asarray(fingerprints, dtype=np.int64)))
+            )
+
+    def new_rows(self, df: pd.DataFrame, columns=None):
+        """
+        Remove do lote as linhas já indexadas e as repetidas dentro do próprio lote.
+
+        As impressões das linhas mantidas não são adicionadas ao índice: o
+        chamador as adiciona com add() depois de gravar as linhas, para que
+        uma falha na gravação não faça com que sejam descartadas depois.
+
+        Returns:
+            tuple: (linhas novas, suas impressões)
+        """
+        fingerprints = row_fingerprints(df, columns)
+        keep = ~(pd.Series(fingerprints).duplicated().to_numpy() | self.contains(fingerprints))
+        return df[keep], fingerprints[keep]
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM fingerprints")
+            self.conn.execute("DELETE FROM meta")
+
+    def get_meta(self, name):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, name, value):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, value))
+
+    def replace(self, fingerprints, signature, columns=None):
+        """Substitui o conteúdo do índice pelas impressões de um dataset recém-gravado"""
+        self.clear()
+        self.add(fingerprints)
+        self.set_meta('signature', signature)
+        self.set_meta('columns', ','.join(columns or []))
+
+    def sync_with(self, storage, columns=None, chunk_size=100000):
+        """
+        Garante que o índice corresponde ao dataset informado e às colunas comparadas.
+
+        Se a assinatura do dataset ou as colunas mudaram desde a última
+        atualização, o índice é reconstruído lendo o dataset em chunks, como
+        texto: com inferência de tipos, valores como '007' ou '1.500' mudariam e
+        as linhas já gravadas não seriam reconhecidas no merge.
+        """
+        signature = storage.signature()
+        key = ','.join(columns or [])
+        if self.get_meta('signature') == signature and self.get_meta('columns') == key:
+            return
+
+        self.clear()
+        if storage.exists():
+            logger.info(f"Reconstruindo índice {self.path} a partir de {storage.path}")
+            for chunk in storage.iter_chunks(chunk_size, columns=columns or None,
+                                             dtype=string_dtype()):
+                self.add(row_fingerprints(chunk, columns))
+            logger.info(f"Índice reconstruído com {len(self)} impressões")
+        self.set_meta('signature', signature)
+        self.set_meta('columns', key)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,121 @@
+import os
+import sqlite3
+import logging
+import pandas as pd
+from dropbox_data.utils.schema import string_dtype
+
+logger = logging.getLogger(__name__)
+
+class KeyIndex:
+    """
+    Conjunto persistente de chaves (ex.: post_ids já gravados) em SQLite.
+
+    A consulta é feita por chunk inteiro: as chaves distintas do chunk vão para
+    uma tabela temporária e são cruzadas com o índice num único JOIN, então o
+    custo não depende do tamanho do histórico nem exige carregá-lo em memória.
+
+    Cada abertura do índice define uma geração; contains() considera apenas as
+    chaves de gerações anteriores, de modo que as chaves gravadas durante a
+    execução atual não filtram os chunks seguintes da mesma execução.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS keys (key TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+            " WITHOUT ROWID"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute("CREATE TEMP TABLE probe (key TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.generation = self.conn.execute(
+            "SELECT COALESCE(MAX(generation), 0) + 1 FROM keys"
+        ).fetchone()[0]
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM keys").fetchone()[0]
+
+    @staticmethod
+    def _keys(values):
+        return pd.Series(values).dropna().astype(str).unique()
+
+    def contains(self, values):
+        """
+        Verifica, de forma vetorizada, quais valores já estão no índice.
+
+        Args:
+            values (pd.Series | array-like): Chaves a consultar
+
+        Returns:
+            np.ndarray: Máscara booleana alinhada com values
+        """
+        keys = pd.Series(values)
+        with self.conn:
+            self.conn.execute("DELETE FROM probe")
+            self.conn.executemany("INSERT INTO probe VALUES (?)",
+                                  ((key,) for key in self._keys(keys)))
+            found = {row[0] for row in self.conn.execute(
+                "SELECT p.key FROM probe p JOIN keys k ON k.key = p.key WHERE k.generation < ?",
+                (self.generation,)
+            )}
+            self.conn.execute("DELETE FROM probe")
+        return keys.astype(str).isin(found).to_numpy() & keys.notna().to_numpy()
+
+    def add(self, values, meta=None):
+        """
+        Adiciona chaves ao índice (chaves já existentes são ignoradas).
+
+        Args:
+            values (pd.Series | array-like): Chaves
+            meta (dict): Metadados gravados na mesma transação que as chaves
+        """
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO keys VALUES (?, ?)",
+                ((key, self.generation) for key in self._keys(values))
+            )
+            self.conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                  (meta or {}).items())
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM keys")
+            self.conn.execute("DELETE FROM meta")
+        self.generation = 1
+
+    def get_meta(self, name):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, name, value):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, value))
+
+    def sync_with(self, storage, column, chunk_size=100000):
+        """
+        Garante que o índice corresponde ao dataset informado.
+
+        O índice guarda a assinatura (tamanho/mtime) do dataset da última
+        atualização; se ela não bate, o índice é reconstruído a partir da
+        coluna do dataset, lida como texto (como as chaves gravadas por add(): com
+        inferência de tipos, '007' viraria '7.0'). Nas execuções normais nada é
+        lido do histórico.
+        """
+        signature = storage.signature()
+        if self.get_meta('signature') == signature:
+            return
+
+        self.clear()
+        if storage.exists():
+            logger.info(f"Reconstruindo índice {self.path} a partir de {storage.path}")
+            for chunk in storage.iter_chunks(chunk_size, columns=[column], dtype=string_dtype()):
+                self.add(chunk[column])
+            self.generation += 1
+            logger.info(f"Índice reconstruído com {len(self)} chaves")
+        self.set_meta('signature', signature)
+
+    def close(self):
+        self.conn.close()
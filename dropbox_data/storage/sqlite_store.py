@@ -0,0 +1,300 @@
+import os
+import sqlite3
+import logging
+from contextlib import closing
+import pandas as pd
+from dropbox_data.utils.date_extractor import parse_extracted_datetime
+
+logger = logging.getLogger(__name__)
+
+# Chave de um snapshot: as linhas repetidas são atualizadas no lugar (upsert)
+KEY_COLUMNS = ['post_id', 'post_extracted_datetime']
+
+# post_extracted_datetime convertida para ISO na gravação (mesmo parser do
+# wrangling), ordenável e indexada; NULL para datas inválidas, como o NaT do pandas
+DERIVED_COLUMN = '_extracted_at'
+ISO_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Views sobre o dataset mesclado (ver SqliteStorage.refresh_views)
+LATEST_VIEW = 'latest_posts'
+PROCESSED_VIEW = 'processed_posts'
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+class SqliteStorage:
+    """
+    Dataset gravado como uma tabela num banco SQLite embutido.
+
+    Os valores são guardados como texto, exatamente como vieram dos CSVs, com
+    vazios como NULL (nas colunas da chave, como '', para que o índice único
+    também trate as linhas sem data como repetidas). Com
+    as colunas post_id e post_extracted_datetime, a tabela tem um índice único
+    nesse par: gravar de novo um snapshot já existente atualiza a linha em vez
+    de duplicá-la, e um segundo índice (post_id, data ISO) atende as views de
+    base_time e do registro mais recente de cada post sem reler a tabela toda.
+    Colunas novas são acrescentadas com ALTER TABLE, sem reescrever os dados.
+
+    A conexão é aberta a cada operação, então a mesma instância pode ser usada
+    de threads diferentes.
+    """
+
+    format = 'sqlite'
+
+    def __init__(self, db_path, table):
+        self.db_path = db_path
+        self.table = table
+        self.path = f"{db_path}:{table}"
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return closing(conn)
+
+    def _columns(self, conn):
+        rows = conn.execute(f"PRAGMA table_info({_quote(self.table)})").fetchall()
+        return [row[1] for row in rows if row[1] != DERIVED_COLUMN]
+
+    def exists(self):
+        if not os.path.exists(self.db_path):
+            return False
+        with self._connect() as conn:
+            return bool(self._columns(conn))
+
+    def columns(self):
+        if not os.path.exists(self.db_path):
+            return []
+        with self._connect() as conn:
+            return self._columns(conn)
+
+    def _keyed(self, columns):
+        return all(column in columns for column in KEY_COLUMNS)
+
+    def _create(self, conn, columns):
+        definitions = [f"{_quote(column)} TEXT" for column in columns]
+        if self._keyed(columns):
+            definitions.append(f"{DERIVED_COLUMN} TEXT")
+        conn.execute(f"CREATE TABLE {_quote(self.table)} ({', '.join(definitions)})")
+        if self._keyed(columns):
+            conn.execute(f"CREATE UNIQUE INDEX {_quote(self.table + '_key')} "
+                         f"ON {_quote(self.table)} (post_id, post_extracted_datetime)")
+            conn.execute(f"CREATE INDEX {_quote(self.table + '_post_time')} "
+                         f"ON {_quote(self.table)} (post_id, {DERIVED_COLUMN})")
+
+    def _insert(self, conn, df):
+        """Grava df na tabela (upsert pela chave), criando a tabela ou colunas que faltam"""
+        columns = self._columns(conn)
+        if not columns:
+            self._create(conn, list(df.columns))
+            columns = list(df.columns)
+        for column in df.columns:
+            if column not in columns:
+                logger.info(f"Coluna nova {column} acrescentada à tabela {self.table}")
+                conn.execute(f"ALTER TABLE {_quote(self.table)} ADD COLUMN {_quote(column)} TEXT")
+
+        # Texto, com vazios e ausentes como NULL ('' nas colunas da chave)
+        values = df.astype(object).where(df.notna(), None)
+        other_columns = [column for column in df.columns if column not in KEY_COLUMNS]
+        values[other_columns] = values[other_columns].replace('', None)
+        key_columns = [column for column in df.columns if column in KEY_COLUMNS]
+        values[key_columns] = values[key_columns].fillna('')
+
+        keyed = self._keyed(columns) and self._keyed(df.columns)
+        if keyed:
+            extracted_at = parse_extracted_datetime(df['post_extracted_datetime'])
+            values[DERIVED_COLUMN] = extracted_at.dt.strftime(ISO_FORMAT).astype(object)
+            values[DERIVED_COLUMN] = values[DERIVED_COLUMN].where(extracted_at.notna(), None)
+
+        names = ', '.join(_quote(column) for column in values.columns)
+        placeholders = ', '.join('?' for _ in values.columns)
+        sql = f"INSERT INTO {_quote(self.table)} ({names}) VALUES ({placeholders})"
+        if keyed:
+            updates = ', '.join(f"{_quote(column)} = excluded.{_quote(column)}"
+                                for column in values.columns if column not in KEY_COLUMNS)
+            sql += (" ON CONFLICT (post_id, post_extracted_datetime) "
+                    f"DO UPDATE SET {updates}")
+
+        conn.executemany(sql, (tuple(str(value) if value is not None else None
+                                     for value in row)
+                               for row in values.itertuples(index=False, name=None)))
+
+    def _select(self, conn, columns):
+        """SELECT da tabela em ordem de gravação, com os vazios da chave de volta a NULL"""
+        names = ', '.join(
+            f"NULLIF({_quote(column)}, '') AS {_quote(column)}" if column in KEY_COLUMNS
+            else _quote(column)
+            for column in (columns or self._columns(conn))
+        )
+        return f"SELECT {names} FROM {_quote(self.table)} ORDER BY rowid"
+
+    def read(self, columns=None, dtype=None):
+        if not self.exists():
+            return pd.DataFrame(columns=columns or [])
+        with self._connect() as conn:
+            df = pd.read_sql_query(self._select(conn, columns), conn)
+        return df.astype(dtype) if dtype else df
+
+    def iter_chunks(self, chunk_size, columns=None, dtype=None):
+        if not self.exists():
+            return
+        with self._connect() as conn:
+            for chunk in pd.read_sql_query(self._select(conn, columns), conn,
+                                           chunksize=chunk_size):
+                yield chunk.astype(dtype) if dtype else chunk
+
+    def write(self, df):
+        with self._connect() as conn, conn:
+            conn.execute(f"DROP TABLE IF EXISTS {_quote(self.table)}")
+            self._insert(conn, df)
+
+    def append(self, df):
+        with self._connect() as conn, conn:
+            self._insert(conn, df)
+
+    def size_bytes(self):
+        return os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+
+    def signature(self):
+        """Identifica o estado atual da tabela (linhas e maior rowid)"""
+        if not self.exists():
+            return ''
+        with self._connect() as conn:
+            count, last = conn.execute(
+                f"SELECT COUNT(*), MAX(rowid) FROM {_quote(self.table)}"
+            ).fetchone()
+        return f"{self.table}:{count}:{last}"
+
+    def checkpoint(self):
+        """Ponto de restauração: o maior rowid da tabela"""
+        if not self.exists():
+            return 0
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COALESCE(MAX(rowid), 0) "
+                                f"FROM {_quote(self.table)}").fetchone()[0]
+
+    def rollback(self, token):
+        """
+        Remove as linhas inseridas depois do checkpoint token.
+
+        Cada append já é uma transação; linhas atualizadas pelo upsert mantêm
+        o novo valor, que é o mesmo gravado de novo ao repetir o merge.
+        """
+        if not self.exists():
+            return token == 0
+        with self._connect() as conn, conn:
+            deleted = conn.execute(f"DELETE FROM {_quote(self.table)} WHERE rowid > ?",
+                                   (token,)).rowcount
+        if deleted:
+            logger.warning(f"{deleted} linhas não confirmadas removidas de {self.table}")
+        return True
+
+    def export_csv(self, path, chunk_size=100000):
+        """Exporta a tabela para um CSV no formato usado pelo restante do pipeline"""
+        from dropbox_data.storage.backends import CsvStorage
+
+        csv_storage = CsvStorage(path)
+        first = True
+        for chunk in self.iter_chunks(chunk_size):
+            if first:
+                csv_storage.write(chunk)
+                first = False
+            else:
+                csv_storage.append(chunk)
+        logger.info(f"Tabela {self.table} exportada para {path}")
+
+    def refresh_views(self):
+        """
+        (Re)cria as views do processamento sobre a tabela, com as colunas atuais.
+
+        latest_posts: uma linha por post, com base_time (data mais antiga), a
+        data mais recente, o número de snapshots e, em cada coluna, o último
+        valor não nulo em ordem de data; datas inválidas contam como as mais
+        recentes, como na ordenação do pandas (NaT por último).
+
+        processed_posts: uma linha por snapshot com post_id, os valores de
+        latest_posts, a própria data e o base_time do post; é o mesmo resultado
+        de wrangle_dataframe, antes da formatação dos campos numéricos.
+        """
+        with self._connect() as conn, conn:
+            columns = self._columns(conn)
+            if not self._keyed(columns):
+                raise ValueError(f"Tabela {self.table} sem as colunas {KEY_COLUMNS}")
+            table = _quote(self.table)
+            other_columns = [column for column in columns if column not in KEY_COLUMNS]
+            # Uma ordenação só: cada snapshot recebe sua posição no post em ordem
+            # de data, com as datas inválidas por último (como o NaT no pandas), e
+            # em cada coluna fica o valor não nulo de maior posição (o MAX de
+            # posição || valor; as colunas são TEXT)
+            ordered = f"{DERIVED_COLUMN} IS NULL, {DERIVED_COLUMN}, rowid"
+            latest = ''.join(
+                f"substr(MAX(CASE WHEN {_quote(column)} IS NOT NULL "
+                f"THEN printf('%010d', _position) || {_quote(column)} END), 11) "
+                f"AS {_quote(column)}, "
+                for column in other_columns
+            )
+            names = ''.join(f"{_quote(column)}, " for column in other_columns)
+            conn.execute(f"DROP VIEW IF EXISTS {PROCESSED_VIEW}")
+            conn.execute(f"DROP VIEW IF EXISTS {LATEST_VIEW}")
+            conn.execute(f"""
+                CREATE VIEW {LATEST_VIEW} AS
+                SELECT post_id, {latest}MIN({DERIVED_COLUMN}) AS base_time,
+                       MAX({DERIVED_COLUMN}) AS last_extracted_at, COUNT(*) AS snapshots
+                FROM (
+                    SELECT post_id, {names}{DERIVED_COLUMN},
+                           ROW_NUMBER() OVER (PARTITION BY post_id ORDER BY {ordered}) AS _position
+                    FROM {table} WHERE post_id <> ''
+                )
+                GROUP BY post_id
+            """)
+            values = ''.join(f"l.{_quote(column)}, " for column in other_columns)
+            conn.execute(f"""
+                CREATE VIEW {PROCESSED_VIEW} AS
+                SELECT d.post_id, {values}d.{DERIVED_COLUMN} AS post_extracted_datetime,
+                       l.base_time
+                FROM {table} AS d JOIN {LATEST_VIEW} AS l ON l.post_id = d.post_id
+            """)
+        logger.info(f"Views {LATEST_VIEW} e {PROCESSED_VIEW} atualizadas sobre {self.table}")
+
+    def iter_processed(self, chunk_size=100000):
+        """
+        Lê processed_posts em chunks, com datas convertidas e campos numéricos formatados.
+
+        Yields:
+            pd.DataFrame: Chunks no formato de saída de wrangle_dataframe
+        """
+        from dropbox_data.utils.numbers_formatters import format_numeric_columns
+
+        self.refresh_views()
+        with self._connect() as conn:
+            for chunk in pd.read_sql_query(
+                f"SELECT * FROM {PROCESSED_VIEW} ORDER BY post_id, "
+                "post_extracted_datetime IS NULL, post_extracted_datetime",
+                conn, chunksize=chunk_size
+            ):
+                for column in ('post_extracted_datetime', 'base_time'):
+                    chunk[column] = pd.to_datetime(chunk[column], format=ISO_FORMAT)
+                yield format_numeric_columns(chunk)
+
+    def export_processed(self, output_path, storage_format='csv', chunk_size=100000):
+        """
+        Exporta processed_posts para um arquivo CSV ou Parquet, sob demanda.
+
+        Com OUTPUT_PARTITION_BY, a exportação é particionada por data.
+
+        Returns:
+            int: Registros exportados
+        """
+        from dropbox_data.storage.backends import get_output_storage
+
+        output = get_output_storage(output_path, storage_format)
+        total = 0
+        for chunk in self.iter_processed(chunk_size):
+            if total == 0:
+                output.write(chunk)
+            else:
+                output.append(chunk)
+            total += len(chunk)
+        logger.info(f"{total} registros processados exportados para {output.path}")
+        return total
@@ -0,0 +1,248 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = '_manifest.json'
+
+# Partição das linhas sem data (NaT)
+UNKNOWN_PARTITION = 'unknown'
+
+def _as_datetime(values: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values
+    return pd.to_datetime(values, format='ISO8601', errors='coerce')
+
+def _timestamp(value):
+    return None if value is None else pd.Timestamp(value)
+
+def _range_end(value):
+    """Fim de um intervalo; uma data sem hora (ex.: '2024-01-31') inclui o dia todo"""
+    end = _timestamp(value)
+    if isinstance(value, str) and len(value.strip()) == 10:
+        end += pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+    return end
+
+class TimePartitionedStorage:
+    """
+    Dataset particionado por data, num diretório com uma partição por dia.
+
+    Cada partição (date=AAAA-MM-DD) é um dataset CSV ou Parquet comum, e o
+    arquivo _manifest.json guarda, por partição, o número de linhas e as datas
+    mínima e máxima da coluna de particionamento. Um append grava apenas nas
+    partições das datas presentes no lote, e as leituras com start/end abrem
+    apenas as partições cujo intervalo se sobrepõe ao pedido.
+
+    Args:
+        path (str): Diretório do dataset
+        partition_by (str): Coluna de data usada no particionamento (ex.: base_time)
+        storage_format (str): Formato das partições, 'csv' ou 'parquet'
+    """
+
+    def __init__(self, path, partition_by, storage_format='csv'):
+        from dropbox_data.storage.backends import get_storage
+
+        self.path = path
+        self.partition_by = partition_by
+        self.storage_format = storage_format
+        self.format = storage_format
+        self._get_storage = get_storage
+        manifest = self._manifest()
+        if manifest['partitions'] and manifest['partition_by'] != partition_by:
+            raise ValueError(f"{path} está particionado por {manifest['partition_by']}, "
+                             f"não por {partition_by}")
+
+    # Manifesto
+
+    def _manifest_path(self):
+        return os.path.join(self.path, MANIFEST_NAME)
+
+    def _manifest(self):
+        if not os.path.exists(self._manifest_path()):
+            return {'partition_by': self.partition_by, 'columns': [], 'partitions': {}}
+        with open(self._manifest_path(), 'r') as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest):
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = self._manifest_path() + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self._manifest_path())
+
+    def partition_stats(self):
+        """Partição -> {'rows', 'min', 'max'} (datas em ISO), do manifesto"""
+        return self._manifest()['partitions']
+
+    def _partition_dirs(self):
+        """Partições presentes no disco, inclusive as ainda fora do manifesto"""
+        if not os.path.isdir(self.path):
+            return []
+        return [entry.name[len('date='):] for entry in os.scandir(self.path)
+                if entry.is_dir() and entry.name.startswith('date=')]
+
+    # Partições
+
+    def _partition(self, name):
+        return self._get_storage(os.path.join(self.path, f"date={name}", 'data.csv'),
+                                 self.storage_format)
+
+    def partitions(self, start=None, end=None):
+        """
+        Partições cujo intervalo [min, max] se sobrepõe a [start, end], em ordem de data.
+
+        Os limites são inclusivos (end sem hora inclui o dia todo); a partição das
+        linhas sem data só é incluída quando não há intervalo.
+        """
+        start, end = _timestamp(start), _range_end(end)
+        selected = []
+        for name, stats in sorted(self.partition_stats().items()):
+            if name == UNKNOWN_PARTITION or stats['min'] is None:
+                if start is None and end is None:
+                    selected.append(name)
+                continue
+            if start is not None and pd.Timestamp(stats['max']) < start:
+                continue
+            if end is not None and pd.Timestamp(stats['min']) > end:
+                continue
+            selected.append(name)
+        return selected
+
+    def _partition_names(self, df):
+        dates = _as_datetime(df[self.partition_by])
+        return dates.dt.strftime('%Y-%m-%d').fillna(UNKNOWN_PARTITION), dates
+
+    # Interface de armazenamento
+
+    def exists(self):
+        return bool(self.partition_stats())
+
+    def columns(self):
+        return list(self._manifest()['columns'])
+
+    def _filter(self, df, start, end):
+        if start is None and end is None:
+            return df
+        dates = _as_datetime(df[self.partition_by])
+        mask = dates.notna()
+        if start is not None:
+            mask &= dates >= _timestamp(start)
+        if end is not None:
+            mask &= dates <= _range_end(end)
+        return df[mask]
+
+    def iter_chunks(self, chunk_size, columns=None, dtype=None, start=None, end=None):
+        """Lê as partições selecionadas (ver partitions) em chunks, em ordem de data"""
+        ranged = start is not None or end is not None
+        read_columns = columns
+        if ranged and columns and self.partition_by not in columns:
+            read_columns = list(columns) + [self.partition_by]
+        for name in self.partitions(start, end):
+            for chunk in self._partition(name).iter_chunks(chunk_size, columns=read_columns,
+                                                           dtype=dtype):
+                chunk = self._filter(chunk, start, end)
+                if columns:
+                    chunk = chunk.reindex(columns=columns)
+                if not chunk.empty:
+                    yield chunk
+
+    def read(self, columns=None, dtype=None, start=None, end=None):
+        """Lê as partições selecionadas; com start/end, apenas as linhas do intervalo"""
+        frames = [chunk for chunk in self.iter_chunks(1_000_000, columns, dtype, start, end)]
+        if not frames:
+            return pd.DataFrame(columns=columns or self.columns())
+        return pd.concat(frames, ignore_index=True).reindex(columns=columns or self.columns())
+
+    def _append(self, df, manifest):
+        names, dates = self._partition_names(df)
+        for name, part in df.groupby(names, sort=True):
+            self._partition(name).append(part)
+            part_dates = dates[part.index]
+            stats = manifest['partitions'].setdefault(name, {'rows': 0, 'min': None,
+                                                             'max': None})
+            stats['rows'] += len(part)
+            if part_dates.notna().any():
+                low = part_dates.min().isoformat(sep=' ')
+                high = part_dates.max().isoformat(sep=' ')
+                stats['min'] = low if stats['min'] is None else min(stats['min'], low)
+                stats['max'] = high if stats['max'] is None else max(stats['max'], high)
+        manifest['partition_by'] = self.partition_by
+        manifest['columns'] += [column for column in df.columns
+                                if column not in manifest['columns']]
+        self._save_manifest(manifest)
+
+    def append(self, df):
+        self._append(df, self._manifest())
+
+    def write(self, df):
+        # Monta o novo dataset ao lado e troca os diretórios
+        tmp_path = self.path + '.tmp'
+        old_path = self.path + '.old'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        staging = TimePartitionedStorage(tmp_path, self.partition_by, self.storage_format)
+        staging._append(df, staging._manifest())
+        if os.path.exists(self.path):
+            os.replace(self.path, old_path)
+        os.replace(tmp_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+    def size_bytes(self):
+        return sum(self._partition(name).size_bytes() for name in self.partition_stats())
+
+    def signature(self):
+        """Identifica o estado atual do dataset (assinaturas das partições)"""
+        if not self.exists():
+            return ''
+        digest = hashlib.sha1()
+        for name in sorted(self.partition_stats()):
+            digest.update(f"{name}={self._partition(name).signature()};".encode())
+        return digest.hexdigest()
+
+    def checkpoint(self):
+        """Ponto de restauração: o manifesto e o checkpoint de cada partição"""
+        manifest = self._manifest()
+        manifest['storages'] = {name: self._partition(name).checkpoint()
+                                for name in manifest['partitions']}
+        return manifest
+
+    def rollback(self, token):
+        """
+        Desfaz o que foi gravado depois do checkpoint token.
+
+        Returns:
+            bool: False se alguma partição não corresponde mais ao checkpoint
+        """
+        if not isinstance(token, dict) or 'storages' not in token:
+            # Checkpoint de uma saída sem particionamento
+            return False
+        token = dict(token)
+        storages = token.pop('storages', {})
+        # Um append interrompido pode ter criado partições antes de gravar o manifesto
+        for name in self._partition_dirs():
+            if name not in storages:
+                logger.warning(f"Descartando partição não confirmada {name} de {self.path}")
+                shutil.rmtree(os.path.join(self.path, f"date={name}"), ignore_errors=True)
+        for name, partition_token in storages.items():
+            if not self._partition(name).rollback(partition_token):
+                return False
+        self._save_manifest(token)
+        return True
+
+    def export_csv(self, path, chunk_size=100000):
+        """Exporta o dataset para um único CSV, em ordem de data"""
+        from dropbox_data.storage.backends import CsvStorage
+
+        csv_storage = CsvStorage(path)
+        first = True
+        for chunk in self.iter_chunks(chunk_size):
+            chunk = chunk.reindex(columns=self.columns())
+            if first:
+                csv_storage.write(chunk)
+                first = False
+            else:
+                csv_storage.append(chunk)
+        logger.info(f"Dataset {self.path} exportado para {path}")
@@ -1,3 +1,9 @@
-from .date_extractor import extract_base_time
+__all__ = ['extract_base_time']
 
-__all__ = ['extract_base_time']
\ No newline at end of file
+def __getattr__(name):
+    # Importação sob demanda: utils.run_manifest pode ser usado (ex.: pelo
+    # comando status) sem carregar pandas
+    if name in __all__:
+        from dropbox_data.utils import date_extractor
+        return getattr(date_extractor, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
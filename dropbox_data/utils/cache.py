@@ -1,30 +1,272 @@
-import redis
-from functools import wraps
-import json
+import os
+import time
+import hashlib
 import pickle
+import struct
 import logging
+import threading
+from collections import OrderedDict
+from functools import wraps
+from dropbox_data.config import (
+    CACHE_BACKEND,
+    CACHE_DIR,
+    CACHE_MAX_BYTES,
+    CACHE_TTL_SECONDS,
+    REDIS_URL
+)
 
-redis_client = redis.Redis(host='localhost', port=6379, db=0)
 logger = logging.getLogger(__name__)
 
+class MemoryCacheBackend:
+    """Cache LRU em memória, limitado por número de bytes"""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()  # chave -> (expira_em, dados)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, data = item
+            if expires_at and expires_at < time.time():
+                self._remove(key)
+                return None
+            self._items.move_to_end(key)
+            return data
+
+    def set(self, key, data, ttl=None):
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+            if len(data) > self.max_bytes:
+                return
+            self._items[key] = (time.time() + ttl if ttl else 0, data)
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._items)))
+
+    def _remove(self, key):
+        _, data = self._items.pop(key)
+        self._size -= len(data)
+
+class DiskCacheBackend:
+    """
+    Cache em arquivos locais, compartilhado entre processos e execuções.
+
+    Cada entrada é um arquivo com a data de expiração no cabeçalho. Quando o
+    diretório passa de max_bytes, as entradas menos usadas (mtime mais antigo)
+    são removidas. O tamanho do diretório é somado uma vez e depois mantido a
+    cada gravação; ele só é listado de novo quando passa do limite.
+    """
+
+    _HEADER = struct.Struct('<d')
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.cache")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                (expires_at,) = self._HEADER.unpack(f.read(self._HEADER.size))
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if expires_at and expires_at < time.time():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+        # Marca a entrada como usada recentemente para a remoção LRU
+        os.utime(path)
+        return data
+
+    def set(self, key, data, ttl=None):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self._HEADER.pack(time.time() + ttl if ttl else 0))
+            f.write(data)
+        os.replace(tmp_path, path)
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        else:
+            self._size += self._HEADER.size + len(data)
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _entries(self):
+        """(mtime, tamanho, nome) das entradas do diretório"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.cache'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._size = total
+
+class RedisCacheBackend:
+    """Cache no Redis; a conexão só é aberta no primeiro uso"""
+
+    def __init__(self, url=REDIS_URL):
+        self.url = url
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, data, ttl=None):
+        self.client.set(key, data, ex=int(ttl) if ttl else None)
+
+def make_backend(name=None):
+    """
+    Cria o backend de cache configurado.
+
+    Args:
+        name (str): 'disk', 'memory', 'redis' ou 'none'; padrão CACHE_BACKEND
+
+    Returns:
+        Backend de cache, ou None quando o cache está desativado
+    """
+    name = (name or CACHE_BACKEND).lower()
+    if name == 'none':
+        return None
+    if name == 'disk':
+        return DiskCacheBackend()
+    if name == 'memory':
+        return MemoryCacheBackend()
+    if name == 'redis':
+        return RedisCacheBackend()
+    raise ValueError(f"Backend de cache desconhecido: {name}")
+
+_code_version = None
+
+def code_version():
+    """
+    Versão do código de processamento: hash dos fontes de utils e wrangling.
+
+    Qualquer alteração nesses módulos invalida as entradas de cache anteriores.
+    """
+    global _code_version
+    if _code_version is None:
+        package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        digest = hashlib.sha256()
+        for subpackage in ('utils', 'wrangling'):
+            directory = os.path.join(package_dir, subpackage)
+            for name in sorted(os.listdir(directory)):
+                if name.endswith('.py'):
+                    with open(os.path.join(directory, name), 'rb') as f:
+                        digest.update(name.encode())
+                        digest.update(f.read())
+        _code_version = digest.hexdigest()[:16]
+    return _code_version
+
+class PipelineCache:
+    """
+    Cache endereçado por conteúdo para os estágios do pipeline.
+
+    A chave combina o nome do estágio, a identificação do conteúdo de entrada
+    (rev/content_hash do Dropbox ou hash dos dados) e a versão do código, então
+    um resultado só é reaproveitado se a entrada e o código forem os mesmos.
+    Falhas do backend nunca interrompem o pipeline: o estágio é apenas recalculado.
+    """
+
+    def __init__(self, backend=None, ttl=CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, stage, content_id):
+        raw = f"{stage}:{content_id}:{code_version()}".encode()
+        return f"{stage}-{hashlib.sha256(raw).hexdigest()}"
+
+    def get_or_compute(self, stage, content_id, func, *args, **kwargs):
+        """Retorna o resultado em cache do estágio ou executa func e guarda o resultado"""
+        if self.backend is None:
+            return func(*args, **kwargs)
+
+        key = self.key(stage, content_id)
+        try:
+            data = self.backend.get(key)
+            if data is not None:
+                self.hits += 1
+                return pickle.loads(data)
+        except Exception as e:
+            logger.warning(f"Cache indisponível ({e}) - executando sem cache")
+            return func(*args, **kwargs)
+
+        self.misses += 1
+        result = func(*args, **kwargs)
+        try:
+            self.backend.set(key, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL),
+                             self.ttl)
+        except Exception as e:
+            logger.warning(f"Erro ao gravar no cache: {e}")
+        return result
+
+_default_cache = None
+
+def get_pipeline_cache():
+    """Cache do pipeline com o backend configurado, criado no primeiro uso"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = PipelineCache(make_backend())
+    return _default_cache
+
 def cache_result(expire_time=86400):  # 24 horas
+    """
+    Decorator que guarda o resultado da função no cache do pipeline.
+
+    A chave é um hash estável dos argumentos serializados e a entrada expira
+    após expire_time segundos.
+    """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            try:
-                cache_key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
-                cached_result = redis_client.get(cache_key)
-                
-                if cached_result:
-                    return pickle.loads(cached_result)
-                    
-                result = func(*args, **kwargs)
-                redis_client.set(cache_key, pickle.dumps(result))
-                return result
-                
-            except redis.exceptions.ConnectionError:
-                # If Redis is unavailable, just execute the function without caching
-                logger.warning("Redis unavailable - executing without cache")
+            cache = get_pipeline_cache()
+            if cache.backend is None:
                 return func(*args, **kwargs)
+            content_id = hashlib.sha256(
+                pickle.dumps((args, sorted(kwargs.items())), protocol=pickle.HIGHEST_PROTOCOL)
+            ).hexdigest()
+            stage = f"{func.__module__}.{func.__qualname__}"
+            return PipelineCache(cache.backend, ttl=expire_time).get_or_compute(
+                stage, content_id, func, *args, **kwargs
+            )
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
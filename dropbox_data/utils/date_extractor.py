@@ -1,11 +1,80 @@
+import numpy as np
 import pandas as pd
 import logging
 
 logger = logging.getLogger(__name__)
 
+DATETIME_FORMAT = '%d/%m/%Y %H:%M:%S'
+
+# Cache texto -> timestamp compartilhado entre chunks; limpo ao passar do limite
+DATE_CACHE_MAX_SIZE = 1_000_000
+_date_cache = pd.Series(dtype='datetime64[ns]')
+
+def _parse_fixed_width(text: pd.Series) -> pd.Series:
+    """
+    Converte textos no formato fixo dd/mm/aaaa HH:MM:SS fatiando as posições.
+
+    Textos fora do formato são convertidos por pd.to_datetime; inválidos viram NaT.
+    """
+    fixed = ((text.str.len() == 19) & (text.str[2] == '/') & (text.str[5] == '/')
+             & (text.str[10] == ' ') & (text.str[13] == ':') & (text.str[16] == ':'))
+    fixed = fixed.fillna(False).astype(bool)
+
+    result = pd.Series(pd.NaT, index=text.index, dtype='datetime64[ns]')
+    if fixed.any():
+        values = text[fixed]
+        parts = pd.DataFrame({
+            unit: pd.to_numeric(values.str[start:stop], errors='coerce')
+            for unit, start, stop in [('day', 0, 2), ('month', 3, 5), ('year', 6, 10),
+                                      ('hour', 11, 13), ('minute', 14, 16), ('second', 17, 19)]
+        })
+        result[fixed] = pd.to_datetime(parts, errors='coerce').astype('datetime64[ns]')
+    if not fixed.all():
+        result[~fixed] = pd.to_datetime(text[~fixed], format=DATETIME_FORMAT,
+                                        errors='coerce').astype('datetime64[ns]')
+    return result
+
+def parse_extracted_datetime(values: pd.Series) -> pd.Series:
+    """
+    Converte a coluna post_extracted_datetime para datetime.
+
+    Colunas que já são datetime64 são devolvidas sem conversão. Para texto, cada
+    valor distinto é convertido uma única vez: primeiro busca no cache
+    compartilhado entre chunks, depois o parser de largura fixa para os que faltam.
+
+    Args:
+        values (pd.Series): Datas no formato dd/mm/aaaa HH:MM:SS
+
+    Returns:
+        pd.Series: Datas como datetime64[ns] (NaT para valores inválidos)
+    """
+    global _date_cache
+
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values
+
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    uniques = pd.Index(pd.Series(uniques, dtype=object).astype(str))
+
+    parsed = _date_cache.reindex(uniques)
+    missing = ~uniques.isin(_date_cache.index)
+    if missing.any():
+        new_values = _parse_fixed_width(pd.Series(uniques[missing], index=uniques[missing]))
+        parsed[missing] = new_values.to_numpy()
+        if len(_date_cache) + len(new_values) > DATE_CACHE_MAX_SIZE:
+            _date_cache = pd.Series(dtype='datetime64[ns]')
+        _date_cache = pd.concat([_date_cache, new_values])
+
+    # O código -1 (valor nulo) aponta para o NaT acrescentado ao final
+    result = np.append(parsed.to_numpy(dtype='datetime64[ns]'), np.datetime64('NaT', 'ns'))[codes]
+    return pd.Series(result, index=values.index, dtype='datetime64[ns]')
+
 def extract_base_time(df: pd.DataFrame) -> pd.DataFrame:
     """
     Extrai o datetime mais antigo para cada post_id da coluna post_extracted_datetime.
+
+    O DataFrame recebido é modificado diretamente (sem cópia): a coluna
+    post_extracted_datetime é convertida e a coluna base_time é adicionada.
     
     Args:
         df (pd.DataFrame): DataFrame contendo as colunas 'post_id' e 'post_extracted_datetime'
@@ -14,26 +83,16 @@ def extract_base_time(df: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: DataFrame original com a nova coluna 'base_time'
     """
     try:
-        # Cria uma cópia do DataFrame para não modificar o original
-        df = df.copy()
-        
-        # Especifica o formato da data explicitamente
-        df['post_extracted_datetime'] = pd.to_datetime(
-            df['post_extracted_datetime'], 
-            format='%d/%m/%Y %H:%M:%S',
-            errors='coerce'
-        )
+        # Converte as datas, reaproveitando colunas já convertidas e valores em cache
+        df['post_extracted_datetime'] = parse_extracted_datetime(df['post_extracted_datetime'])
         logger.info("Coluna post_extracted_datetime convertida para datetime")
         
-        # Agrupa por post_id e pega o datetime mais antigo
-        base_times = df.groupby('post_id')['post_extracted_datetime'].min()
-        
-        # Adiciona a nova coluna base_time
-        df['base_time'] = df['post_id'].map(base_times)
+        # Datetime mais antigo de cada post_id, propagado para todas as suas linhas
+        df['base_time'] = df.groupby('post_id')['post_extracted_datetime'].transform('min')
         
         # Log das estatísticas
         total_posts = len(df['post_id'].unique())
-        posts_with_time = base_times.notna().sum()
+        posts_with_time = df.loc[df['base_time'].notna(), 'post_id'].nunique()
         logger.info(f"Base times extraídos para {posts_with_time} de {total_posts} posts")
         
         return df
@@ -47,8 +106,10 @@ if __name__ == "__main__":
         # Configura logging
         logging.basicConfig(level=logging.INFO)
         
+        from dropbox_data.utils.readers import read_csv
+
         # Lê o DataFrame
-        df = pd.read_csv('src/csv_files/data.csv', sep=';')
+        df = read_csv('src/csv_files/data.csv')
         
         # Extrai base_time
         df = extract_base_time(df)
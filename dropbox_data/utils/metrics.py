@@ -0,0 +1,329 @@
+import os
+import json
+import time
+import logging
+import platform
+import threading
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, fields
+from datetime import datetime
+from functools import wraps
+import pandas as pd
+from dropbox_data.config import (
+    DEBUG,
+    METRICS_JSON_PATH,
+    METRICS_PROMETHEUS_PATH,
+    PROFILE_DIR
+)
+
+logger = logging.getLogger(__name__)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_mb():
+    """Pico de memória residente do processo, em MB (None se indisponível)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return peak / 1024 / 1024 if platform.system() == 'Darwin' else peak / 1024
+
+def cpu_seconds():
+    """
+    Tempo de CPU do processo (todas as threads) mais o dos processos filhos já encerrados.
+
+    Os filhos (ex.: o pool de wrangling) só entram na conta depois de terminar.
+    """
+    if resource is None:
+        return time.process_time()
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+class TracedPeak:
+    """
+    Pico de memória alocada (tracemalloc) dentro de um bloco, acima da alocada no início.
+
+    O pico do tracemalloc é um só no processo. Antes de zerá-lo, o pico atingido
+    é repassado a todos os blocos abertos, então um bloco aninhado (ou de outra
+    thread) não apaga o pico dos externos. Só mede com o tracemalloc ativo.
+    """
+
+    _lock = threading.Lock()
+    _open = []
+
+    def __init__(self):
+        self.baseline = self.max = 0
+        self.bytes = 0
+
+    @classmethod
+    def _fold(cls):
+        peak = tracemalloc.get_traced_memory()[1]
+        for block in cls._open:
+            block.max = max(block.max, peak)
+
+    def __enter__(self):
+        with self._lock:
+            self._fold()
+            tracemalloc.reset_peak()
+            self.baseline = self.max = tracemalloc.get_traced_memory()[0]
+            self._open.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            if tracemalloc.is_tracing():
+                self._fold()
+            self._open.remove(self)
+        self.bytes = max(self.max - self.baseline, 0)
+        return False
+
+@dataclass
+class StageMetrics:
+    """Totais acumulados de um estágio (ou de um arquivo dentro do estágio)"""
+    calls: int = 0
+    errors: int = 0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    rows_in: int = 0
+    rows_out: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    peak_rss_mb: float = 0.0
+    traced_peak_mb: float = 0.0
+
+    def merge(self, other):
+        for item in fields(self):
+            if item.name in ('peak_rss_mb', 'traced_peak_mb'):
+                setattr(self, item.name, max(getattr(self, item.name), getattr(other, item.name)))
+            else:
+                setattr(self, item.name, getattr(self, item.name) + getattr(other, item.name))
+
+class StageRecorder:
+    """Objeto entregue pelo RunMetrics.stage() para registrar volumes do estágio"""
+
+    def __init__(self):
+        self.metrics = StageMetrics(calls=1)
+
+    def add(self, rows_in=0, rows_out=0, bytes_in=0, bytes_out=0):
+        self.metrics.rows_in += rows_in
+        self.metrics.rows_out += rows_out
+        self.metrics.bytes_in += bytes_in
+        self.metrics.bytes_out += bytes_out
+
+class RunMetrics:
+    """
+    Métricas de uma execução do pipeline, por estágio e por arquivo.
+
+    Cada estágio registra tempo de parede, tempo de CPU (ver cpu_seconds),
+    linhas e bytes de entrada/saída e o pico de memória residente do processo
+    ao final. O tempo de CPU inclui o de outras threads e dos processos do pool
+    de wrangling encerrados durante o estágio, então estágios simultâneos contam
+    o mesmo tempo. Com o tracemalloc ativo (DEBUG), registra também o pico de
+    memória alocada pelo Python durante o estágio, acima da alocada no início
+    (ver TracedPeak). Estágios executados dentro dos processos do pool não são
+    contabilizados.
+
+    Pode ser usado de várias threads ao mesmo tempo.
+    """
+
+    # Estágios em andamento em cada thread, para record()
+    _active = threading.local()
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self.status = 'running'  # 'ok' ou 'error' ao final de run()
+        self.stages = {}  # estágio -> StageMetrics
+        self.files = {}  # estágio -> {arquivo -> StageMetrics}
+        self._lock = threading.Lock()
+        self._profiler = None
+
+    @contextmanager
+    def stage(self, name, label=None):
+        """
+        Mede o bloco como uma execução do estágio name.
+
+        Args:
+            name (str): Nome do estágio (ex.: 'download')
+            label (str): Arquivo ao qual a execução se refere, para as métricas por arquivo
+
+        Yields:
+            StageRecorder: Use add() para registrar linhas e bytes
+        """
+        recorder = StageRecorder()
+        active = self._active.__dict__.setdefault('stack', [])
+        active.append(recorder)
+        traced = TracedPeak().__enter__() if tracemalloc.is_tracing() else None
+        wall_start = time.perf_counter()
+        cpu_start = cpu_seconds()
+        try:
+            yield recorder
+        except BaseException:
+            recorder.metrics.errors += 1
+            raise
+        finally:
+            active.pop()
+            metrics = recorder.metrics
+            metrics.wall_seconds = time.perf_counter() - wall_start
+            metrics.cpu_seconds = cpu_seconds() - cpu_start
+            metrics.peak_rss_mb = peak_rss_mb() or 0.0
+            if traced is not None:
+                traced.__exit__(None, None, None)
+                metrics.traced_peak_mb = traced.bytes / 1024 / 1024
+            self._record(name, label, metrics)
+
+    def _record(self, name, label, metrics):
+        with self._lock:
+            self.stages.setdefault(name, StageMetrics()).merge(metrics)
+            if label is not None:
+                self.files.setdefault(name, {}).setdefault(label, StageMetrics()).merge(metrics)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'status': self.status,
+                'started_at': self.started_at.isoformat(),
+                'finished_at': datetime.now().isoformat(),
+                'peak_rss_mb': peak_rss_mb(),
+                'stages': {name: asdict(metrics) for name, metrics in self.stages.items()},
+                'files': {
+                    name: {label: asdict(metrics) for label, metrics in files.items()}
+                    for name, files in self.files.items()
+                },
+            }
+
+    def to_prometheus(self, prefix='dropbox_data'):
+        """
+        Métricas por estágio no formato texto do Prometheus (textfile collector).
+
+        As métricas por arquivo ficam só no relatório JSON, para não criar uma
+        série por arquivo.
+        """
+        report = self.to_dict()
+        lines = []
+        for item in fields(StageMetrics):
+            metric = f"{prefix}_stage_{item.name}"
+            lines.append(f"# TYPE {metric} gauge")
+            for name, stage in report['stages'].items():
+                lines.append(f'{metric}{{stage="{name}"}} {stage[item.name]}')
+        lines.append(f"# TYPE {prefix}_run_peak_rss_mb gauge")
+        lines.append(f"{prefix}_run_peak_rss_mb {report['peak_rss_mb'] or 0}")
+        lines.append(f"# TYPE {prefix}_run_success gauge")
+        lines.append(f"{prefix}_run_success {int(report['status'] == 'ok')}")
+        lines.append(f"# TYPE {prefix}_run_finished_timestamp_seconds gauge")
+        lines.append(f"{prefix}_run_finished_timestamp_seconds {time.time():.0f}")
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _write_atomic(path, content):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def export(self, json_path=METRICS_JSON_PATH, prometheus_path=METRICS_PROMETHEUS_PATH):
+        """Grava o relatório JSON e o arquivo do Prometheus (caminhos vazios são ignorados)"""
+        try:
+            if json_path:
+                self._write_atomic(json_path, json.dumps(self.to_dict(), indent=2))
+            if prometheus_path:
+                self._write_atomic(prometheus_path, self.to_prometheus())
+            logger.info(f"Métricas da execução gravadas em {json_path} e {prometheus_path}")
+        except Exception as e:
+            logger.error(f"Erro ao gravar métricas: {e}")
+
+    def log_summary(self):
+        for name, metrics in self.stages.items():
+            logger.info(f"Estágio {name}: {metrics.calls} execuções, "
+                        f"{metrics.wall_seconds:.2f}s (CPU {metrics.cpu_seconds:.2f}s), "
+                        f"{metrics.rows_out} linhas, {metrics.bytes_in/1024/1024:.2f} MB lidos, "
+                        f"pico RSS {metrics.peak_rss_mb:.0f} MB")
+
+    def start_profiling(self):
+        """Inicia cProfile (thread atual) e tracemalloc"""
+        tracemalloc.start()
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+
+    def stop_profiling(self, directory=PROFILE_DIR, top=20):
+        """Para o profiling, grava o .prof em directory e registra as maiores alocações"""
+        if self._profiler is None:
+            return
+        self._profiler.disable()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"profile_{self.started_at:%Y%m%d_%H%M%S}.prof")
+        self._profiler.dump_stats(path)
+        self._profiler = None
+        logger.info(f"Perfil de CPU gravado em {path}")
+
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        for stat in snapshot.statistics('lineno')[:top]:
+            logger.info(f"Memória alocada: {stat}")
+
+    @contextmanager
+    def run(self, profile=DEBUG):
+        """Envolve uma execução completa: profiling opcional e exportação ao final"""
+        if profile:
+            self.start_profiling()
+        try:
+            yield self
+            self.status = 'ok'
+        except BaseException:
+            self.status = 'error'
+            raise
+        finally:
+            if profile:
+                self.stop_profiling()
+            self.log_summary()
+            self.export()
+
+_run_metrics = RunMetrics()
+
+def get_run_metrics():
+    """Métricas da execução atual"""
+    return _run_metrics
+
+def reset_run_metrics():
+    """Inicia uma nova coleta de métricas (ex.: a cada execução do pipeline)"""
+    global _run_metrics
+    _run_metrics = RunMetrics()
+    return _run_metrics
+
+def record(rows_in=0, rows_out=0, bytes_in=0, bytes_out=0):
+    """Registra linhas/bytes no estágio mais interno em andamento nesta thread"""
+    stack = getattr(RunMetrics._active, 'stack', None)
+    if stack:
+        stack[-1].add(rows_in, rows_out, bytes_in, bytes_out)
+
+def instrument(name, label_arg=None):
+    """
+    Decorator que mede cada chamada da função como uma execução do estágio name.
+
+    Quando o primeiro argumento ou o resultado são DataFrames, suas linhas são
+    registradas como entrada e saída; a função pode registrar outros volumes
+    com record().
+
+    Args:
+        name (str): Nome do estágio
+        label_arg (int): Posição do argumento usado como rótulo por arquivo
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            label = args[label_arg] if label_arg is not None and len(args) > label_arg else None
+            with get_run_metrics().stage(name, label) as stage:
+                if args and isinstance(args[0], pd.DataFrame):
+                    stage.add(rows_in=len(args[0]))
+                result = func(*args, **kwargs)
+                if isinstance(result, pd.DataFrame):
+                    stage.add(rows_out=len(result))
+                return result
+        return wrapper
+    return decorator
@@ -1,40 +1,164 @@
+import re
+import numpy as np
 import pandas as pd
 import logging
 
 logger = logging.getLogger(__name__)
 
-def format_numeric_columns(df: pd.DataFrame) -> pd.DataFrame:
+# Colunas de contadores formatadas por padrão
+NUMERIC_COLUMNS = [
+    'post_likes',
+    'post_comments',
+    'post_visualizations',
+    'followers',
+    'post_video_visualizations'
+]
+
+# Sufixos de abreviação e seus multiplicadores (comparados em minúsculas)
+SUFFIX_MULTIPLIERS = {
+    'k': 1_000,
+    'mil': 1_000,
+    'm': 1_000_000,
+    'mi': 1_000_000,
+    'mm': 1_000_000,
+    'milhão': 1_000_000,
+    'milhao': 1_000_000,
+    'milhões': 1_000_000,
+    'milhoes': 1_000_000,
+    'b': 1_000_000_000,
+    'bi': 1_000_000_000,
+    'bilhão': 1_000_000_000,
+    'bilhao': 1_000_000_000,
+    'bilhões': 1_000_000_000,
+    'bilhoes': 1_000_000_000,
+}
+
+# Número (com separadores . ou ,) seguido opcionalmente de um sufixo de abreviação
+_COUNT_PATTERN = re.compile(
+    r'(?P<number>\d+(?:[.,]\d+)*)\s*'
+    r'(?P<suffix>' + '|'.join(sorted(SUFFIX_MULTIPLIERS, key=len, reverse=True)) + r')?'
+    r'(?![a-zà-ú])',
+    flags=re.IGNORECASE
+)
+_THOUSANDS_PATTERN = re.compile(r'\d{1,3}(?:([.,])\d{3})(?:\1\d{3})*')
+
+def _number_value(number: str, has_suffix: bool) -> float:
+    """
+    Converte a parte numérica de uma contagem em float.
+
+    Se '.' e ',' aparecem juntos, o último é o separador decimal. Com um só tipo
+    de separador, ele é de milhar quando separa grupos de 3 dígitos e não há
+    sufixo ('1.234', '1,234,567'); caso contrário é decimal ('2,5 mil', '3.0').
+    """
+    if '.' in number and ',' in number:
+        decimal = max(number.rfind('.'), number.rfind(','))
+        integer = number[:decimal].replace('.', '').replace(',', '')
+        return float(f"{integer}.{number[decimal + 1:]}")
+    if not has_suffix and _THOUSANDS_PATTERN.fullmatch(number):
+        return float(number.replace('.', '').replace(',', ''))
+    integer, _, fraction = number.replace(',', '.').rpartition('.')
+    if not integer:
+        return float(fraction)
+    return float(f"{integer.replace('.', '')}.{fraction}")
+
+def parse_count(value) -> float:
+    """
+    Converte uma contagem de rede social em número.
+
+    Exemplos: '1.234' -> 1234, '2,5 mil' -> 2500, '3M' -> 3000000,
+    '1,5k comentários' -> 1500, 'sem comentários' -> nan.
+    """
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return np.nan
+    match = _COUNT_PATTERN.search(str(value))
+    if not match:
+        return np.nan
+    suffix = match.group('suffix')
+    number = _number_value(match.group('number'), bool(suffix))
+    if suffix:
+        number *= SUFFIX_MULTIPLIERS[suffix.lower()]
+    return number
+
+def _float_counts_as_text(values: pd.Series) -> pd.Series:
+    """
+    Texto original de contagens que o pandas leu como float.
+
+    Uma contagem com parte fracionária só vem de um ponto separador de milhar
+    ('1.230' lido como 1.23), então é escrita de novo com três casas ('1.230');
+    valores inteiros viram o número sem casas decimais.
+    """
+    return values.map(lambda value: f"{value:.0f}" if value == round(value) else f"{value:.3f}",
+                      na_action='ignore').astype(object)
+
+def parse_count_series(values: pd.Series) -> pd.Series:
+    """
+    Converte uma série de contagens em Int64.
+
+    Colunas já inteiras são apenas convertidas; floats são tratados como o
+    texto de onde vieram (ver _float_counts_as_text). Para texto, valores
+    formados só por dígitos são convertidos diretamente (caminho rápido, sem
+    regex, por str.isdigit) e os demais são interpretados por parse_count uma
+    única vez por valor distinto.
+    """
+    if pd.api.types.is_integer_dtype(values.dtype):
+        return values.astype('Int64')
+    if pd.api.types.is_float_dtype(values.dtype):
+        values = _float_counts_as_text(values)
+
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    unique_text = pd.Series(uniques, dtype=object).astype(str).str.strip()
+
+    parsed = pd.Series(np.nan, index=unique_text.index, dtype='float64')
+    digits = (unique_text.str.isascii() & unique_text.str.isdigit()).to_numpy(dtype=bool)
+    parsed[digits] = pd.to_numeric(unique_text[digits], errors='coerce')
+    parsed[~digits] = [parse_count(value) for value in unique_text[~digits]]
+
+    result = np.append(parsed.to_numpy(), np.nan)[codes]
+    return pd.Series(np.round(result), index=values.index).astype('Int64')
+
+def format_numeric_columns(df: pd.DataFrame, columns: list = None) -> pd.DataFrame:
     """
     Formata colunas numéricas do DataFrame, convertendo strings formatadas para inteiros.
+
+    Entende separadores de milhar, vírgula decimal e abreviações (k, mil, M, mi).
+    Os valores distintos de todas as colunas são interpretados numa única passada.
+
+    Args:
+        df (pd.DataFrame): DataFrame original
+        columns (list): Colunas a formatar; padrão NUMERIC_COLUMNS
+
+    Returns:
+        pd.DataFrame: DataFrame com as colunas convertidas para Int64
     """
     try:
-        df = df.copy()
-        
-        numeric_columns = [
-            'post_likes',
-            'post_comments',
-            'post_visualizations',
-            'followers',
-            'post_video_visualizations'
-        ]
-        
-        for column in numeric_columns:
-            if column in df.columns:
-                logger.info(f"Processando coluna: {column}")
-                
-                # Remove pontos e textos extras, mantém apenas números
-                df[column] = df[column].astype(str).str.replace('.', '').str.extract('(\d+)')[0]
-                
-                # Converte para int
-                df[column] = df[column].astype('Int64')
-                
-                # Log das estatísticas
-                non_null = df[column].count()
-                total = len(df)
-                logger.info(f"Coluna {column}: {non_null} valores válidos de {total} ({non_null/total*100:.2f}%)")
-        
+        df = df.copy(deep=False)
+        columns = [column for column in (columns or NUMERIC_COLUMNS) if column in df.columns]
+        if not columns:
+            return df
+
+        # Empilha as colunas de texto para interpretar cada valor distinto uma só vez
+        text_columns = [column for column in columns
+                        if not pd.api.types.is_numeric_dtype(df[column].dtype)]
+        if text_columns:
+            stacked = pd.concat([df[column].astype(object) for column in text_columns],
+                                ignore_index=True)
+            parsed = parse_count_series(stacked).to_numpy()
+            for position, column in enumerate(text_columns):
+                values = parsed[position * len(df):(position + 1) * len(df)]
+                df[column] = pd.array(values, dtype='Int64')
+
+        for column in columns:
+            if column not in text_columns:
+                df[column] = parse_count_series(df[column])
+
+            # Log das estatísticas
+            non_null = df[column].count()
+            total = len(df)
+            logger.info(f"Coluna {column}: {non_null} valores válidos de {total} "
+                        f"({non_null/total*100 if total else 0:.2f}%)")
+
         return df
-    
+
     except Exception as e:
         logger.error(f"Erro ao formatar colunas numéricas: {e}")
         raise
@@ -45,13 +169,22 @@ if __name__ == "__main__":
         level=logging.DEBUG,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
-    
+
     # Teste com alguns valores
     test_df = pd.DataFrame({
         'post_likes': ['1.234', '2,5 mil', '3M', '4k', '5\n mil', 'abc'],
-        'post_comments': ['123', '456 comentários', '1,5k comentários', 'sem comentários', '2.345'],
+        'post_comments': ['123', '456 comentários', '1,5k comentários', 'sem comentários',
+                          '2.345', None],
     })
-    
+
     result = format_numeric_columns(test_df)
     print("\nResultados do teste:")
     print(result)
+
+    expected = {
+        'post_likes': [1234, 2500, 3000000, 4000, 5000, None],
+        'post_comments': [123, 456, 1500, None, 2345, None],
+    }
+    for column, values in expected.items():
+        assert result[column].tolist() == [pd.NA if v is None else v for v in values], column
+    print("Valores conferem com o esperado")
@@ -0,0 +1,270 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from dropbox_data.config import CSV_DELIMITER, CSV_ENGINE, CSV_READ_WORKERS
+from dropbox_data.utils.schema import string_dtype
+
+logger = logging.getLogger(__name__)
+
+# Engines em ordem de preferência para CSV_ENGINE=auto
+FAST_ENGINES = ['pyarrow', 'polars']
+
+# Valores lidos como ausentes pelo pandas (keep_default_na=True)
+NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+             '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a',
+             'nan', 'null']
+
+def _installed(engine):
+    try:
+        __import__(engine)
+    except ImportError:
+        return False
+    return True
+
+def resolve_engine(engine=CSV_ENGINE):
+    """
+    Engine de leitura efetiva: pyarrow ou polars (multithread) ou c (parser padrão do pandas).
+
+    Com 'auto' usa o primeiro engine rápido instalado; um engine pedido e não
+    instalado cai para o parser do pandas.
+    """
+    engine = (engine or 'auto').lower()
+    if engine == 'auto':
+        return next((name for name in FAST_ENGINES if _installed(name)), 'c')
+    if engine in FAST_ENGINES and not _installed(engine):
+        logger.warning(f"Engine de CSV {engine} não instalado; usando o parser do pandas")
+        return 'c'
+    if engine not in FAST_ENGINES + ['c']:
+        raise ValueError(f"Engine de CSV desconhecido: {engine}")
+    return engine
+
+def _is_text(dtype):
+    """Indica se o dtype é lido como texto (str, string ou category)"""
+    dtype = pd.api.types.pandas_dtype(dtype)
+    return isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(dtype)
+
+class CsvReader:
+    """
+    Leitura de CSVs com um engine multithread e fallback para o parser do pandas.
+
+    O engine pyarrow lê o arquivo em blocos paralelos (inclusive em chunks,
+    quando todas as colunas têm tipo de texto definido); o polars é usado em
+    leituras completas. Qualquer erro do engine rápido (sintaxe que ele não
+    suporta, tipos conflitantes) repete a leitura com o parser do pandas, de
+    modo que o resultado é sempre o mesmo de pd.read_csv.
+    """
+
+    def __init__(self, delimiter=CSV_DELIMITER, encoding='utf-8-sig', engine=CSV_ENGINE):
+        self.delimiter = delimiter
+        self.encoding = encoding
+        self.engine = resolve_engine(engine)
+        # O polars só lê UTF-8
+        if self.engine == 'polars' and not encoding.lower().startswith('utf-8'):
+            self.engine = 'c'
+
+    def columns(self, path):
+        """Cabeçalho do CSV"""
+        return list(pd.read_csv(path, sep=self.delimiter, encoding=self.encoding,
+                                nrows=0).columns)
+
+    def read(self, path, columns=None, dtype=None, keep_default_na=True):
+        """
+        Lê o CSV inteiro.
+
+        Args:
+            path (str): Caminho do arquivo
+            columns (list): Colunas a ler, como usecols; padrão todas
+            dtype: Tipo único ou dicionário coluna -> tipo; padrão inferido
+            keep_default_na (bool): Se False, valores vazios continuam ''
+
+        Returns:
+            pd.DataFrame: Colunas na ordem do arquivo, como em pd.read_csv
+        """
+        if self.engine != 'c':
+            try:
+                if self.engine == 'pyarrow':
+                    return self._read_pyarrow(path, columns, dtype, keep_default_na)
+                return self._read_polars(path, columns, dtype, keep_default_na)
+            except Exception as e:
+                logger.warning(f"Engine {self.engine} falhou ao ler {path} ({e}); "
+                               f"usando o parser do pandas")
+        return pd.read_csv(path, sep=self.delimiter, encoding=self.encoding, usecols=columns,
+                           dtype=dtype, keep_default_na=keep_default_na, low_memory=False)
+
+    def iter_chunks(self, path, chunk_size, columns=None, dtype=None, keep_default_na=True):
+        """
+        Lê o CSV em chunks de chunk_size linhas.
+
+        Com pyarrow e todas as colunas lidas como texto, os blocos são lidos
+        em paralelo; sem tipos definidos, a inferência por bloco poderia dar
+        tipos diferentes entre chunks, e a leitura usa o parser do pandas.
+        """
+        if self.engine == 'pyarrow':
+            header = self.columns(path)
+            selected = self._selected(header, columns)
+            if all(self._is_text_column(dtype, column) for column in selected):
+                yielded = False
+                try:
+                    for chunk in self._iter_pyarrow(path, selected, chunk_size, dtype,
+                                                    keep_default_na):
+                        yielded = True
+                        yield chunk
+                    return
+                except Exception as e:
+                    if yielded:
+                        raise
+                    logger.warning(f"Engine pyarrow falhou ao ler {path} ({e}); "
+                                   f"usando o parser do pandas")
+        yield from pd.read_csv(path, sep=self.delimiter, encoding=self.encoding,
+                               usecols=columns, dtype=dtype, keep_default_na=keep_default_na,
+                               chunksize=chunk_size)
+
+    def read_many(self, paths, workers=CSV_READ_WORKERS, **kwargs):
+        """
+        Lê vários CSVs em paralelo (os engines liberam o GIL durante o parsing).
+
+        Args:
+            paths (list): Arquivos a ler
+            workers (int): Arquivos lidos ao mesmo tempo
+            **kwargs: Repassados a read()
+
+        Returns:
+            tuple: (DataFrames lidos, na ordem de paths; arquivos com erro)
+        """
+        def read_one(path):
+            try:
+                return self.read(path, **kwargs)
+            except Exception as e:
+                logger.error(f"Erro ao ler o arquivo {path}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            results = list(executor.map(read_one, paths))
+        frames = [df for df in results if df is not None]
+        failed = [path for path, df in zip(paths, results) if df is None]
+        return frames, failed
+
+    @staticmethod
+    def _selected(header, columns):
+        return [column for column in header if column in set(columns)] if columns else header
+
+    @staticmethod
+    def _dtype_of(dtype, column):
+        return dtype.get(column) if isinstance(dtype, dict) else dtype
+
+    @classmethod
+    def _is_text_column(cls, dtype, column):
+        column_dtype = cls._dtype_of(dtype, column)
+        return column_dtype is not None and _is_text(column_dtype)
+
+    @staticmethod
+    def _astype(df, dtype):
+        if isinstance(dtype, dict):
+            dtype = {column: value for column, value in dtype.items() if column in df.columns}
+        return df.astype(dtype) if dtype else df
+
+    def _arrow_options(self, selected, dtype, keep_default_na):
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+
+        encoding = self.encoding.lower().replace('-sig', '')  # o BOM é ignorado pelo Arrow
+        column_types = {column: pa.string() for column in selected
+                        if self._is_text_column(dtype, column)}
+        return (
+            pacsv.ReadOptions(use_threads=True, encoding=encoding),
+            pacsv.ParseOptions(delimiter=self.delimiter, newlines_in_values=True),
+            pacsv.ConvertOptions(
+                include_columns=selected,
+                column_types=column_types,
+                null_values=NA_VALUES if keep_default_na else [],
+                strings_can_be_null=keep_default_na,
+                # Datas ficam como texto, como no pandas
+                timestamp_parsers=[]
+            )
+        )
+
+    def _arrow_to_pandas(self, table, dtype, start=0):
+        import pyarrow as pa
+
+        # Colunas totalmente vazias viram NaN (float), como no pandas
+        for index, field in enumerate(table.schema):
+            if pa.types.is_null(field.type):
+                table = table.set_column(index, field.name,
+                                         pa.nulls(table.num_rows, pa.float64()))
+        text = string_dtype()
+        mapper = None if text is str else {pa.string(): text, pa.large_string(): text}.get
+        df = table.to_pandas(types_mapper=mapper)
+        df.index = pd.RangeIndex(start, start + len(df))
+        return self._astype(df, dtype)
+
+    def _read_pyarrow(self, path, columns, dtype, keep_default_na):
+        import pyarrow.csv as pacsv
+
+        header = self.columns(path)
+        selected = self._selected(header, columns)
+        read_options, parse_options, convert_options = self._arrow_options(
+            selected, dtype, keep_default_na
+        )
+        table = pacsv.read_csv(path, read_options=read_options, parse_options=parse_options,
+                               convert_options=convert_options)
+        return self._arrow_to_pandas(table, dtype)
+
+    def _iter_pyarrow(self, path, selected, chunk_size, dtype, keep_default_na):
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+
+        read_options, parse_options, convert_options = self._arrow_options(
+            selected, dtype, keep_default_na
+        )
+        reader = pacsv.open_csv(path, read_options=read_options, parse_options=parse_options,
+                                convert_options=convert_options)
+        # Os blocos do Arrow têm tamanho em bytes; reagrupa em chunks de chunk_size linhas
+        pending, rows, start = [], 0, 0
+        for batch in reader:
+            pending.append(batch)
+            rows += batch.num_rows
+            while rows >= chunk_size:
+                table = pa.Table.from_batches(pending, schema=reader.schema)
+                yield self._arrow_to_pandas(table.slice(0, chunk_size), dtype, start)
+                rest = table.slice(chunk_size)
+                pending, rows, start = rest.to_batches(), rest.num_rows, start + chunk_size
+        if rows:
+            table = pa.Table.from_batches(pending, schema=reader.schema)
+            yield self._arrow_to_pandas(table, dtype, start)
+
+    def _read_polars(self, path, columns, dtype, keep_default_na):
+        import polars as pl
+
+        header = self.columns(path)
+        selected = self._selected(header, columns)
+        text_columns = [column for column in selected if self._is_text_column(dtype, column)]
+        df = pl.read_csv(
+            path,
+            separator=self.delimiter,
+            columns=selected,
+            schema_overrides={column: pl.String for column in text_columns},
+            infer_schema_length=0 if len(text_columns) == len(selected) else 10000,
+            null_values=NA_VALUES if keep_default_na else None,
+            missing_utf8_is_empty_string=not keep_default_na,
+            try_parse_dates=False
+        ).to_pandas()
+        df.columns = [column.lstrip('\ufeff') for column in df.columns]
+        return self._astype(df, dtype)
+
+_csv_reader = None
+
+def get_csv_reader():
+    """Leitor de CSV padrão (CSV_DELIMITER, utf-8-sig, CSV_ENGINE)"""
+    global _csv_reader
+    if _csv_reader is None:
+        _csv_reader = CsvReader()
+        logger.info(f"Engine de leitura de CSV: {_csv_reader.engine}")
+    return _csv_reader
+
+def read_csv(path, **kwargs):
+    """Lê um CSV com o leitor padrão (veja CsvReader.read)"""
+    return get_csv_reader().read(path, **kwargs)
+
+def read_many(paths, **kwargs):
+    """Lê vários CSVs em paralelo com o leitor padrão (veja CsvReader.read_many)"""
+    return get_csv_reader().read_many(paths, **kwargs)
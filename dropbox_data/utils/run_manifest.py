@@ -0,0 +1,168 @@
+import os
+import json
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Situação de cada arquivo da execução
+PENDING = 'pending'
+DOWNLOADED = 'downloaded'
+MERGED = 'merged'
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+class RunManifest:
+    """
+    Manifesto de uma execução do pipeline, gravado em JSON a cada checkpoint.
+
+    Registra a etapa atual, a situação de cada arquivo (baixado, mesclado),
+    o ponto de restauração do dataset mesclado após o último arquivo mesclado
+    e o último chunk processado. Cada gravação é feita num arquivo temporário
+    renomeado em seguida, então o manifesto nunca fica pela metade.
+
+    Uma execução que não chegou a 'completed' pode ser retomada (resume): os
+    arquivos já mesclados não são baixados de novo, os já baixados não são
+    baixados outra vez, e o processamento continua do último chunk confirmado.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.previous = self._load()
+        self.data = None
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Manifesto de execução inválido em {self.path}, ignorando: {e}")
+            return None
+
+    def save(self):
+        if not self.path:
+            return
+        self.data['updated_at'] = _now()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @property
+    def interrupted(self):
+        """Se a execução anterior não terminou (falhou ou foi interrompida)"""
+        return bool(self.previous) and self.previous.get('status') != 'completed'
+
+    def start(self, resume=False):
+        """
+        Inicia o manifesto da execução, retomando o anterior se resume e ele não terminou.
+
+        Returns:
+            bool: Se a execução anterior está sendo retomada
+        """
+        resumed = resume and self.interrupted
+        if resumed:
+            self.data = self.previous
+            self.data['resumes'] = self.data.get('resumes', 0) + 1
+            logger.info(f"Retomando a execução {self.data['run_id']} "
+                        f"(etapa {self.data['stage']})")
+        else:
+            if resume:
+                logger.info("Nenhuma execução interrompida para retomar")
+            self.data = {'run_id': _now(), 'started_at': _now(), 'stage': 'start',
+                         'files': {}, 'merge_checkpoint': None, 'wrangle': None}
+        self.data['status'] = 'running'
+        self.save()
+        return resumed
+
+    def set_stage(self, stage):
+        self.data['stage'] = stage
+        self.save()
+
+    def file_status(self, dropbox_path):
+        return self.data['files'].get(dropbox_path, {}).get('status')
+
+    def add_files(self, entries):
+        """Registra os arquivos da execução (caminho -> metadados com rev)"""
+        for path, metadata in entries.items():
+            current = self.data['files'].get(path)
+            if current and current.get('rev') == metadata.get('rev'):
+                continue
+            self.data['files'][path] = {'rev': metadata.get('rev'), 'status': PENDING}
+        self.save()
+
+    def pending_downloads(self, dropbox_paths, local_path):
+        """
+        Arquivos que ainda precisam ser baixados.
+
+        Os já mesclados e os baixados cujo arquivo local ainda existe são pulados.
+
+        Args:
+            dropbox_paths (list): Arquivos da execução
+            local_path (callable): Caminho local de um arquivo do Dropbox
+        """
+        pending = []
+        for path in dropbox_paths:
+            status = self.file_status(path)
+            if status == MERGED:
+                continue
+            if status == DOWNLOADED and os.path.exists(local_path(path)):
+                continue
+            pending.append(path)
+        skipped = len(dropbox_paths) - len(pending)
+        if skipped:
+            logger.info(f"{skipped} arquivos já baixados ou mesclados na execução retomada")
+        return pending
+
+    def files_downloaded(self, downloaded):
+        """Registra os arquivos baixados (caminho no Dropbox -> caminho local)"""
+        for path, local_path in downloaded.items():
+            entry = self.data['files'].setdefault(path, {})
+            entry.update(status=DOWNLOADED, local_path=local_path)
+        self.save()
+
+    def merge_checkpoint(self, token, merged=()):
+        """
+        Confirma o merge dos arquivos locais merged e o ponto de restauração do dataset.
+
+        Args:
+            token: Checkpoint do dataset mesclado (ver CsvStorage.checkpoint)
+            merged (iterable): Arquivos locais já gravados no dataset
+        """
+        merged = {os.path.abspath(file) for file in merged}
+        for entry in self.data['files'].values():
+            if entry.get('local_path') and os.path.abspath(entry['local_path']) in merged:
+                entry['status'] = MERGED
+        self.data['merge_checkpoint'] = token
+        self.save()
+
+    def wrangle_checkpoint(self, position, rows, unit='chunks'):
+        """Registra o último checkpoint do processamento e a unidade da posição"""
+        self.data['wrangle'] = {'position': position, 'unit': unit, 'rows': rows,
+                                'at': _now()}
+        self.save()
+
+    def finish(self, status='completed'):
+        self.data['status'] = status
+        self.data['stage'] = 'done' if status == 'completed' else self.data['stage']
+        self.data['finished_at'] = _now()
+        self.save()
+
+def read_manifest_summary(path):
+    """Resumo do manifesto da última execução, para o comando status"""
+    data = RunManifest(path).previous
+    if not data:
+        return None
+    statuses = [entry.get('status') for entry in data.get('files', {}).values()]
+    return {
+        'run_id': data.get('run_id'),
+        'status': data.get('status'),
+        'stage': data.get('stage'),
+        'files': len(statuses),
+        'files_merged': statuses.count(MERGED),
+        'wrangle': data.get('wrangle'),
+    }
@@ -0,0 +1,88 @@
+import logging
+import numpy as np
+import pandas as pd
+from dropbox_data.config import INGEST_COLUMNS, SCHEMA_CATEGORY_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Colunas necessárias para o wrangling, nunca removidas pela seleção de colunas
+REQUIRED_COLUMNS = ['post_id', 'post_extracted_datetime']
+
+# Textos que se repetem em muitas linhas (perfis, tipos de post), lidos como category
+CATEGORY_COLUMNS = ['profile', 'profile_name', 'post_type', 'social_network'] + [
+    column for column in SCHEMA_CATEGORY_COLUMNS if column
+]
+
+_string_dtype = None
+
+def string_dtype():
+    """
+    Tipo usado para texto: strings em Arrow quando o pyarrow está instalado.
+
+    As strings ficam em buffers contíguos em vez de um objeto Python por valor.
+    Valores ausentes continuam sendo NaN, como nas colunas lidas por padrão.
+    Sem pyarrow, o texto é lido como str (objetos Python).
+    """
+    global _string_dtype
+    if _string_dtype is None:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            _string_dtype = str
+        else:
+            try:
+                _string_dtype = pd.StringDtype('pyarrow', na_value=np.nan)
+            except TypeError:  # pandas < 2.3
+                _string_dtype = pd.StringDtype('pyarrow')
+    return _string_dtype
+
+def ingest_dtypes(columns) -> dict:
+    """
+    Tipos de leitura do dataset mesclado, por coluna.
+
+    Colunas de CATEGORY_COLUMNS são lidas como category; as demais, inclusive
+    post_id, contadores e datas, como texto. Contadores ('1,2 mil') e datas
+    (dd/mm/aaaa HH:MM:SS) são convertidos depois, no wrangling, para Int64 e
+    datetime64; lê-los como texto evita que pandas interprete '3.000' como 3.0.
+
+    Args:
+        columns (list): Colunas do dataset
+
+    Returns:
+        dict: Coluna -> dtype, para read_csv/iter_chunks
+    """
+    return {column: 'category' if column in CATEGORY_COLUMNS else string_dtype()
+            for column in columns}
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte um lote lido como texto (keep_default_na=False) para os tipos de ingest_dtypes.
+
+    Valores vazios viram NaN, como na leitura do dataset mesclado.
+    """
+    df = df.replace('', np.nan)
+    return df.astype(ingest_dtypes(df.columns))
+
+def select_columns(available, columns=None):
+    """
+    Colunas a ler do dataset (seleção de colunas).
+
+    Args:
+        available (list): Colunas existentes no dataset
+        columns (list): Colunas desejadas; padrão INGEST_COLUMNS. Vazio lê todas
+
+    Returns:
+        list | None: Colunas existentes a ler, na ordem do dataset, ou None para todas
+    """
+    wanted = set(columns or INGEST_COLUMNS)
+    if not wanted:
+        return None
+    missing = wanted - set(available)
+    if missing:
+        logger.warning(f"Colunas inexistentes no dataset ignoradas: {sorted(missing)}")
+    wanted.update(REQUIRED_COLUMNS)
+    return [column for column in available if column in wanted]
+
+def memory_usage_mb(df: pd.DataFrame) -> float:
+    """Memória ocupada pelo DataFrame, incluindo o conteúdo das strings, em MB"""
+    return df.memory_usage(deep=True).sum() / 1024 / 1024
@@ -1,19 +1,41 @@
 import pandas as pd
 import logging
 import os
+import json
+import hashlib
+import shutil
+import tempfile
+from functools import partial
 from pathlib import Path
 from dropbox_data.utils.date_extractor import extract_base_time
 from dropbox_data.utils.numbers_formatters import format_numeric_columns
-from dropbox_data.config import CSV_OUTPUT_PATH
+from dropbox_data.utils.cache import get_pipeline_cache
+from dropbox_data.utils.metrics import instrument, record
+from dropbox_data.utils.schema import ingest_dtypes, select_columns
+from dropbox_data.storage import KeyIndex, get_output_storage, get_storage
+from dropbox_data.wrangling.partitioning import spill_partitions
+from dropbox_data.wrangling.parallel import map_ordered
+from dropbox_data.wrangling.memory_budget import ChunkSizer, iter_budget_chunks
+from dropbox_data.config import (
+    CSV_OUTPUT_PATH, WRANGLE_PARTITIONS, WRANGLE_WORKERS, WRANGLE_MEMORY_BUDGET
+)
 
 logger = logging.getLogger(__name__)
 
+DATE_COLUMNS = ['post_extracted_datetime', 'base_time']
+
+@instrument('wrangle_dataframe')
 def wrangle_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     """
     Processa o DataFrame:
     1. Extrai base_time da coluna post_extracted_datetime
-    2. Para cada post_id, mantém todas as datas mas apenas o registro mais recente para outras colunas
+    2. Para cada post_id, mantém todas as datas mas apenas o registro mais recente
+       para outras colunas
     3. Formata colunas numéricas após ordenação
+
+    O resultado tem uma linha por registro original (com post_id): cada linha
+    mantém sua post_extracted_datetime, recebe o base_time do post e, nas demais
+    colunas, o último valor não nulo do post em ordem de post_extracted_datetime.
     
     Args:
         df (pd.DataFrame): DataFrame original
@@ -29,29 +51,18 @@ def wrangle_dataframe(df: pd.DataFrame) -> pd.DataFrame:
         logger.info("Base time extraído com sucesso")
         
         # Identificamos colunas de data
-        date_columns = ['post_extracted_datetime', 'base_time']
-        other_columns = [col for col in df.columns if col not in date_columns and col != 'post_id']
-        
-        # Criamos um DataFrame com todas as datas
-        dates_df = df.groupby('post_id')[date_columns].agg(list).reset_index()
-        logger.info("Datas agrupadas por post_id")
+        other_columns = [col for col in df.columns if col not in DATE_COLUMNS and col != 'post_id']
         
-        # Para as outras colunas, pegamos o último registro de cada post_id
-        latest_records = (df.sort_values('post_extracted_datetime')
-                         .groupby('post_id', group_keys=False)[other_columns]
-                         .last()
-                         .reset_index())
-        logger.info("Últimos registros extraídos para outras colunas")
+        # Uma única ordenação por post_id e data (estável para empates)
+        df = df[df['post_id'].notna()].sort_values(['post_id', 'post_extracted_datetime'],
+                                                   kind='stable')
         
-        # Juntamos os dois DataFrames
-        final_df = pd.merge(latest_records, dates_df, on='post_id', how='left')
+        # Para as outras colunas, propagamos o último registro de cada post_id para todas as linhas
+        latest_records = df.groupby('post_id', sort=False)[other_columns].transform('last')
+        logger.info("Últimos registros propagados para outras colunas")
         
-        # Explodimos as listas de datas para criar registros individuais
-        final_df = final_df.explode('post_extracted_datetime')
-        final_df = final_df.explode('base_time')
-        
-        # Ordenamos por post_id e data
-        final_df = final_df.sort_values(['post_id', 'post_extracted_datetime'])
+        final_df = pd.concat([df[['post_id']], latest_records, df[DATE_COLUMNS]], axis=1)
+        final_df = final_df.reset_index(drop=True)
         
         # Aplicamos a formatação numérica após a ordenação
         final_df = format_numeric_columns(final_df)
@@ -65,70 +76,350 @@ def wrangle_dataframe(df: pd.DataFrame) -> pd.DataFrame:
         logger.error(f"Erro ao processar DataFrame: {e}")
         raise
 
-def process_csv_file(input_path: str, output_path: str, chunk_size: int = 100000):
+def post_index_path(output_path: str) -> str:
+    """Caminho do índice persistente de post_ids associado a um arquivo de saída"""
+    return os.path.splitext(output_path)[0] + '_post_ids.sqlite'
+
+def wrangle_cached(df: pd.DataFrame, source_id: str = None) -> pd.DataFrame:
+    """
+    Processa um lote reaproveitando o resultado em cache de uma execução anterior.
+
+    source_id identifica a origem do lote: o content_hash do arquivo do Dropbox
+    mais a posição do lote, ou o hash do conteúdo do lote lido da entrada
+    (ver chunk_source_id). A chave acrescenta as
+    colunas e as linhas que restaram depois dos filtros (o índice do lote), sem
+    ler os valores. Sem source_id, ou com o cache desativado (CACHE_BACKEND=none),
+    o lote é apenas processado.
+    """
+    cache = get_pipeline_cache()
+    if source_id is None or cache.backend is None:
+        return wrangle_dataframe(df)
+    digest = hashlib.sha256(repr(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df.index, index=False).to_numpy().tobytes())
+    return cache.get_or_compute('wrangle', f"{source_id}:{digest.hexdigest()}",
+                                wrangle_dataframe, df)
+
+def chunk_source_id(chunk: pd.DataFrame) -> str:
+    """
+    Origem de um lote da entrada no cache do wrangling: o hash do seu conteúdo.
+
+    Calculado antes dos filtros; não depende da assinatura do arquivo de
+    entrada, de modo que um merge não invalida os lotes que não mudaram.
+    """
+    digest = hashlib.sha256(repr(list(chunk.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(chunk).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def _wrangle_partition(dtype, storage) -> pd.DataFrame:
+    """
+    Lê uma partição inteira e a processa (executado nos processos do pool).
+
+    A partição é lida com os mesmos tipos dos chunks (ingest_dtypes), e não
+    com os inferidos do arquivo de partição.
+    """
+    return wrangle_dataframe(storage.read(dtype=dtype))
+
+def _numbered(func, item):
+    """Aplica func a um item (posição, valor), mantendo a posição no resultado"""
+    position, value = item
+    return position, func(value)
+
+def _wrangle_numbered(item):
+    """Processa um lote (posição, (origem, lote)) com o cache da origem (ver wrangle_cached)"""
+    position, (source_id, chunk) = item
+    return position, wrangle_cached(chunk, source_id)
+
+def _identified(numbered, source_ids):
+    """Repassa os lotes (posição, lote), guardando em source_ids a origem de cada um"""
+    for position, chunk in numbered:
+        # Os lotes anteriores já foram consumidos ou descartados pelos filtros
+        source_ids.clear()
+        source_ids[position] = chunk_source_id(chunk)
+        yield position, chunk
+
+class ProcessedOutput:
+    """
+    Saída processada e seu índice de post_ids.
+
+    Filtra dos lotes de entrada os posts já gravados e grava os lotes
+    processados, mantendo o índice em dia. Usada por process_csv_file e pelo
+    pipeline em streaming; todos os métodos devem ser chamados na mesma thread
+    (a conexão SQLite do índice não é compartilhada entre threads).
+
+    Cada lote gravado é confirmado por um checkpoint no índice, na mesma
+    transação que seus post_ids: a posição do lote na entrada e o ponto de
+    restauração da saída (ver CsvStorage.checkpoint). Se a execução for
+    interrompida, a próxima descarta o que foi gravado depois do último
+    checkpoint (ex.: um append pela metade); com resume e a mesma entrada
+    (checkpoint_key), continua a partir do lote seguinte ao último confirmado.
+
+    Com OUTPUT_PARTITION_BY, a saída é particionada por data (ver
+    TimePartitionedStorage) e cada lote grava apenas nas partições das suas datas.
+    """
+
+    def __init__(self, output_path: str, chunk_size: int = 100000, storage_format: str = None,
+                 checkpoint_key: str = None, resume: bool = False):
+        self.storage = get_output_storage(output_path, storage_format)
+        self.checkpoint_key = checkpoint_key
+
+        # Garante que o diretório de saída existe
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+
+        # Abre o índice de post_ids existentes, reconstruindo-o se a saída mudou por fora
+        self.post_index = KeyIndex(post_index_path(output_path))
+        self.start_position = self._recover(resume)
+        self.post_index.sync_with(self.storage, 'post_id', chunk_size)
+        self.has_output = self.storage.exists()
+        if self.has_output:
+            logger.info(f"Usando índice de post_ids existentes: {self.post_index.path}")
+        self.position = self.start_position
+        self.total_records = 0
+        self._first_chunk = True
+        self._initial_size = self.storage.size_bytes()
+        self.post_index.set_meta('checkpoint', self._checkpoint())
+
+    def _checkpoint(self):
+        return json.dumps({
+            'key': self.checkpoint_key,
+            'position': self.position,
+            'generation': self.post_index.generation,
+            'output': self.storage.checkpoint(),
+        })
+
+    def _recover(self, resume):
+        """
+        Restaura a saída ao último checkpoint de uma execução interrompida.
+
+        Returns:
+            int: Lotes da entrada já confirmados (0 se não houver o que retomar)
+        """
+        checkpoint = self.post_index.get_meta('checkpoint')
+        if not checkpoint:
+            return 0
+        checkpoint = json.loads(checkpoint)
+        if not self.storage.rollback(checkpoint['output']):
+            logger.warning(f"{self.storage.path} não corresponde ao último checkpoint; "
+                           "o índice será reconstruído")
+            return 0
+        # O índice já contém exatamente os post_ids dos lotes confirmados
+        self.post_index.set_meta('signature', self.storage.signature())
+
+        if resume and checkpoint['key'] is not None and checkpoint['key'] == self.checkpoint_key:
+            # Mesma geração: os posts gravados antes da interrupção não filtram
+            # os lotes seguintes, como numa execução sem interrupção
+            self.post_index.generation = checkpoint['generation']
+            logger.info(f"Retomando o processamento após {checkpoint['position']} lotes "
+                        "já confirmados")
+            return checkpoint['position']
+        if resume:
+            logger.warning("Entrada diferente da execução interrompida; "
+                           "processando desde o início")
+        return 0
+
+    def new_posts(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Remove do lote os post_ids que já estão na saída"""
+        if self.has_output:
+            chunk = chunk[~self.post_index.contains(chunk['post_id'])]
+        return chunk
+
+    def filter_new_posts(self, chunks, skip: int = 0):
+        """
+        Filtra os posts já gravados de cada lote.
+
+        Args:
+            chunks (iterable): Lotes da entrada
+            skip (int): Lotes iniciais ignorados (já confirmados numa execução retomada)
+
+        Yields:
+            tuple: (posição do lote na entrada, a partir de 1; lote filtrado não vazio)
+        """
+        return self.filter_numbered(enumerate(chunks, start=1), skip)
+
+    def filter_numbered(self, numbered, skip: int = 0):
+        """Como filter_new_posts, para lotes já numerados: (posição crescente, lote)"""
+        for position, chunk in numbered:
+            if position <= skip:
+                continue
+            record(rows_in=len(chunk))
+            chunk = self.new_posts(chunk)
+            if not chunk.empty:
+                yield position, chunk
+
+    def write(self, processed_chunk: pd.DataFrame, position: int = None):
+        """
+        Grava um lote processado (o primeiro com cabeçalho) e o confirma no índice.
+
+        Args:
+            processed_chunk (pd.DataFrame): Lote processado
+            position (int): Posição do lote na entrada, registrada no checkpoint
+        """
+        if self._first_chunk and not self.has_output:
+            self.storage.write(processed_chunk)
+        else:
+            self.storage.append(processed_chunk)
+        if position is not None:
+            self.position = position
+        self.post_index.add(processed_chunk['post_id'], meta={
+            'signature': self.storage.signature(),
+            'checkpoint': self._checkpoint(),
+        })
+
+        self.total_records += len(processed_chunk)
+        self._first_chunk = False
+        record(rows_out=len(processed_chunk))
+        logger.info(f"Processados {self.total_records} registros até agora")
+
+    def finish(self):
+        """Marca a execução como concluída (não há o que retomar)"""
+        self.post_index.set_meta('checkpoint', None)
+        logger.info(f"Processamento concluído. Total de registros: {self.total_records}")
+
+        # Verifica se o arquivo foi realmente criado
+        if self.storage.exists():
+            file_size = self.storage.size_bytes()
+            record(bytes_out=file_size - self._initial_size)
+            logger.info(f"Arquivo criado com sucesso. Tamanho: {file_size/1024/1024:.2f} MB")
+        else:
+            logger.error("Arquivo não foi criado!")
+
+    def close(self):
+        """Fecha o índice de post_ids; chamada também quando a execução falha"""
+        self.post_index.close()
+
+@instrument('process_csv_file', label_arg=0)
+def process_csv_file(input_path: str, output_path: str, chunk_size: int = 100000,
+                     storage_format: str = None, partitions: int = None,
+                     workers: int = None, columns: list = None, resume: bool = False,
+                     on_checkpoint=None, memory_budget: int = None):
     """
     Processa o arquivo CSV em chunks para evitar problemas de memória.
+
+    Os post_ids já gravados na saída ficam num índice SQLite ao lado do arquivo
+    de saída, atualizado a cada chunk gravado, e não são relidos da saída.
+
+    Com partitions > 0 o processamento é feito em duas passadas: as linhas são
+    distribuídas em partições em disco pelo hash do post_id e cada partição é
+    processada inteira, de modo que base_time e o registro mais recente de um
+    post consideram todas as suas linhas, mesmo que estejam em chunks diferentes.
+
+    Com workers > 1 os chunks (ou partições) são processados num pool de
+    processos e gravados na mesma ordem em que foram lidos.
+
+    Com STORAGE_FORMAT=sqlite o processamento é feito por views SQL sobre o
+    dataset mesclado (ver SqliteStorage.refresh_views): a função apenas as
+    atualiza, e a saída processada é exportada sob demanda.
+
+    Cada chunk (ou partição) gravado é um checkpoint (ver ProcessedOutput): o
+    que uma execução interrompida gravou depois do último é descartado e, com
+    resume, o processamento continua do chunk seguinte se a entrada e os
+    parâmetros não mudaram.
+
+    Com memory_budget (bytes), chunk_size é ignorado: o tamanho dos chunks é
+    ajustado durante a leitura para que cada chunk, com o pico de memória de
+    wrangle_dataframe, caiba no orçamento (ver ChunkSizer), e a posição de cada
+    checkpoint passa a ser o número de linhas lidas. Com partitions > 0 o
+    orçamento vale para a primeira passada; cada partição é processada inteira.
     
     Args:
         input_path (str): Caminho do arquivo de entrada
         output_path (str): Caminho do arquivo de saída
         chunk_size (int): Tamanho de cada chunk
+        storage_format (str): 'csv', 'parquet' ou 'sqlite'; padrão STORAGE_FORMAT
+        partitions (int): Número de partições por post_id; padrão WRANGLE_PARTITIONS,
+            0 processa cada chunk isoladamente
+        workers (int): Número de processos; padrão WRANGLE_WORKERS
+        columns (list): Colunas a ler da entrada; padrão INGEST_COLUMNS (vazio = todas)
+        resume (bool): Retoma uma execução interrompida a partir do último checkpoint
+        on_checkpoint (callable): Chamada com (posição, registros gravados, unidade da
+            posição: 'chunks', 'rows' ou 'partitions') a cada checkpoint
+        memory_budget (int): Orçamento de memória em bytes; padrão WRANGLE_MEMORY_BUDGET,
+            0 usa chunks fixos de chunk_size linhas
     """
+    spill_dir = None
+    output = None
     try:
-        # Garante que o diretório de saída existe
-        output_dir = os.path.dirname(output_path)
-        os.makedirs(output_dir, exist_ok=True)
-        
-        logger.info(f"Iniciando processamento do arquivo: {input_path}")
-        logger.info(f"Arquivo será salvo em: {output_path}")
-        
-        # Lê os post_ids existentes se o arquivo de saída já existir
-        existing_post_ids = set()
-        if os.path.exists(output_path):
-            existing_df = pd.read_csv(output_path, sep=';', usecols=['post_id'])
-            existing_post_ids = set(existing_df['post_id'])
-            logger.info(f"Encontrados {len(existing_post_ids)} post_ids existentes")
-        
-        # Lê o arquivo em chunks
-        chunks = pd.read_csv(input_path, sep=';', chunksize=chunk_size)
-        
-        # Processa o primeiro chunk e salva com cabeçalho
-        first_chunk = True
-        total_records = 0
-        
-        for chunk in chunks:
-            # Filtra apenas novos post_ids no chunk
-            if existing_post_ids:
-                chunk = chunk[~chunk['post_id'].isin(existing_post_ids)]
-            
-            if not chunk.empty:
-                processed_chunk = wrangle_dataframe(chunk)
-                
-                # Salva o chunk processado
-                processed_chunk.to_csv(
-                    output_path,
-                    mode='w' if first_chunk and not existing_post_ids else 'a',
-                    header=first_chunk and not existing_post_ids,
-                    index=False,
-                    sep=';'
-                )
-                
-                total_records += len(processed_chunk)
-                first_chunk = False
-                logger.info(f"Processados {total_records} registros até agora")
-        
-        logger.info(f"Processamento concluído. Total de registros: {total_records}")
+        partitions = WRANGLE_PARTITIONS if partitions is None else partitions
+        workers = workers or WRANGLE_WORKERS
+        memory_budget = WRANGLE_MEMORY_BUDGET if memory_budget is None else memory_budget
+        input_storage = get_storage(input_path, storage_format)
+        if input_storage.format == 'sqlite':
+            input_storage.refresh_views()
+            return
+
+        available = input_storage.columns()
+        usecols = select_columns(available, columns)
+
+        # Um checkpoint só é retomado com a mesma entrada e o mesmo particionamento
+        chunking = f"budget={memory_budget}" if memory_budget else str(chunk_size)
+        checkpoint_key = '|'.join([input_storage.signature(), chunking, str(partitions),
+                                   ','.join(usecols or [])])
+        output = ProcessedOutput(output_path, chunk_size, storage_format, checkpoint_key, resume)
         
-        # Verifica se o arquivo foi realmente criado
-        if os.path.exists(output_path):
-            file_size = os.path.getsize(output_path)
-            logger.info(f"Arquivo criado com sucesso. Tamanho: {file_size/1024/1024:.2f} MB")
+        logger.info(f"Iniciando processamento do arquivo: {input_storage.path}")
+        logger.info(f"Arquivo será salvo em: {output.storage.path}")
+        
+        # Lê o arquivo em chunks com tipos explícitos, já sem os posts existentes
+        dtype = ingest_dtypes(usecols or available)
+        sizer = None
+        if memory_budget:
+            # Lotes em memória: os pendentes no pool de processos mais o que está sendo lido
+            concurrency = 2 * workers + 1 if workers > 1 else 1
+            sizer = ChunkSizer(memory_budget, wrangle_dataframe.__wrapped__, concurrency,
+                               measure=not partitions)
+            skip_rows = 0 if partitions else output.start_position
+            numbered_chunks = iter_budget_chunks(input_storage, sizer, columns=usecols,
+                                                 dtype=dtype, skip_rows=skip_rows)
         else:
-            logger.error("Arquivo não foi criado!")
+            numbered_chunks = enumerate(
+                input_storage.iter_chunks(chunk_size, columns=usecols, dtype=dtype), start=1
+            )
+
+        if partitions:
+            # Primeira passada: distribui as linhas em partições por post_id
+            spill_dir = tempfile.mkdtemp(prefix='.partitions_',
+                                         dir=os.path.dirname(output_path) or '.')
+            partition_storages = spill_partitions(
+                (chunk for _, chunk in output.filter_numbered(numbered_chunks)),
+                spill_dir, partitions, storage_format
+            )
+            # Segunda passada: cada partição é lida inteira; as já confirmadas são puladas
+            numbered = [(position, storage)
+                        for position, storage in enumerate(partition_storages, start=1)
+                        if position > output.start_position]
+            processed_chunks = map_ordered(partial(_numbered, partial(_wrangle_partition, dtype)),
+                                           numbered, workers)
+        else:
+            # Com o cache ativo, cada lote é identificado pelo conteúdo antes dos filtros
+            source_ids = {}
+            if get_pipeline_cache().backend is not None:
+                numbered_chunks = _identified(numbered_chunks, source_ids)
+            chunks = output.filter_numbered(numbered_chunks, skip=output.start_position)
+            processed_chunks = map_ordered(
+                _wrangle_numbered,
+                ((position, (source_ids.pop(position, None), chunk))
+                 for position, chunk in chunks),
+                workers
+            )
+        
+        # Salva os chunks processados, o primeiro com cabeçalho
+        unit = 'partitions' if partitions else 'rows' if memory_budget else 'chunks'
+        for position, processed_chunk in processed_chunks:
+            output.write(processed_chunk, position)
+            if sizer and not partitions:
+                sizer.observe_output(processed_chunk)
+            if on_checkpoint:
+                on_checkpoint(position, output.total_records, unit)
+        
+        output.finish()
         
     except Exception as e:
         logger.error(f"Erro ao processar arquivo: {e}")
         raise
+    finally:
+        if output:
+            output.close()
+        if spill_dir:
+            shutil.rmtree(spill_dir, ignore_errors=True)
 
 if __name__ == "__main__":
     try:
@@ -137,7 +428,7 @@ if __name__ == "__main__":
             level=logging.INFO,
             format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
-        
+
         # Define caminhos dos arquivos
         input_file = CSV_OUTPUT_PATH
         output_file = str(Path(CSV_OUTPUT_PATH).parent / 'data_processed.csv')
@@ -0,0 +1,274 @@
+import re
+import logging
+import tracemalloc
+from collections import deque
+import pandas as pd
+from dropbox_data.utils.metrics import TracedPeak
+
+logger = logging.getLogger(__name__)
+
+# Linhas lidas por bloco e usadas na amostra que mede o wrangling
+BLOCK_ROWS = 10000
+MIN_CHUNK_ROWS = 1000
+
+# Largura de linha (em relação à amostra) a partir da qual a expansão é medida de novo
+RECALIBRATE_RATIO = 1.5
+
+# Blocos (e chunks) recentes considerados na largura das linhas e na correção do fator
+WIDTH_WINDOW = 8
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    """Memória ocupada por um DataFrame, incluindo o conteúdo dos textos"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+def _proc_status(field):
+    """Campo de memória (em bytes) de /proc/self/status; None fora do Linux"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            match = re.search(rf'^{field}:\s+(\d+) kB', f.read(), re.MULTILINE)
+    except OSError:
+        return None
+    return int(match.group(1)) * 1024 if match else None
+
+def _arrow_pool():
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+    return pa.default_memory_pool()
+
+def measure_peak(func, df: pd.DataFrame) -> int:
+    """
+    Pico de memória alocada durante func(df), além da já ocupada por df.
+
+    Soma o pico das alocações do Python e do numpy (tracemalloc) ao que o pool
+    de memória do Arrow (textos em Arrow) alocou durante a chamada.
+    """
+    pool = _arrow_pool()
+    arrow_before = pool.bytes_allocated() if pool else 0
+    arrow_max_before = pool.max_memory() if pool else 0
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        # TracedPeak preserva o pico de estágios externos (ver RunMetrics.stage)
+        with TracedPeak() as traced:
+            func(df)
+        peak = traced.bytes
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    if pool:
+        arrow_max = pool.max_memory() or 0
+        if arrow_max > (arrow_max_before or 0):
+            peak += arrow_max - arrow_before
+        else:
+            peak += max(pool.bytes_allocated() - arrow_before, 0)
+    return peak
+
+class ChunkSizer:
+    """
+    Tamanho dos chunks (em linhas) a partir de um orçamento de memória em bytes.
+
+    A memória de um chunk é estimada como linhas x largura da linha x fator,
+    em que a largura vem dos blocos lidos (a maior entre os mais recentes) e o
+    fator cobre o próprio chunk mais o pico de wrangle_dataframe, medido numa
+    amostra e medido de novo quando as linhas ficam bem mais largas que as da
+    amostra. Com workers > 1, o orçamento é dividido entre os lotes que ficam
+    em memória ao mesmo tempo. Cada mudança relevante de tamanho é registrada
+    no log.
+
+    No Linux e com um único processo, a memória residente (VmRSS) também é
+    lida a cada bloco lido, chunk montado e chunk gravado, e o fator é
+    corrigido pelo maior crescimento observado em cada chunk em relação ao fim
+    do anterior (buffers de leitura e escrita, alocador). A memória que
+    continua ocupada desde o fim do primeiro chunk é descontada do orçamento,
+    de modo que o pico do processo fique perto da memória após o primeiro
+    chunk mais o orçamento. O primeiro chunk inclui alocações feitas uma única
+    vez (bibliotecas, buffers do leitor): sua medição é descartada e essas
+    alocações não contam contra o orçamento. Até a primeira medição válida os
+    chunks têm no máximo BLOCK_ROWS linhas.
+
+    Args:
+        budget_bytes (int): Orçamento de memória do processamento
+        wrangle (callable): Função de processamento medida na amostra
+        concurrency (int): Lotes em memória ao mesmo tempo
+        min_rows (int): Menor tamanho de chunk, mesmo que exceda o orçamento
+        measure (bool): Mede a memória residente a cada chunk (observe_output); só
+            com um processo
+    """
+
+    def __init__(self, budget_bytes: int, wrangle, concurrency: int = 1,
+                 min_rows: int = MIN_CHUNK_ROWS, measure: bool = True):
+        self.budget_bytes = budget_bytes
+        self.wrangle = wrangle
+        self.concurrency = max(concurrency, 1)
+        self.min_rows = min_rows
+        self.widths = deque(maxlen=WIDTH_WINDOW)
+        self.calibrated_width = None
+        self.expansion = None
+        self.corrections = deque(maxlen=WIDTH_WINDOW)
+        self.rows = None
+        self._estimate = 0
+        measure = measure and self.concurrency == 1
+        self._chunk_start = _proc_status('VmRSS') if measure else None
+        self._chunk_peak = self._chunk_start
+        self._initial_rss = self._chunk_start
+        self._warm = False
+
+    @property
+    def row_bytes(self):
+        return max(self.widths) if self.widths else None
+
+    @property
+    def correction(self):
+        return max(max(self.corrections), 1.0) if self.corrections else 1.0
+
+    @property
+    def measuring(self):
+        return self._chunk_start is not None
+
+    @property
+    def factor(self):
+        return self.base_factor * self.correction
+
+    @property
+    def base_factor(self):
+        # O chunk montado a partir dos blocos ocupa o dobro por um instante (concat)
+        return max(2.0, 1.0 + self.expansion)
+
+    def _sample_rss(self):
+        """Atualiza a maior memória residente vista no chunk atual"""
+        if self._chunk_start is not None:
+            self._chunk_peak = max(self._chunk_peak, _proc_status('VmRSS') or 0)
+
+    def calibrate(self, sample: pd.DataFrame):
+        """Mede o pico de memória do processamento por byte de entrada numa amostra"""
+        sample_bytes = max(frame_bytes(sample), 1)
+        peak = measure_peak(self.wrangle, sample)
+        self.calibrated_width = sample_bytes / len(sample)
+        self.expansion = max(peak / sample_bytes, 1.0)
+        logger.info(f"Orçamento de memória: amostra de {len(sample)} linhas com "
+                    f"{self.calibrated_width:.0f} bytes/linha, pico do processamento "
+                    f"{self.expansion:.1f}x a entrada")
+
+    def observe_block(self, block: pd.DataFrame):
+        """Registra a largura das linhas de um bloco lido, medindo o wrangling se preciso"""
+        self._sample_rss()
+        width = frame_bytes(block) / len(block)
+        self.widths.append(width)
+        if self.expansion is None or width > self.calibrated_width * RECALIBRATE_RATIO:
+            self.calibrate(block.iloc[:BLOCK_ROWS])
+        self._resize()
+
+    def chunk_read(self, rows: int):
+        """Registra um chunk entregue ao processamento, para comparar com o pico medido"""
+        self._sample_rss()
+        self._estimate = max(self._estimate, rows * self.row_bytes * self.base_factor)
+
+    def observe_output(self, processed: pd.DataFrame):
+        """
+        Ajusta o fator depois de gravar um chunk.
+
+        Usa a memória da saída por linha e, quando disponível, o maior crescimento
+        da memória residente desde o fim do chunk anterior.
+        """
+        if not processed.empty and self.row_bytes:
+            ratio = frame_bytes(processed) / len(processed) / self.row_bytes
+            if ratio > self.expansion:
+                logger.info(f"Orçamento de memória: saída com {ratio:.1f}x a entrada por "
+                            f"linha, acima do pico medido ({self.expansion:.1f}x)")
+                self.expansion = ratio
+                self._resize()
+
+        if self._chunk_start is None or not self._estimate:
+            return
+        self._sample_rss()
+        growth = self._chunk_peak - self._chunk_start
+        previous = self.correction if self.corrections else None
+        warmup = not self._warm
+        if not warmup:
+            self.corrections.append(growth / self._estimate)
+        self._warm = True
+        logger.debug(f"Orçamento de memória: {growth / 2**20:.0f} MB usados no último chunk "
+                     f"({self._estimate / 2**20:.0f} MB estimados, "
+                     f"{self._chunk_start / 2**20:.0f} MB residentes no início)")
+        if self.corrections and (previous is None
+                                 or abs(self.correction - previous) > previous * 0.1):
+            logger.info(f"Orçamento de memória: {growth / 2**20:.0f} MB usados no último chunk "
+                        f"para {self._estimate / 2**20:.0f} MB estimados; "
+                        f"correção do fator {self.correction:.1f}x")
+        self._estimate = 0
+        self._chunk_start = self._chunk_peak = _proc_status('VmRSS') or 0
+        if warmup:
+            # As alocações feitas uma única vez no primeiro chunk não saem do orçamento
+            self._initial_rss = self._chunk_start
+        self._resize()
+
+    @property
+    def available_bytes(self):
+        """Orçamento menos a memória que continua ocupada desde o primeiro chunk"""
+        if not self.measuring:
+            return self.budget_bytes
+        return max(self.budget_bytes - max(self._chunk_start - self._initial_rss, 0), 0)
+
+    def _resize(self):
+        per_chunk = self.available_bytes / self.concurrency
+        rows = int(per_chunk / (self.row_bytes * self.factor))
+        if rows < self.min_rows:
+            if self.rows != self.min_rows:
+                logger.warning(f"Orçamento de memória de {self.budget_bytes / 2**20:.0f} MB "
+                               f"insuficiente para {self.min_rows} linhas "
+                               f"({self.row_bytes:.0f} bytes/linha); usando o mínimo")
+            rows = self.min_rows
+        if self.measuring and not self.corrections:
+            rows = min(rows, BLOCK_ROWS)
+        previous = self.rows
+        self.rows = rows
+        if previous is None or abs(rows - previous) > previous * 0.5:
+            logger.info(f"Chunks de {rows} linhas: {self.row_bytes:.0f} bytes/linha x "
+                        f"{self.factor:.1f} (entrada + processamento) x {self.concurrency} "
+                        f"lotes simultâneos <= {self.available_bytes / 2**20:.0f} MB "
+                        f"disponíveis de {self.budget_bytes / 2**20:.0f} MB")
+
+def iter_budget_chunks(storage, sizer: ChunkSizer, columns=None, dtype=None, skip_rows=0):
+    """
+    Lê o dataset em chunks do tamanho definido por sizer a cada momento.
+
+    O dataset é lido em blocos de BLOCK_ROWS linhas, medidos um a um, e os
+    blocos são juntados (ou divididos) no tamanho atual do chunk.
+
+    Args:
+        storage: Backend do dataset (ver get_storage)
+        sizer (ChunkSizer): Define o tamanho de cada chunk
+        skip_rows (int): Linhas iniciais ignoradas (já confirmadas numa execução retomada)
+
+    Yields:
+        tuple: (linhas lidas até o fim do chunk, chunk)
+    """
+    pending = []
+    pending_rows = 0
+    consumed = 0
+    for block in storage.iter_chunks(BLOCK_ROWS, columns=columns, dtype=dtype):
+        if consumed < skip_rows:
+            skipped = min(len(block), skip_rows - consumed)
+            consumed += skipped
+            block = block.iloc[skipped:]
+        if block.empty:
+            continue
+        sizer.observe_block(block)
+        pending.append(block)
+        pending_rows += len(block)
+        while pending_rows >= sizer.rows:
+            data = pd.concat(pending) if len(pending) > 1 else pending[0]
+            chunk, rest = data.iloc[:sizer.rows], data.iloc[sizer.rows:]
+            consumed += len(chunk)
+            pending = [rest.copy()] if len(rest) else []
+            pending_rows = len(rest)
+            del data, rest
+            sizer.chunk_read(len(chunk))
+            yield consumed, chunk
+    if pending:
+        chunk = pd.concat(pending) if len(pending) > 1 else pending[0]
+        sizer.chunk_read(len(chunk))
+        yield consumed + len(chunk), chunk
@@ -0,0 +1,40 @@
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+def map_ordered(func, items, workers: int = 1, max_in_flight: int = None):
+    """
+    Aplica func a cada item, devolvendo os resultados na ordem de entrada.
+
+    Com workers > 1 os itens são enviados a um pool de processos. No máximo
+    max_in_flight itens (padrão 2 * workers) ficam em processamento ou
+    aguardando gravação ao mesmo tempo, o que limita a memória usada.
+
+    Args:
+        func (callable): Função de nível de módulo (precisa ser serializável)
+        items (iterable): Itens a processar; consumidos sob demanda
+        workers (int): Número de processos
+        max_in_flight (int): Limite de itens pendentes
+
+    Yields:
+        Resultado de func para cada item, na ordem de items
+    """
+    if workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    max_in_flight = max_in_flight or workers * 2
+    logger.info(f"Processando em paralelo com {workers} processos "
+                f"(até {max_in_flight} lotes pendentes)")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,57 @@
+import os
+import logging
+import pandas as pd
+from dropbox_data.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+def partition_ids(post_ids: pd.Series, num_partitions: int):
+    """
+    Calcula a partição de cada linha a partir do hash do post_id.
+
+    Args:
+        post_ids (pd.Series): Coluna post_id
+        num_partitions (int): Número de partições
+
+    Returns:
+        np.ndarray: Índice da partição (0..num_partitions-1) de cada linha
+    """
+    hashes = pd.util.hash_pandas_object(post_ids.astype(str), index=False).to_numpy()
+    return hashes % num_partitions
+
+def partition_path(spill_dir: str, index: int) -> str:
+    return os.path.join(spill_dir, f"partition-{index:04d}.csv")
+
+def spill_partitions(chunks, spill_dir: str, num_partitions: int, storage_format: str = None):
+    """
+    Primeira passada: distribui as linhas dos chunks em partições em disco por post_id.
+
+    Todas as linhas de um mesmo post_id caem na mesma partição, que depois pode
+    ser processada inteira em memória.
+
+    Args:
+        chunks (iterable): DataFrames de entrada
+        spill_dir (str): Diretório das partições
+        num_partitions (int): Número de partições
+        storage_format (str): Formato das partições; padrão STORAGE_FORMAT
+
+    Returns:
+        list: Backends de armazenamento das partições não vazias
+    """
+    os.makedirs(spill_dir, exist_ok=True)
+    storages = {}
+    total_rows = 0
+
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        for index, part in chunk.groupby(partition_ids(chunk['post_id'], num_partitions)):
+            storage = storages.get(index)
+            if storage is None:
+                storage = storages[index] = get_storage(partition_path(spill_dir, index),
+                                                        storage_format)
+            storage.append(part)
+        total_rows += len(chunk)
+
+    logger.info(f"{total_rows} registros distribuídos em {len(storages)} partições")
+    return [storages[index] for index in sorted(storages)]
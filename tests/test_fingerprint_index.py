@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+from dropbox_data.config import CSV_DELIMITER
+from dropbox_data.storage import FingerprintIndex, get_storage, row_fingerprints
+from dropbox_data.utils.readers import get_csv_reader
+from dropbox_data.utils.schema import string_dtype
+
+# Valores que mudam se o dataset for relido com inferência de tipos: zeros à
+# esquerda, separador de milhar, notação científica, booleanos e ausentes
+SAMPLE = {
+    'post_id': ['007', '1.500', '10', '1e3', '20'],
+    'post_extracted_datetime': ['01/01/2024 10:00:00', '02/01/2024 10:00:00', '',
+                                '03/01/2024 10:00:00', 'NA'],
+    'post_likes': ['1.234', '2 mil', '', '0.50', 'None'],
+    'post_flag': ['True', 'false', '1', '', 'x'],
+}
+
+@pytest.mark.parametrize('storage_format', ['csv', 'parquet'])
+def test_rebuilt_index_matches_merged_rows(tmp_path, storage_format):
+    if storage_format == 'parquet':
+        pytest.importorskip('pyarrow')
+    file = tmp_path / 'baixado.csv'
+    pd.DataFrame(SAMPLE).to_csv(file, sep=CSV_DELIMITER, index=False, encoding='utf-8-sig')
+    storage = get_storage(str(tmp_path / 'data.csv'), storage_format)
+
+    # Lido e gravado como em DropboxDownloader.append_file
+    merged = []
+    for chunk in get_csv_reader().iter_chunks(str(file), 2, dtype=string_dtype(),
+                                              keep_default_na=False):
+        storage.append(chunk)
+        merged.append(row_fingerprints(chunk))
+
+    index = FingerprintIndex(str(tmp_path / 'merge_fingerprints.sqlite'))
+    try:
+        index.sync_with(storage)
+        assert len(index) == len(SAMPLE['post_id'])
+        for fingerprints in merged:
+            assert index.contains(fingerprints).all()
+    finally:
+        index.close()
@@ -0,0 +1,15 @@
+import pandas as pd
+from dropbox_data.storage import CsvStorage, KeyIndex
+
+def test_sync_with_rebuilds_keys_as_text(tmp_path):
+    storage = CsvStorage(str(tmp_path / 'final_data.csv'))
+    storage.write(pd.DataFrame({'post_id': ['007', '12', ''], 'post_likes': ['1', '2', '3']}))
+
+    index = KeyIndex(str(tmp_path / 'final_data_post_ids.sqlite'))
+    try:
+        index.sync_with(storage, 'post_id')
+        assert len(index) == 2
+        found = index.contains(pd.Series(['007', '12', '7', '13', None]))
+        assert found.tolist() == [True, True, False, False, False]
+    finally:
+        index.close()
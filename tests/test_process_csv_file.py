@@ -0,0 +1,79 @@
+import pandas as pd
+from dropbox_data.config import CSV_DELIMITER
+from dropbox_data.wrangling.dataframes import process_csv_file
+
+INPUT = {
+    'post_id': ['007', '12', '007', '12', '30'],
+    'post_extracted_datetime': ['01/01/2024 10:00:00', '01/01/2024 09:00:00',
+                                '02/01/2024 10:00:00', '03/01/2024 09:00:00',
+                                '05/01/2024 10:00:00'],
+    'post_likes': ['1.234', '10', '1,5 mil', '', '2.5'],
+    'profile': ['a', 'b', 'a', 'b', 'c'],
+}
+
+def _process(tmp_path, name, partitions):
+    output_path = str(tmp_path / name / 'final_data.csv')
+    process_csv_file(str(tmp_path / 'data.csv'), output_path, chunk_size=100,
+                     storage_format='csv', partitions=partitions, workers=1, columns=[],
+                     memory_budget=0)
+    df = pd.read_csv(output_path, sep=CSV_DELIMITER, dtype=str, encoding='utf-8-sig')
+    return df.sort_values(['post_id', 'post_extracted_datetime']).reset_index(drop=True)
+
+def test_partitioned_matches_chunked(tmp_path):
+    pd.DataFrame(INPUT).to_csv(tmp_path / 'data.csv', sep=CSV_DELIMITER, index=False,
+                               encoding='utf-8-sig')
+    chunked = _process(tmp_path, 'chunked', 0)
+    partitioned = _process(tmp_path, 'partitioned', 2)
+
+    pd.testing.assert_frame_equal(partitioned, chunked)
+    assert sorted(chunked['post_id'].unique()) == ['007', '12', '30']
+    assert chunked.loc[chunked['post_id'] == '007', 'post_likes'].tolist() == ['1500', '1500']
+
+def test_cache_survives_a_merge(tmp_path):
+    from dropbox_data.storage import CsvStorage
+    from dropbox_data.utils.cache import MemoryCacheBackend, get_pipeline_cache
+
+    data = CsvStorage(str(tmp_path / 'data.csv'))
+    data.write(pd.DataFrame(INPUT))
+    cache = get_pipeline_cache()
+    backend = cache.backend
+    cache.backend = MemoryCacheBackend()
+    try:
+        def process(name):
+            process_csv_file(data.path, str(tmp_path / name / 'final_data.csv'), chunk_size=2,
+                             storage_format='csv', partitions=0, workers=1, columns=[],
+                             memory_budget=0)
+
+        process('first')
+        hits, misses = cache.hits, cache.misses
+        # O merge acrescenta linhas e muda a assinatura do data.csv
+        data.append(pd.DataFrame({'post_id': ['40'], 'post_extracted_datetime':
+                                  ['06/01/2024 10:00:00'], 'post_likes': ['1'],
+                                  'profile': ['d']}))
+        process('second')
+        # Só o último lote, que recebeu a linha nova, é processado de novo
+        assert cache.hits - hits == 2
+        assert cache.misses - misses == 1
+    finally:
+        cache.backend = backend
+
+def test_budget_checkpoints_count_rows(tmp_path):
+    from dropbox_data.cli import format_status
+
+    pd.DataFrame(INPUT).to_csv(tmp_path / 'data.csv', sep=CSV_DELIMITER, index=False,
+                               encoding='utf-8-sig')
+    checkpoints = []
+    process_csv_file(str(tmp_path / 'data.csv'), str(tmp_path / 'out' / 'final_data.csv'),
+                     storage_format='csv', partitions=0, workers=1, columns=[],
+                     memory_budget=2**20,
+                     on_checkpoint=lambda *checkpoint: checkpoints.append(checkpoint))
+
+    assert checkpoints[-1][0] == len(INPUT['post_id'])
+    assert {unit for _, _, unit in checkpoints} == {'rows'}
+
+    status = {'processed_files': None, 'merged_dataset': None, 'processed_output': None,
+              'pending_downloads': 0, 'last_run': None,
+              'run_manifest': {'run_id': 'r', 'status': 'running', 'stage': 'wrangle',
+                               'files': 1, 'files_merged': 1,
+                               'wrangle': {'position': 5, 'unit': 'rows', 'rows': 3}}}
+    assert '5 linhas lidas' in format_status(status)
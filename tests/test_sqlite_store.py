@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+from dropbox_data.config import CSV_DELIMITER
+from dropbox_data.storage import CsvStorage, SqliteStorage
+from dropbox_data.utils.schema import ingest_dtypes
+from dropbox_data.wrangling.dataframes import wrangle_dataframe
+
+# Posts com datas inválidas (NaT), que o pandas ordena por último
+MERGED = {
+    'post_id': ['10', '20', '10', '10', '20', '30'],
+    'post_extracted_datetime': ['02/01/2024 10:00:00', 'inválida', '01/01/2024 10:00:00',
+                                'sem data', '01/01/2024 09:00:00', '03/01/2024 10:00:00'],
+    'post_likes': ['5', '7', '1.234', '9', '', '2 mil'],
+    'profile': ['a', 'b2', 'a0', '', 'b', 'c'],
+}
+
+def _read(path):
+    return pd.read_csv(path, sep=CSV_DELIMITER, dtype=str, encoding='utf-8-sig')
+
+def test_export_matches_pandas_with_invalid_dates(tmp_path):
+    merged = pd.DataFrame(MERGED)
+    storage = SqliteStorage(str(tmp_path / 'dropbox_data.sqlite'), 'data')
+    storage.append(merged)
+    storage.export_processed(str(tmp_path / 'sqlite.csv'))
+
+    expected = merged.replace('', np.nan).astype(ingest_dtypes(merged.columns))
+    CsvStorage(str(tmp_path / 'pandas.csv')).write(wrangle_dataframe(expected))
+
+    exported, reference = _read(tmp_path / 'sqlite.csv'), _read(tmp_path / 'pandas.csv')
+    pd.testing.assert_frame_equal(exported[list(reference.columns)], reference)
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+from dropbox_data.utils.date_extractor import extract_base_time
+from dropbox_data.utils.numbers_formatters import format_numeric_columns
+from dropbox_data.wrangling.dataframes import DATE_COLUMNS, wrangle_dataframe
+
+# Amostra fixa: vários snapshots por post, fora de ordem, com nulos, post_id
+# ausente e uma data inválida (NaT)
+SAMPLE = {
+    'post_id': [10, 20, 10, 30, 10, 20, None, 30],
+    'post_extracted_datetime': ['03/01/2024 10:00:00', '01/01/2024 09:00:00',
+                                '01/01/2024 10:00:00', 'inválida',
+                                '02/01/2024 10:00:00', '02/01/2024 09:00:00',
+                                '01/01/2024 08:00:00', '05/01/2024 10:00:00'],
+    'post_likes': ['1.500', '10', '1 mil', '7', '1,2 mil', None, '3', '8'],
+    'profile': ['a', 'b', 'a', 'c', None, 'b2', 'x', 'c2'],
+}
+
+# Resultado esperado para SAMPLE. A linha com data inválida fica por último no
+# seu post, então seus valores são os mais recentes (como no sort_values original)
+SAMPLE_EXPECTED = {
+    'post_id': [10.0, 10.0, 10.0, 20.0, 20.0, 30.0, 30.0],
+    'post_likes': [1500, 1500, 1500, 10, 10, 7, 7],
+    'profile': ['a', 'a', 'a', 'b2', 'b2', 'c', 'c'],
+    'post_extracted_datetime': ['2024-01-01 10:00:00', '2024-01-02 10:00:00',
+                                '2024-01-03 10:00:00', '2024-01-01 09:00:00',
+                                '2024-01-02 09:00:00', '2024-01-05 10:00:00', None],
+    'base_time': ['2024-01-01 10:00:00'] * 3 + ['2024-01-01 09:00:00'] * 2
+                 + ['2024-01-05 10:00:00'] * 2,
+}
+
+def baseline_wrangle(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Algoritmo original de wrangle_dataframe (listas por post, sort + groupby last,
+    merge e explode).
+
+    Duas diferenças, que não mudam o conteúdo: as ordenações são estáveis, para
+    que empates de data tenham um resultado definido, e base_time (igual em todas
+    as linhas do post) é tomado uma vez em vez de explodido de novo, o que só
+    repetia cada linha tantas vezes quanto os snapshots do post.
+    """
+    df = extract_base_time(df)
+    other_columns = [col for col in df.columns if col not in DATE_COLUMNS and col != 'post_id']
+
+    dates_df = df.groupby('post_id')[DATE_COLUMNS].agg(list).reset_index()
+    latest_records = (df.sort_values('post_extracted_datetime', kind='stable')
+                      .groupby('post_id', group_keys=False)[other_columns]
+                      .last()
+                      .reset_index())
+    final_df = pd.merge(latest_records, dates_df, on='post_id', how='left')
+    final_df['base_time'] = final_df['base_time'].str[0]
+    final_df = final_df.explode('post_extracted_datetime')
+    final_df = final_df.sort_values(['post_id', 'post_extracted_datetime'], kind='stable')
+    for column in DATE_COLUMNS:
+        final_df[column] = pd.to_datetime(final_df[column])
+    final_df = format_numeric_columns(final_df.reset_index(drop=True))
+    return final_df
+
+def random_sample(seed: int, rows: int = 500) -> pd.DataFrame:
+    """Amostra aleatória com post_ids repetidos, datas repetidas ou inválidas e nulos"""
+    rng = np.random.default_rng(seed)
+    posts = rng.integers(0, rows // 5, rows).astype(float)
+    posts[rng.random(rows) < 0.02] = np.nan
+    days = rng.integers(1, 29, rows)
+    hours = rng.integers(0, 3, rows)
+    dates = np.array([f"{day:02d}/02/2024 {hour:02d}:00:00" for day, hour in zip(days, hours)],
+                     dtype=object)
+    dates[rng.random(rows) < 0.05] = 'sem data'
+    likes = np.array([str(value) for value in rng.integers(0, 5000, rows)], dtype=object)
+    likes[rng.random(rows) < 0.1] = '2,5 mil'
+    likes[rng.random(rows) < 0.1] = None
+    profiles = rng.choice(np.array(['a', 'b', 'c', None], dtype=object), rows)
+    return pd.DataFrame({'post_id': posts, 'post_extracted_datetime': dates,
+                         'post_likes': likes, 'profile': profiles})
+
+def _comparable(df: pd.DataFrame) -> pd.DataFrame:
+    # Datas na mesma resolução (pd.to_datetime de texto pode inferir us em vez de ns)
+    df = df.reset_index(drop=True)
+    for column in DATE_COLUMNS:
+        df[column] = df[column].astype('datetime64[ns]')
+    return df
+
+def _assert_equal(result: pd.DataFrame, expected: pd.DataFrame):
+    pd.testing.assert_frame_equal(_comparable(result), _comparable(expected), check_dtype=False)
+
+def test_sample_matches_expected():
+    expected = pd.DataFrame(SAMPLE_EXPECTED)
+    _assert_equal(wrangle_dataframe(pd.DataFrame(SAMPLE)), expected)
+
+def test_baseline_matches_expected():
+    expected = pd.DataFrame(SAMPLE_EXPECTED)
+    _assert_equal(baseline_wrangle(pd.DataFrame(SAMPLE)), expected)
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_sample_matches_baseline(seed):
+    df = random_sample(seed)
+    _assert_equal(wrangle_dataframe(df.copy()), baseline_wrangle(df.copy()))